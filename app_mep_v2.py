@@ -1,6 +1,6 @@
 # app_mep_v2.py
 # Market Edge Pro v2 — FastAPI entrypoint
-# Mounts data, backtests, screener, metrics, and signals routers.
+# Mounts data, backtests, screener, metrics, signals, and jobs routers.
 # Avoids route collisions by mounting the legacy data router at /v2/legacy.
 
 from __future__ import annotations
@@ -64,6 +64,14 @@ except Exception as e:
     signals_router_v2 = None  # type: ignore
     logger.warning("No signals router: %s", e)
 
+try:
+    from routers_jobs_mep_v2 import router as jobs_router_v2
+    from routers_jobs_mep_v2 import start_job_workers
+    logger.info("Loaded routers_jobs_mep_v2.")
+except Exception as e:
+    jobs_router_v2 = None  # type: ignore
+    logger.warning("No jobs router: %s", e)
+
 # -----------------------------
 # App factory
 # -----------------------------
@@ -108,6 +116,20 @@ def create_app() -> FastAPI:
     if signals_router_v2:
         app.include_router(signals_router_v2, prefix="/v2")
         logger.info("Mounted signals_router_v2 at /v2.")
+    if jobs_router_v2:
+        app.include_router(jobs_router_v2, prefix="/v2")
+        logger.info("Mounted jobs_router_v2 at /v2.")
+
+        # in-process job workers (JOB_WORKERS; 0 = run `python jobs_mep_v2.py worker` elsewhere)
+        @app.on_event("startup")
+        def _start_job_workers() -> None:
+            app.state.job_worker = start_job_workers()
+
+        @app.on_event("shutdown")
+        def _stop_job_workers() -> None:
+            worker = getattr(app.state, "job_worker", None)
+            if worker is not None:
+                worker.stop(timeout=5.0)
 
     # Health/meta
     @app.get("/", tags=["meta"])
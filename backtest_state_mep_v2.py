@@ -0,0 +1,154 @@
+# backtest_state_mep_v2.py
+# Live strategy runs kept current incrementally: `backtest_state` holds the
+# backtesting_mep_v2.BacktestState of each (tenant, market, symbol, timeframe,
+# strategy, params hash), and advance_key() runs event_backtest_resume over
+# only the bars after it, so 60 new bars on a 2M-bar history cost O(60).
+#
+# Signals come from STRATEGY_REGISTRY on the materialized indicators
+# (indicators_store_mep_v2) of the new bars plus SIGNAL_LOOKBACK bars before
+# them. As with indicator_state, the saved state lags one bar behind the last
+# bar seen, so re-upserting the still-open candle stays incremental; ingest
+# (indicators_store_mep_v2.materialize_key) drops the states a rewrite of
+# older bars invalidates (invalidate_states, which lives there so the store
+# does not import this module).
+#
+# The params hash covers strategy params and costs: changing either starts a
+# new run from bar 0.
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import text
+
+from backtesting_mep_v2 import BacktestState, event_backtest_resume
+from indicators_mep_v2 import OHLCV_COLS
+from indicators_store_mep_v2 import KEY_COLS, MATERIALIZED_COLUMNS
+from strategies_mep_v1 import STRATEGY_REGISTRY
+
+# bars before the first new one a strategy's signal needs (mean_reversion: the
+# previous bar's rsi); strategies without an entry cannot be resumed
+SIGNAL_LOOKBACK: Dict[str, int] = {
+    "mean_reversion": 1,
+}
+
+Key = Tuple[str, str, str, str]
+
+# -------------------------------
+# Pure part (no DB)
+# -------------------------------
+
+def run_spec(params: Dict[str, Any], fee_bps: float, slippage_bps: float) -> Dict[str, Any]:
+    return {"params": params, "fee_bps": float(fee_bps), "slippage_bps": float(slippage_bps)}
+
+def params_hash(spec: Dict[str, Any]) -> str:
+    blob = json.dumps(spec, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+def advance(frame: pd.DataFrame, n_new: int, strategy: str, params: Dict[str, Any],
+            state: Optional[BacktestState], fee_bps: float=10.0,
+            slippage_bps: float=5.0) -> Tuple[Dict[str, Any], BacktestState]:
+    """
+    Resume `state` over the last n_new rows of `frame` (bars + indicators,
+    preceded by the strategy's lookback rows; state None: frame is the whole
+    history). Returns the run summary over every bar and the state to save,
+    which stops one bar short of the last.
+    """
+    if strategy not in SIGNAL_LOOKBACK:
+        raise ValueError(f"strategy {strategy!r} cannot be resumed; "
+                         f"expected one of {sorted(SIGNAL_LOOKBACK)}")
+    sig = STRATEGY_REGISTRY[strategy](frame, **params)["signal"].to_numpy()[len(frame) - n_new:]
+    new = frame.iloc[len(frame) - n_new:]
+    c, ts = new["close"].to_numpy(), new["ts"].to_numpy()
+    _, _, trades, _, snapshot = event_backtest_resume(c[:-1], sig[:-1], state, ts[:-1],
+                                                      fee_bps, slippage_bps)
+    pnl, dd, last, _, cur = event_backtest_resume(c[-1:], sig[-1:], snapshot, ts[-1:],
+                                                  fee_bps, slippage_bps)
+    trades += last
+    summary = {**cur.to_dict(), "new_bars": int(n_new), "new_trades": [list(t) for t in trades]}
+    return summary, snapshot
+
+# -------------------------------
+# DB part (sync Connection, e.g. engine.begin())
+# -------------------------------
+
+_KEY_WHERE = ("o.tenant_id=:tenant_id AND o.market=:market AND o.symbol=:symbol"
+              " AND o.timeframe=:timeframe")
+_STATE_WHERE = ("tenant_id=:tenant_id AND market=:market AND symbol=:symbol"
+                " AND timeframe=:timeframe AND strategy=:strategy AND params_hash=:params_hash")
+
+def _read_frame(conn, key: Key, after: Optional[int] = None,
+                last_upto: Optional[Tuple[int, int]] = None) -> pd.DataFrame:
+    """
+    Bars joined to their materialized indicators; bars not materialized yet are
+    left for the next call.
+    """
+    cols = ["ts", *OHLCV_COLS, *MATERIALIZED_COLUMNS]
+    sel = ",".join([*(f"o.{c}" for c in ["ts", *OHLCV_COLS]),
+                    *(f"i.{c}" for c in MATERIALIZED_COLUMNS)])
+    q = (f"SELECT {sel} FROM ohlcv o JOIN indicators i USING ({','.join(KEY_COLS)},ts) "
+         f"WHERE {_KEY_WHERE}")
+    p: Dict[str, Any] = dict(zip(KEY_COLS, key))
+    if last_upto is not None:
+        p["upto"], p["limit"] = last_upto
+        q += " AND o.ts <= :upto ORDER BY o.ts DESC LIMIT :limit"
+        rows = conn.execute(text(q), p).mappings().all()[::-1]
+    else:
+        if after is not None:
+            q += " AND o.ts > :after"; p["after"] = after
+        rows = conn.execute(text(q + " ORDER BY o.ts"), p).mappings().all()
+    df = pd.DataFrame([dict(r) for r in rows], columns=cols)
+    return df.astype({"ts": "int64", **{c: "float64" for c in cols[1:]}})
+
+def load_state(conn, key: Key, strategy: str, phash: str) -> Optional[BacktestState]:
+    p = {**dict(zip(KEY_COLS, key)), "strategy": strategy, "params_hash": phash}
+    row = conn.execute(text(f"SELECT state FROM backtest_state WHERE {_STATE_WHERE}"),
+                       p).mappings().first()
+    return None if row is None else BacktestState.from_dict(row["state"])
+
+def save_state(conn, key: Key, strategy: str, spec: Dict[str, Any], state: BacktestState) -> None:
+    conn.execute(text(f"""
+        INSERT INTO backtest_state({",".join(KEY_COLS)},strategy,params_hash,params,state_ts,state,
+                                   updated_at)
+        VALUES (:tenant_id,:market,:symbol,:timeframe,:strategy,:params_hash,CAST(:params AS jsonb),
+                :state_ts,CAST(:state AS jsonb),now())
+        ON CONFLICT ({",".join(KEY_COLS)},strategy,params_hash) DO UPDATE SET
+          state_ts=EXCLUDED.state_ts, state=EXCLUDED.state, updated_at=now()
+    """), {**dict(zip(KEY_COLS, key)), "strategy": strategy, "params_hash": params_hash(spec),
+           "params": json.dumps(spec), "state_ts": state.last_ts,
+           "state": json.dumps(state.to_dict(), allow_nan=False)})
+
+def advance_key(conn, tenant_id: str, market: str, symbol: str, timeframe: str, strategy: str,
+                params: Optional[Dict[str, Any]] = None, fee_bps: float = 10.0,
+                slippage_bps: float = 5.0, reset: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Bring one live run up to the last materialized bar and save its state.
+    Returns the run summary (pnl, max_dd, position, trades, ... plus the bars and
+    trades added by this call), None when the key has no bars yet.
+    """
+    if strategy not in SIGNAL_LOOKBACK:
+        raise ValueError(f"strategy {strategy!r} cannot be resumed; "
+                         f"expected one of {sorted(SIGNAL_LOOKBACK)}")
+    key: Key = (tenant_id, market, symbol, timeframe)
+    params = params or {}
+    spec = run_spec(params, fee_bps, slippage_bps)
+    phash = params_hash(spec)
+    conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:k))"),
+                 {"k": "backtest:" + "|".join(key) + "|" + strategy + "|" + phash})
+    state = None if reset else load_state(conn, key, strategy, phash)
+    if state is None or state.last_ts is None:
+        state = None
+        frame = _read_frame(conn, key)
+        n_new = len(frame)
+    else:
+        new = _read_frame(conn, key, after=state.last_ts)
+        prev = _read_frame(conn, key, last_upto=(state.last_ts, SIGNAL_LOOKBACK[strategy]))
+        frame, n_new = pd.concat([prev, new], ignore_index=True), len(new)
+    if n_new == 0:
+        return None if state is None else {**state.to_dict(), "new_bars": 0, "new_trades": []}
+    summary, snapshot = advance(frame, n_new, strategy, params, state, fee_bps, slippage_bps)
+    if snapshot.bars:
+        save_state(conn, key, strategy, spec, snapshot)
+    return summary
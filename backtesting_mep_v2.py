@@ -1,5 +1,10 @@
-from typing import Dict, Tuple, List
-import numpy as np, pandas as pd
+import math
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
 
 def fees_slippage(close_now: float, close_prev: float, pos: int, fee_bps: float, slippage_bps: float) -> float:
     ret = 0.0
@@ -9,16 +14,223 @@ def fees_slippage(close_now: float, close_prev: float, pos: int, fee_bps: float,
     return ret - cost
 
 def event_backtest(df: pd.DataFrame, signal_col: str="signal", fee_bps: float=10.0, slippage_bps: float=5.0):
-    c = df["close"].to_numpy(); sig = df[signal_col].to_numpy()
+    return event_backtest_arrays(df["close"].to_numpy(), df[signal_col].to_numpy(),
+                                 df["ts"].to_numpy(), fee_bps=fee_bps, slippage_bps=slippage_bps)
+
+def event_backtest_arrays(close: np.ndarray, sig: np.ndarray, ts: Optional[np.ndarray]=None,
+                          fee_bps: float=10.0, slippage_bps: float=5.0):
+    """
+    Vectorized engine, same semantics as event_backtest_loop:
+      held[i]  = position carried into bar i (sig[i-1]; flat into bar 1)
+      change   = sig[i] != held[i]  -> pay cost, plus cost again when leaving a position
+      ret      = held * (c[i] - c[i-1]) / c[i-1]   (0 when flat)
+      equity   = 1 + cumsum(ret - costs)
+    Trades carry ts[i] when ts is given, else the bar index.
+    """
+    # returns and equity accumulate in float64 even for compact (float32) prices
+    c = np.asarray(close, dtype=np.float64); sig = np.asarray(sig)
+    n = len(c)
+    if n < 2:
+        return 0.0, 0.0, [], np.ones(1)
+    step, chg = bar_steps(c, sig, fee_bps, slippage_bps)
+    desired = sig[1:]
+    eq = np.empty(n)
+    eq[0] = 0.0
+    np.cumsum(step, out=eq[1:])
+    pnl = float(eq[-1])
+    eq += 1.0
+    # fmax is the faster accumulate; NaN equity still gives a NaN drawdown
+    peak = np.fmax.accumulate(eq)
+    dd = float(np.max(np.subtract(peak, eq, out=peak)))
+    idx = chg[(desired[chg] == 1) | (desired[chg] == -1)] + 1
+    tsv = idx if ts is None else np.asarray(ts)[idx]
+    sides = np.where(sig[idx] == 1, "BUY", "SELL").tolist()
+    trades = list(zip(tsv.astype(np.int64).tolist(), sides, c[idx].tolist(), [1.0]*len(idx)))
+    return pnl, dd, trades, eq
+
+def bar_steps(close: np.ndarray, sig: np.ndarray, fee_bps: float=10.0, slippage_bps: float=5.0,
+              flat_start: bool=True) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Net per-bar returns of event_backtest_arrays (len n-1: step[i] is bar i+1,
+    costs included) and the step indices where the position changes.
+    The equity curve is 1 + cumsum(step) behind a leading 1.
+    flat_start=False takes sig[0] as the position really held into bar 1
+    (a resumed run, see event_backtest_resume).
+    """
+    c = np.asarray(close, dtype=np.float64); sig = np.asarray(sig)
+    held, desired = sig[:-1], sig[1:]   # held[0] is really flat: patched below
+    change = desired != held
+    in_pos = held != 0
+    if flat_start and len(change):
+        change[0] = desired[0] != 0
+        in_pos[0] = False
+    cost = (fee_bps + slippage_bps)/1e4
+    # per-bar step, written in place; flat bars stay exactly 0 even if a close is 0/NaN
+    step = np.diff(c)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(step, c[:-1], out=step)
+    np.multiply(step, held, out=step)
+    np.copyto(step, 0.0, where=~in_pos)
+    # position changes are sparse: charge them by index
+    chg = np.flatnonzero(change)
+    step[chg] -= cost + cost * in_pos[chg]
+    return step, chg
+
+# -----------------------------------------------------------------------------
+# Resumable runs
+# -----------------------------------------------------------------------------
+@dataclass
+class BacktestState:
+    """
+    End state of event_backtest_arrays over bars[:bars]: enough to continue
+    the run over appended bars without the history.
+      position    held into the next bar (flat after a single bar)
+      pnl         cumulative pnl (equity - 1), as the engine's running sum
+      peak / max_dd   running equity peak and worst drawdown so far
+    """
+    position: int = 0
+    pnl: float = 0.0
+    peak: float = 1.0
+    max_dd: float = 0.0
+    last_close: float = math.nan
+    last_ts: Optional[int] = None
+    trades: int = 0
+    bars: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = asdict(self)
+        # jsonb has no NaN
+        d["last_close"] = None if math.isnan(self.last_close) else self.last_close
+        return d
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "BacktestState":
+        d = dict(d)
+        d["last_close"] = math.nan if d.get("last_close") is None else float(d["last_close"])
+        return cls(**d)
+
+def event_backtest_resume(close: np.ndarray, sig: np.ndarray, state: Optional[BacktestState]=None,
+                          ts: Optional[np.ndarray]=None, fee_bps: float=10.0,
+                          slippage_bps: float=5.0):
+    """
+    event_backtest_arrays over bars appended after `state` (None: from bar 0).
+    Returns (pnl, max_dd, trades, equity, new_state): pnl/max_dd/state cover
+    the whole run so far, trades and equity only the new bars. Cost is
+    O(len(close)) whatever the history; running a history in pieces gives the
+    same numbers, bit for bit, as one event_backtest_arrays call.
+    """
+    c = np.asarray(close, dtype=np.float64); sig = np.asarray(sig)
+    n = len(c)
+    tsv = np.arange(n) if ts is None else np.asarray(ts)
+    if state is None or state.bars == 0:
+        pnl, dd, trades, eq = event_backtest_arrays(c, sig, ts, fee_bps, slippage_bps)
+        if n == 0:
+            return 0.0, 0.0, [], np.ones(0), BacktestState()
+        new = BacktestState(position=int(sig[-1]) if n > 1 else 0, pnl=pnl,
+                            peak=float(np.fmax.reduce(eq)), max_dd=dd, last_close=float(c[-1]),
+                            last_ts=int(tsv[-1]), trades=len(trades), bars=n)
+        return pnl, dd, trades, eq[:n], new
+    if n == 0:
+        return state.pnl, state.max_dd, [], np.ones(0), state
+    # the saved bar leads: its close and the position held out of it
+    c_ext = np.r_[state.last_close, c]
+    s_ext = np.r_[np.asarray(state.position, dtype=sig.dtype), sig]
+    step, chg = bar_steps(c_ext, s_ext, fee_bps, slippage_bps, flat_start=False)
+    # continue the engine's running sum (same additions, same order as one long run)
+    eq = np.cumsum(np.r_[state.pnl, step])[1:]
+    pnl = float(eq[-1])
+    eq += 1.0
+    peak = np.fmax.accumulate(np.r_[state.peak, eq])
+    dd = max(state.max_dd, float(np.max(np.subtract(peak[1:], eq))))
+    desired = s_ext[1:]
+    idx = chg[(desired[chg] == 1) | (desired[chg] == -1)] + 1
+    last_ts = state.last_ts if state.last_ts is not None else -1
+    ts_ext = np.r_[np.int64(last_ts), tsv.astype(np.int64)]
+    sides = np.where(s_ext[idx] == 1, "BUY", "SELL").tolist()
+    trades = list(zip(ts_ext[idx].tolist(), sides, c_ext[idx].tolist(), [1.0]*len(idx)))
+    new = BacktestState(position=int(sig[-1]), pnl=pnl, peak=float(peak[-1]), max_dd=dd,
+                        last_close=float(c[-1]), last_ts=int(tsv[-1]),
+                        trades=state.trades + len(trades), bars=state.bars + n)
+    return pnl, dd, trades, eq, new
+
+# variants x bars processed per block by event_backtest_matrix (bounds the (k, n) temporaries)
+MATRIX_BLOCK = 1 << 22
+
+def event_backtest_matrix(close: np.ndarray, sigs: np.ndarray, fee_bps: float=10.0,
+                          slippage_bps: float=5.0,
+                          return_equity: bool=False) -> Dict[str, np.ndarray]:
+    """
+    N strategies over the same prices in one pass: sigs is (N, n_bars), row i
+    gives the same pnl/max_dd/trade count as event_backtest_arrays(close, sigs[i]).
+    Returns {"pnl": (N,), "max_dd": (N,), "trades": (N,) int, "equity": (N, n) if return_equity}.
+    """
+    c = np.asarray(close, dtype=np.float64); S = np.atleast_2d(np.asarray(sigs))
+    N, n = S.shape
+    if n != len(c):
+        raise ValueError(f"sigs has {n} bars, close has {len(c)}")
+    out = {"pnl": np.zeros(N), "max_dd": np.zeros(N), "trades": np.zeros(N, dtype=np.int64)}
+    eq_all = np.ones((N, max(n, 1))) if return_equity else None
+    if n < 2 or N == 0:
+        if return_equity:
+            out["equity"] = eq_all
+        return out
+    # price returns are shared by every variant
+    r = np.diff(c)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(r, c[:-1], out=r)
+    cost = (fee_bps + slippage_bps)/1e4
+    rows = max(1, MATRIX_BLOCK // n)
+    for a in range(0, N, rows):
+        b = min(N, a + rows)
+        held, desired = S[a:b, :-1], S[a:b, 1:]
+        change = desired != held
+        change[:, 0] = desired[:, 0] != 0
+        in_pos = held != 0
+        in_pos[:, 0] = False
+        step = np.multiply(r, held, dtype=np.float64)
+        np.copyto(step, 0.0, where=~in_pos)
+        ri, ci = np.nonzero(change)
+        step[ri, ci] -= cost + cost * in_pos[ri, ci]
+        eq = eq_all[a:b] if return_equity else np.empty((b - a, n))
+        eq[:, 0] = 0.0
+        np.cumsum(step, axis=1, out=eq[:, 1:])
+        out["pnl"][a:b] = eq[:, -1]
+        eq += 1.0
+        peak = np.fmax.accumulate(eq, axis=1)
+        out["max_dd"][a:b] = np.max(np.subtract(peak, eq, out=peak), axis=1)
+        out["trades"][a:b] = np.count_nonzero(change & ((desired == 1) | (desired == -1)), axis=1)
+    if return_equity:
+        out["equity"] = eq_all
+    return out
+
+# metric -> descending?; ret_dd is pnl / max_dd (NaN when there was no drawdown)
+RANK_METRICS = {"pnl": True, "max_dd": False, "trades": True, "ret_dd": True}
+
+def rank_order(res: Dict[str, np.ndarray], metric: str="pnl") -> np.ndarray:
+    """Row order of an event_backtest_matrix result, best first; NaN last, ties in input order."""
+    if metric not in RANK_METRICS:
+        raise ValueError(f"unknown rank metric {metric!r}; expected one of {sorted(RANK_METRICS)}")
+    key = ret_dd(res) if metric == "ret_dd" else np.asarray(res[metric], dtype=np.float64)
+    return np.argsort(-key if RANK_METRICS[metric] else key, kind="stable")
+
+def ret_dd(res: Dict[str, np.ndarray]) -> np.ndarray:
+    dd = res["max_dd"]
+    return np.divide(res["pnl"], dd, out=np.full(len(dd), np.nan), where=dd > 0)
+
+def event_backtest_loop(close: np.ndarray, sig: np.ndarray, ts: Optional[np.ndarray]=None,
+                        fee_bps: float=10.0, slippage_bps: float=5.0):
+    # bar-by-bar reference implementation; kept as the oracle for event_backtest_arrays
+    c = np.asarray(close, dtype=np.float64); sig = np.asarray(sig)
+    ts = np.arange(len(c)) if ts is None else np.asarray(ts)
     pos = 0; pnl = 0.0; eq = [1.0]; trades=[]
-    for i in range(1, len(df)):
+    for i in range(1, len(c)):
         desired = sig[i]
         if desired != pos:
             # close previous exposure cost + open new
             pnl += fees_slippage(c[i], c[i-1], pos, fee_bps, slippage_bps)
             pos = desired
             side = "BUY" if pos==1 else ("SELL" if pos==-1 else "FLAT")
-            if side != "FLAT": trades.append((int(df["ts"].iloc[i]), side, float(c[i]), 1.0))
+            if side != "FLAT": trades.append((int(ts[i]), side, float(c[i]), 1.0))
             pnl -= (fee_bps + slippage_bps)/1e4
         else:
             pnl += fees_slippage(c[i], c[i-1], pos, 0.0, 0.0)
@@ -26,12 +238,17 @@ def event_backtest(df: pd.DataFrame, signal_col: str="signal", fee_bps: float=10
     dd = float(np.max(np.maximum.accumulate(eq) - eq))
     return float(pnl), dd, trades, np.asarray(eq, float)
 
-def purged_kfold(n: int, k: int=5, purge: int=20):
+def purged_kfold(n: int, k: int=5, purge: int=20, embargo: int=0):
+    """
+    k contiguous test folds; train is every other bar except the `purge` bars
+    before the fold and the `embargo` bars after it.
+    Yields (train: sorted int index array, test: slice).
+    """
     fold = n // k
     for i in range(k):
         te_start = i*fold; te_end = (i+1)*fold if i<k-1 else n
-        tr_end = max(te_start - purge, 0)
-        yield slice(0,tr_end), slice(te_start, te_end)
+        tr = np.r_[0:max(te_start - purge, 0), min(te_end + embargo, n):n]
+        yield tr, slice(te_start, te_end)
 
 def walk_forward_anchored(n: int, window: int=500, step: int=100):
     start=0
@@ -0,0 +1,10 @@
+# benchmarks/
+# Offline performance suite (no database, no network):
+#
+#   python -m benchmarks run --sizes 1e4,1e5,1e6 --out benchmarks/baseline.json
+#   python -m benchmarks compare --baseline benchmarks/baseline.json --threshold 0.25
+#
+# synthetic.py     deterministic GBM + volume OHLCV frames (1e4 .. 1e7 bars)
+# bench_suite.py   cases, timing, JSON baseline, regression compare
+# bench_indicator_plan.py / bench_precision.py   one-off memory studies
+# baseline_indicators.py   the pre-plan indicator chain (oracle and "chain" variant)
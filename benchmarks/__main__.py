@@ -0,0 +1,3 @@
+from benchmarks.bench_suite import main
+
+main()
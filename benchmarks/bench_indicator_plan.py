@@ -0,0 +1,87 @@
+# benchmarks/bench_indicator_plan.py
+# Peak RSS and wall time: preallocated indicator plan vs the per-indicator copy chain.
+#
+#   python benchmarks/bench_indicator_plan.py --bars 500000 --repeat 3
+#
+# Each variant runs in a fresh spawned process so ru_maxrss is not polluted by
+# the other variant. traced_peak_mb (tracemalloc, numpy-aware) is the allocation
+# peak of the call itself and is the more stable number to compare.
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import numpy as np
+import pandas as pd
+
+
+def _synthetic(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    price = 100 * np.exp(rng.normal(0, 1e-3, size=n).cumsum())
+    spread = price * rng.random(size=n) * 1e-3
+    return pd.DataFrame({
+        "ts": np.arange(n, dtype=np.int64) * 60000,
+        "open": price, "high": price + spread, "low": price - spread, "close": price,
+        "volume": rng.integers(100, 1000, size=n).astype(float),
+    })
+
+def _chain(df: pd.DataFrame) -> pd.DataFrame:
+    # the pre-plan code itself: every step copies an ever-wider frame, then assigns
+    from benchmarks.baseline_indicators import apply_default_indicators_v2
+    return apply_default_indicators_v2(df)
+
+def _plan(df: pd.DataFrame) -> pd.DataFrame:
+    from indicators_mep_v2 import apply_default_indicators_v2
+    return apply_default_indicators_v2(df)
+
+VARIANTS = {"chain": _chain, "plan": _plan}
+
+def _max_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return float("nan")
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024.0 * 1024.0) if sys.platform == "darwin" else rss / 1024.0
+
+def _run_variant(name: str, bars: int, repeat: int, q) -> None:
+    df = _synthetic(bars)
+    base = _max_rss_mb()
+    times = []
+    tracemalloc.start()
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = VARIANTS[name](df)
+        times.append(time.perf_counter() - t0)
+        del out
+    traced_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    q.put({"variant": name, "bars": bars, "best_s": round(min(times), 4),
+           "peak_rss_mb": round(_max_rss_mb(), 1),
+           "peak_rss_delta_mb": round(_max_rss_mb() - base, 1),
+           "traced_peak_mb": round(traced_peak / 1e6, 1)})
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--bars", type=int, default=500_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+    ctx = mp.get_context("spawn")
+    results = []
+    for name in VARIANTS:
+        q = ctx.Queue()
+        p = ctx.Process(target=_run_variant, args=(name, args.bars, args.repeat, q))
+        p.start(); results.append(q.get()); p.join()
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# benchmarks/bench_precision.py
+# float64 vs compact (float32) indicator frames: memory, wall time and the
+# accuracy drift compact mode introduces.
+#
+#   python benchmarks/bench_precision.py --bars 5000000 --repeat 2
+#
+# Timing/memory run in a fresh spawned process per precision (see
+# bench_indicator_plan.py). Drift is measured in this process on the default
+# indicator set plus every registered indicator:
+#   max_abs       max |f32 - f64| over bars where both are finite
+#   max_rel_scale max_abs / std(f64 column), i.e. drift in units of the column's spread
+#   nan_mismatch  bars finite in one precision and not in the other
+# plus the mean-reversion backtest (pnl, max dd, trades, signal flips) on both.
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import numpy as np
+
+try:
+    from benchmarks.bench_indicator_plan import _max_rss_mb, _synthetic
+except ImportError:  # run as a script from benchmarks/
+    from bench_indicator_plan import _max_rss_mb, _synthetic
+
+def _specs():
+    from indicators_mep_v2 import DEFAULT_INDICATORS, INDICATOR_REGISTRY, IndicatorSpec
+    default = {s.name for s in DEFAULT_INDICATORS}
+    extra = [IndicatorSpec.of(n) for n in INDICATOR_REGISTRY if n not in default]
+    return list(DEFAULT_INDICATORS) + extra
+
+def _run_precision(precision: str, bars: int, repeat: int, q) -> None:
+    from indicators_mep_v2 import compute_indicators, to_precision
+    df = to_precision(_synthetic(bars), precision)
+    specs = _specs()
+    base = _max_rss_mb()
+    times = []
+    tracemalloc.start()
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = compute_indicators(df, specs, precision)
+        times.append(time.perf_counter() - t0)
+        frame_mb = out.memory_usage(index=True, deep=False).sum() / 1e6
+        del out
+    traced_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    q.put({"precision": precision, "bars": bars, "best_s": round(min(times), 3),
+           "bars_per_s": round(bars / min(times)), "frame_mb": round(frame_mb, 1),
+           "peak_rss_delta_mb": round(_max_rss_mb() - base, 1),
+           "traced_peak_mb": round(traced_peak / 1e6, 1)})
+
+def _drift(bars: int):
+    from backtesting_mep_v2 import event_backtest
+    from indicators_mep_v2 import compute_indicators, to_precision
+    from strategies_mep_v1 import mean_reversion_signals
+    df = _synthetic(bars)
+    specs = _specs()
+    ref = compute_indicators(df, specs)
+    cmp = compute_indicators(to_precision(df, "compact"), specs, "compact")
+    cols = {}
+    for c in ref.columns:
+        if c == "ts":
+            continue
+        a = ref[c].to_numpy(np.float64); b = cmp[c].to_numpy(np.float64)
+        both = np.isfinite(a) & np.isfinite(b)
+        err = np.abs(a[both] - b[both])
+        std = float(np.std(a[both])) if both.any() else 0.0
+        cols[c] = {"dtype": str(cmp[c].dtype), "max_abs": float(err.max()) if err.size else 0.0,
+                   "max_rel_scale": float(err.max() / std) if err.size and std else 0.0,
+                   "nan_mismatch": int((np.isfinite(a) != np.isfinite(b)).sum())}
+    bt = {}
+    sigs = {}
+    for name, frame in (("float64", ref), ("compact", cmp)):
+        s = mean_reversion_signals(frame)
+        sigs[name] = s["signal"].to_numpy()
+        pnl, dd, trades, _ = event_backtest(s)
+        bt[name] = {"pnl": pnl, "max_dd": dd, "trades": len(trades)}
+    bt["signal_flips"] = int((sigs["float64"] != sigs["compact"]).sum())
+    return {"columns": cols, "backtest": bt}
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--bars", type=int, default=5_000_000)
+    ap.add_argument("--repeat", type=int, default=2)
+    ap.add_argument("--skip-drift", action="store_true")
+    args = ap.parse_args()
+    ctx = mp.get_context("spawn")
+    perf = []
+    for precision in ("float64", "compact"):
+        q = ctx.Queue()
+        p = ctx.Process(target=_run_precision, args=(precision, args.bars, args.repeat, q))
+        p.start(); perf.append(q.get()); p.join()
+    out = {"perf": perf}
+    if not args.skip_drift:
+        out["drift"] = _drift(args.bars)
+    print(json.dumps(out, indent=2))
+
+if __name__ == "__main__":
+    main()
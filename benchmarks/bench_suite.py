@@ -0,0 +1,258 @@
+# benchmarks/bench_suite.py
+# Wall-time suite over synthetic.gbm_ohlcv frames, with a JSON baseline and a
+# regression compare.
+#
+#   python -m benchmarks run                       # 1e4, 1e5, 1e6 bars -> benchmarks/baseline.json
+#   python -m benchmarks run --sizes 1e7 --cases 'rsi|event_backtest' --out /tmp/big.json
+#   python -m benchmarks compare                   # re-run the baseline's cases and sizes
+#   python -m benchmarks compare --current new.json --threshold 0.2
+#
+# Each case has an untimed setup (indicator frame, signals, ...) that returns
+# the thunk to time. A thunk runs until `--min-time` seconds or `--repeat`
+# runs, whichever comes first (at least once); best_s is the statistic
+# compared, median_s is reported. compare exits 1 when a case is slower than
+# baseline * (1 + threshold) and also more than --min-delta seconds slower,
+# so sub-millisecond noise on tiny sizes does not fail a run.
+#
+# Cases with max_bars are skipped above it (_simulate_pnl is a per-bar pandas
+# loop); a case whose import fails is recorded as skipped with the reason.
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import gbm_ohlcv
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+Thunk = Callable[[], Any]
+
+class Case(NamedTuple):
+    name: str
+    setup: Callable[[pd.DataFrame], Thunk]
+    max_bars: Optional[int] = None
+
+# -----------------------------------------------------------------------------
+# Cases
+# -----------------------------------------------------------------------------
+def _indicator_case(name: str) -> Case:
+    def setup(df: pd.DataFrame) -> Thunk:
+        import indicators_mep_v2 as ind
+        fn = getattr(ind, name)
+        return lambda: fn(df)
+    return Case(f"indicators.{name}", setup)
+
+def _signals(df: pd.DataFrame) -> pd.DataFrame:
+    from indicators_mep_v2 import apply_default_indicators_v2
+    from strategies_mep_v1 import mean_reversion_signals
+    return mean_reversion_signals(apply_default_indicators_v2(df))
+
+def _apply_default(df: pd.DataFrame) -> Thunk:
+    from indicators_mep_v2 import apply_default_indicators_v2
+    return lambda: apply_default_indicators_v2(df)
+
+def _event_backtest(df: pd.DataFrame) -> Thunk:
+    from backtesting_mep_v2 import event_backtest
+    s = _signals(df)
+    return lambda: event_backtest(s)
+
+def _simulate_pnl(df: pd.DataFrame) -> Thunk:
+    from routers_metrics_mep_v2 import _simulate_pnl as simulate
+    sig_df = _signals(df)[["ts", "signal"]]
+    return lambda: simulate(df, sig_df, 10.0, 5.0)
+
+def _signal_series(df: pd.DataFrame) -> pd.Series:
+    s = _signals(df)
+    return pd.Series(s["signal"].to_numpy(), index=pd.Index(s["ts"].to_numpy(), name="ts"),
+                     name="signal")
+
+def _compute_accuracy(df: pd.DataFrame) -> Thunk:
+    from services_metrics_mep_v2 import compute_accuracy
+    sig = _signal_series(df)
+    return lambda: compute_accuracy(df, sig, horizon_bars=24)
+
+def _compute_pnl(df: pd.DataFrame) -> Thunk:
+    from services_metrics_mep_v2 import compute_pnl
+    sig = _signal_series(df)
+    return lambda: compute_pnl(df, sig, fee_bps=10.0, slippage_bps=5.0)
+
+def build_cases() -> List[Case]:
+    import indicators_mep_v2 as ind
+    # every per-indicator wrapper in indicators_mep_v2 (one per registered indicator)
+    cases = [_indicator_case(n) for n in ind.INDICATOR_REGISTRY if callable(getattr(ind, n, None))]
+    cases += [
+        Case("indicators.apply_default_indicators_v2", _apply_default),
+        Case("backtesting.event_backtest", _event_backtest),
+        Case("metrics.simulate_pnl", _simulate_pnl, max_bars=10_000),
+        Case("metrics.compute_accuracy", _compute_accuracy),
+        Case("metrics.compute_pnl", _compute_pnl),
+    ]
+    return cases
+
+# -----------------------------------------------------------------------------
+# Run
+# -----------------------------------------------------------------------------
+def time_thunk(thunk: Thunk, repeat: int = 5, min_time: float = 0.5) -> Dict[str, Any]:
+    times: List[float] = []
+    while not times or (len(times) < repeat and sum(times) < min_time):
+        gc.collect()
+        t0 = time.perf_counter()
+        thunk()
+        times.append(time.perf_counter() - t0)
+    return {"best_s": min(times), "median_s": statistics.median(times), "runs": len(times)}
+
+def _meta() -> Dict[str, Any]:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                             text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        rev = None
+    return {"created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "git": rev,
+            "python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+            "platform": platform.platform(), "machine": platform.machine(), "cpus": os.cpu_count()}
+
+def run(sizes: Sequence[int] = DEFAULT_SIZES, pattern: Optional[str] = None, repeat: int = 5,
+        min_time: float = 0.5, seed: int = 0,
+        log: Callable[[str], None] = lambda s: None) -> Dict[str, Any]:
+    cases = [c for c in build_cases() if pattern is None or re.search(pattern, c.name)]
+    results: List[Dict[str, Any]] = []
+    for n in sizes:
+        df = gbm_ohlcv(int(n), seed=seed)
+        for case in cases:
+            row: Dict[str, Any] = {"case": case.name, "bars": int(n)}
+            if case.max_bars is not None and n > case.max_bars:
+                row["skipped"] = f"above max_bars={case.max_bars}"
+            else:
+                try:
+                    thunk = case.setup(df)
+                except ImportError as e:
+                    row["skipped"] = f"import failed: {e}"
+                else:
+                    row.update(time_thunk(thunk, repeat, min_time))
+                    row["bars_per_s"] = round(n / row["best_s"]) if row["best_s"] > 0 else None
+                    del thunk
+            results.append(row)
+            log(f"{case.name:45s} {n:>10d}  " + (f"{row['best_s']*1e3:10.2f} ms" if "best_s" in row
+                                                  else f"skipped ({row['skipped']})"))
+        del df
+    return {"meta": {**_meta(), "seed": seed, "sizes": [int(n) for n in sizes], "pattern": pattern},
+            "results": results}
+
+# -----------------------------------------------------------------------------
+# Compare
+# -----------------------------------------------------------------------------
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.25,
+            min_delta: float = 1e-3) -> List[Dict[str, Any]]:
+    """
+    One row per (case, bars) in either file: status regression | improved | ok
+    | new | missing | skipped, with ratio = current / baseline best time.
+    """
+    def index(doc):
+        return {(r["case"], r["bars"]): r for r in doc.get("results", [])}
+    base, cur = index(baseline), index(current)
+    rows = []
+    for key in sorted(set(base) | set(cur), key=lambda k: (k[1], k[0])):
+        b, c = base.get(key), cur.get(key)
+        row: Dict[str, Any] = {"case": key[0], "bars": key[1]}
+        if b is None or "best_s" not in b:
+            row["status"] = "new" if c is not None and "best_s" in c else "skipped"
+        elif c is None or "best_s" not in c:
+            row["status"] = "missing"
+        else:
+            ratio = c["best_s"] / b["best_s"] if b["best_s"] > 0 else float("inf")
+            delta = c["best_s"] - b["best_s"]
+            row.update(baseline_s=b["best_s"], current_s=c["best_s"], ratio=round(ratio, 3))
+            if ratio > 1 + threshold and delta > min_delta:
+                row["status"] = "regression"
+            elif ratio < 1 / (1 + threshold) and -delta > min_delta:
+                row["status"] = "improved"
+            else:
+                row["status"] = "ok"
+        rows.append(row)
+    return rows
+
+def _print_compare(rows: List[Dict[str, Any]]) -> None:
+    for r in rows:
+        if "ratio" in r:
+            print(f"{r['status']:10s} {r['case']:45s} {r['bars']:>10d}  "
+                  f"{r['baseline_s']*1e3:10.2f} -> {r['current_s']*1e3:10.2f} ms  "
+                  f"x{r['ratio']:.2f}")
+        else:
+            print(f"{r['status']:10s} {r['case']:45s} {r['bars']:>10d}")
+
+def _sizes(s: str) -> List[int]:
+    return [int(float(x)) for x in s.split(",") if x.strip()]
+
+def _load(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+def _dump(doc: Dict[str, Any], path: str) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(doc, f, indent=2)
+        f.write("\n")
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(prog="python -m benchmarks",
+                                 description="offline performance suite")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("run", help="time the suite and write a JSON result/baseline")
+    r.add_argument("--sizes", type=_sizes, default=list(DEFAULT_SIZES), help="e.g. 1e4,1e5,1e6,1e7")
+    r.add_argument("--cases", default=None, help="regex on case names")
+    r.add_argument("--out", default=DEFAULT_BASELINE)
+    c = sub.add_parser("compare", help="compare a run against a baseline; exit 1 on regressions")
+    c.add_argument("--baseline", default=DEFAULT_BASELINE)
+    c.add_argument("--current", default=None,
+                   help="result file; default: run the baseline's sizes/cases now")
+    c.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    c.add_argument("--min-delta", type=float, default=1e-3,
+                   help="ignore slowdowns below this many seconds")
+    c.add_argument("--out", default=None, help="also write the fresh run here")
+    for p in (r, c):
+        p.add_argument("--repeat", type=int, default=5)
+        p.add_argument("--min-time", type=float, default=0.5)
+        p.add_argument("--quiet", action="store_true")
+    args = ap.parse_args(argv)
+    log = (lambda s: None) if args.quiet else (lambda s: print(s, file=sys.stderr, flush=True))
+
+    if args.cmd == "run":
+        doc = run(args.sizes, args.cases, args.repeat, args.min_time, log=log)
+        _dump(doc, args.out)
+        log(f"wrote {args.out}")
+        return
+    baseline = _load(args.baseline)
+    if args.current:
+        current = _load(args.current)
+    else:
+        meta = baseline.get("meta", {})
+        current = run(meta.get("sizes", DEFAULT_SIZES), meta.get("pattern"), args.repeat,
+                      args.min_time, seed=meta.get("seed", 0), log=log)
+        if args.out:
+            _dump(current, args.out)
+    rows = compare(baseline, current, args.threshold, args.min_delta)
+    _print_compare(rows)
+    regressions = [r for r in rows if r["status"] == "regression"]
+    print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%} "
+          f"({sum(r['status'] == 'improved' for r in rows)} improved, {len(rows)} compared)")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
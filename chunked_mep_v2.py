@@ -0,0 +1,239 @@
+# chunked_mep_v2.py
+# Out-of-core backtests: bars are streamed from storage in fixed-size blocks
+# and indicators, signals and the backtest carry their state across block
+# boundaries, so peak memory follows chunk_bars, not the length of history.
+#
+#   ChunkedIndicators(specs).update(bars)   indicator block for the next bars
+#   iter_ohlcv_chunks(conn, key, chunk)     keyset-paginated reads of `ohlcv`
+#   iter_chunked_backtest / chunked_backtest
+#
+# Carry per op of the indicator graph (indicators_mep_v2.OPS):
+#   ema / ewm (adjust=False)  the last smoothed value seeds the next block: the
+#                             same recursion, bit for bit
+#   obv / vwap                running sums continue as one sequential cumsum
+#   windowed and lag ops      the last inputs of the window (WINDOW_TAIL) are
+#                             prepended as warm-up and their outputs dropped
+#   everything else           element-wise, no state
+# So RSI/EMA/MACD/ATR/OBV/VWAP columns, the signals built on them and the
+# backtest (backtesting_mep_v2.event_backtest_resume) are identical to the
+# in-memory run. pandas rolling mean/std keep a running sum from the start of
+# the series, so sma/bollinger/stoch_d recomputed over the warm-up match the
+# in-memory values to rounding, not bit for bit. ewm(adjust=True) (adx) and
+# negative shifts (ichimoku's look-ahead span) cannot be carried and are refused.
+from __future__ import annotations
+
+import os
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from backtest_state_mep_v2 import SIGNAL_LOOKBACK
+from backtesting_mep_v2 import BacktestState, event_backtest_resume
+from indicators_mep_v2 import (
+    DEFAULT_INDICATORS,
+    OHLCV_COLS,
+    OPS,
+    IndicatorSpec,
+    Node,
+    plan_columns,
+    plan_nodes,
+)
+from indicators_store_mep_v2 import KEY_COLS
+from strategies_mep_v1 import STRATEGY_REGISTRY
+
+BACKTEST_CHUNK_BARS = int(os.getenv("BACKTEST_CHUNK_BARS", str(1 << 18)))
+
+# op -> (**params) -> trailing input values the op needs before a block's first bar
+WINDOW_TAIL: Dict[str, Callable[..., int]] = {
+    "sma": lambda period: period - 1,
+    "std": lambda period: period - 1,
+    "max": lambda period: period - 1,
+    "min": lambda period: period - 1,
+    "wma": lambda period: period - 1,
+    "mean_dev": lambda period: period - 1,
+    "mfi": lambda period: period,
+    "shift": lambda periods: periods,
+    "delta": lambda: 1,
+    "up_move": lambda: 1,
+    "tr": lambda: 1,
+}
+
+Key = Tuple[str, str, str, str]
+
+def _check_node(nd: Node) -> None:
+    p = dict(nd.params)
+    if nd.op == "ewm" and p.get("adjust", False):
+        raise ValueError("ewm(adjust=True) (adx) cannot be carried across chunks")
+    if nd.op == "shift" and p["periods"] < 0:
+        raise ValueError("negative shifts (look-ahead, e.g. ichimoku) cannot be computed in chunks")
+
+class ChunkedIndicators:
+    """compute_block over consecutive blocks of bars, carrying each node's state."""
+
+    def __init__(self, specs: Sequence[IndicatorSpec] = DEFAULT_INDICATORS):
+        self.specs = tuple(specs)
+        self.columns = plan_columns(self.specs)
+        self._order = plan_nodes(self.specs)
+        for nd in self._order:
+            _check_node(nd)
+        self._rows: Dict[Node, List[int]] = {}
+        for j, out in enumerate(out for spec in self.specs for out in spec.nodes()):
+            self._rows.setdefault(out, []).append(j)
+        self._carry: Dict[Node, Any] = {}
+
+    def _eval(self, nd: Node, args: List[np.ndarray]) -> np.ndarray:
+        p = dict(nd.params)
+        carry = self._carry.get(nd)
+        if nd.op in ("ema", "ewm"):
+            x = args[0]
+            seeded = carry is not None and np.isfinite(carry)
+            out = OPS[nd.op](np.r_[carry, x] if seeded else x, **p)[int(seeded):]
+            self._carry[nd] = out[-1] if len(out) else carry
+            return out
+        if nd.op == "obv":
+            c, v = args
+            last, total = carry if carry is not None else (None, 0.0)
+            step = np.zeros_like(c)
+            if last is None:
+                step[1:] = np.sign(np.diff(c)) * v[1:]
+            else:
+                step = np.sign(np.diff(np.r_[last, c])) * v
+            out = np.cumsum(np.r_[total, np.nan_to_num(step, nan=0.0)])[1:]
+            self._carry[nd] = (c[-1], out[-1]) if len(c) else carry
+            return out
+        if nd.op == "vwap":
+            c, v = args
+            scv, sv = carry if carry is not None else (0.0, 0.0)
+            num = np.cumsum(np.r_[scv, c * v])[1:]
+            den = np.cumsum(np.r_[sv, v])[1:]
+            self._carry[nd] = (num[-1], den[-1]) if len(c) else carry
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return num / den
+        if nd.op in WINDOW_TAIL:
+            k = WINDOW_TAIL[nd.op](**p)
+            tails = carry if carry is not None else [a[:0] for a in args]
+            ext = [np.concatenate([t, a]) for t, a in zip(tails, args)]
+            out = OPS[nd.op](*ext, **p)[len(ext[0]) - len(args[0]):]
+            self._carry[nd] = [e[max(len(e) - k, 0):] if k else e[:0] for e in ext]
+            return out
+        return OPS[nd.op](*args, **p)
+
+    def update(self, bars: pd.DataFrame) -> np.ndarray:
+        """(n_cols, len(bars)) float64 block of the next bars, columns in self.columns order."""
+        n = len(bars)
+        block = np.empty((len(self.columns), n))
+        if n == 0:
+            return block
+        src = {c: bars[c].to_numpy(dtype=np.float64) for c in OHLCV_COLS if c in bars.columns}
+        uses = Counter(i for nd in self._order for i in nd.inputs)
+        values: Dict[Node, np.ndarray] = {}
+        for nd in self._order:
+            if nd.op == "src":
+                val = src[nd.params[0][1]]
+            else:
+                val = self._eval(nd, [values[i] for i in nd.inputs])
+            for j in self._rows.get(nd, ()):
+                block[j] = val
+            for i in nd.inputs:
+                uses[i] -= 1
+                if not uses[i]:
+                    values.pop(i, None)
+            if uses[nd]:
+                values[nd] = val
+        return block
+
+    def frame(self, bars: pd.DataFrame) -> pd.DataFrame:
+        """update() as a frame: bars plus the indicator columns (like compute_indicators)."""
+        block = self.update(bars)
+        data = {c: bars[c] for c in bars.columns if c not in self.columns}
+        data.update(zip(self.columns, block))
+        return pd.DataFrame(data, index=bars.index, copy=False)
+
+# -----------------------------------------------------------------------------
+# Sources
+# -----------------------------------------------------------------------------
+def iter_frame_chunks(df: pd.DataFrame,
+                      chunk_bars: int = BACKTEST_CHUNK_BARS) -> Iterator[pd.DataFrame]:
+    """Blocks of an in-memory frame (tests, or data already loaded)."""
+    if chunk_bars < 1:
+        raise ValueError("chunk_bars must be >= 1")
+    for i in range(0, len(df), chunk_bars):
+        yield df.iloc[i:i + chunk_bars]
+
+def iter_ohlcv_chunks(conn, key: Key, chunk_bars: int = BACKTEST_CHUNK_BARS,
+                      since: Optional[int] = None,
+                      until: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """
+    `ohlcv` rows of a key in ts order, chunk_bars at a time (keyset pagination
+    on the primary key).
+    """
+    if chunk_bars < 1:
+        raise ValueError("chunk_bars must be >= 1")
+    cols = ["ts", *OHLCV_COLS]
+    q = (f"SELECT {','.join(cols)} FROM ohlcv WHERE "
+         + " AND ".join(f"{c}=:{c}" for c in KEY_COLS) + " AND ts > :after"
+         + (" AND ts < :until" if until is not None else "") + " ORDER BY ts LIMIT :limit")
+    p: Dict[str, Any] = {**dict(zip(KEY_COLS, key)), "limit": chunk_bars}
+    if until is not None:
+        p["until"] = until
+    after = -1 if since is None else int(since) - 1
+    while True:
+        rows = conn.execute(text(q), {**p, "after": after}).all()
+        if not rows:
+            return
+        df = pd.DataFrame.from_records(rows, columns=cols)
+        yield df.astype({"ts": "int64", **{c: "float64" for c in OHLCV_COLS}})
+        if len(rows) < chunk_bars:
+            return
+        after = int(df["ts"].iloc[-1])
+
+# -----------------------------------------------------------------------------
+# Backtest
+# -----------------------------------------------------------------------------
+def iter_chunked_backtest(chunks: Iterable[pd.DataFrame], strategy: str = "mean_reversion",
+                          params: Optional[Dict[str, Any]] = None, fee_bps: float = 10.0,
+                          slippage_bps: float = 5.0,
+                          specs: Sequence[IndicatorSpec] = DEFAULT_INDICATORS,
+                          ) -> Iterator[Dict[str, Any]]:
+    """
+    event_backtest(STRATEGY_REGISTRY[strategy](compute_indicators(bars, specs)))
+    one block at a time. Yields per block {"ts", "signal", "equity", "trades",
+    "state"}: the block's bars, their signals and equity, the trades opened in
+    it, and the BacktestState after it.
+    """
+    if strategy not in SIGNAL_LOOKBACK:
+        raise ValueError(f"strategy {strategy!r} cannot run in chunks; "
+                         f"expected one of {sorted(SIGNAL_LOOKBACK)}")
+    params = params or {}
+    ind = ChunkedIndicators(specs)
+    lookback = SIGNAL_LOOKBACK[strategy]
+    state: Optional[BacktestState] = None
+    prev: Optional[pd.DataFrame] = None
+    for bars in chunks:
+        if bars.empty:
+            continue
+        frame = ind.frame(bars.reset_index(drop=True))
+        ctx = frame if prev is None else pd.concat([prev, frame], ignore_index=True)
+        sig = STRATEGY_REGISTRY[strategy](ctx, **params)["signal"].to_numpy()
+        sig = sig[len(ctx) - len(frame):]
+        ts = frame["ts"].to_numpy()
+        _, _, trades, eq, state = event_backtest_resume(frame["close"].to_numpy(), sig, state, ts,
+                                                        fee_bps, slippage_bps)
+        # from ctx, not frame: a block shorter than the lookback keeps older bars
+        prev = ctx.iloc[max(len(ctx) - lookback, 0):]
+        yield {"ts": ts, "signal": sig, "equity": eq, "trades": trades, "state": state}
+
+def chunked_backtest(chunks: Iterable[pd.DataFrame], strategy: str = "mean_reversion",
+                     params: Optional[Dict[str, Any]] = None, fee_bps: float = 10.0,
+                     slippage_bps: float = 5.0,
+                     specs: Sequence[IndicatorSpec] = DEFAULT_INDICATORS) -> Dict[str, Any]:
+    """Run summary of iter_chunked_backtest: the final state plus chunk count and first ts."""
+    state, n_chunks, first_ts = BacktestState(), 0, None
+    for rec in iter_chunked_backtest(chunks, strategy, params, fee_bps, slippage_bps, specs):
+        if first_ts is None:
+            first_ts = int(rec["ts"][0])
+        state, n_chunks = rec["state"], n_chunks + 1
+    return {**state.to_dict(), "first_ts": first_ts, "chunks": n_chunks}
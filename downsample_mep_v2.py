@@ -0,0 +1,102 @@
+# downsample_mep_v2.py
+# Equity-curve reduction for responses and storage.
+#
+#   lttb(y, n_out)          Largest-Triangle-Three-Buckets: keeps the points that
+#                           carry the visual shape (peaks, troughs, slope breaks)
+#   minmax(y, n_out)        min and max of every bucket: exact drawdown envelope
+#   downsample(y, budget)   either of the above -> (bar indices, values)
+#
+# Both always keep the first and last point and return sorted, unique bar
+# indices, so callers can map them to ts. Curves within budget come back whole.
+#
+# Full resolution goes to storage as compressed float32 (encode_curve /
+# decode_curve): bytes are shuffled (all first bytes, then all second bytes,
+# ...) before zlib, which compresses a smooth float curve far better than raw
+# IEEE bytes: a year of 1m equity (~525k points) is ~1 MB instead of ~10 MB
+# of JSON.
+from __future__ import annotations
+
+import os
+import struct
+import zlib
+from typing import Optional, Tuple
+
+import numpy as np
+
+EQUITY_MAX_POINTS = int(os.getenv("EQUITY_MAX_POINTS", "2000"))
+METHODS = ("lttb", "minmax")
+
+def lttb(y: np.ndarray, n_out: int, x: Optional[np.ndarray] = None) -> np.ndarray:
+    """Indices of the n_out points LTTB keeps (x defaults to the bar index)."""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1])[:max(n_out, 0)]
+    x = np.arange(n, dtype=np.float64) if x is None else np.asarray(x, dtype=np.float64)
+    # n_out - 2 buckets between the fixed endpoints
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # average of the next bucket (the last point for the final bucket)
+        nlo, nhi = (hi, edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        # twice the triangle area (a, j, c) for each candidate j
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area)) if np.isfinite(area).any() else lo
+        out[i + 1] = a
+    return out
+
+def minmax(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices of each bucket's min and max, at most n_out points in total."""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 4:  # no room for a bucket between the endpoints
+        return np.array([0, n - 1])[:max(n_out, 0)]
+    nb = max(1, (n_out - 2) // 2)
+    inner = np.arange(1, n - 1)
+    bucket = (inner - 1) * nb // max(n - 2, 1)
+    # per bucket sorted by value: first entry is the min, last the max (NaN sorts last)
+    order = inner[np.lexsort((y[inner], bucket))]
+    b = bucket[order - 1]
+    first = np.r_[True, b[1:] != b[:-1]]
+    last = np.r_[b[1:] != b[:-1], True]
+    return np.unique(np.r_[0, order[first], order[last], n - 1])
+
+def downsample(y: np.ndarray, budget: int = EQUITY_MAX_POINTS,
+               method: str = "lttb") -> Tuple[np.ndarray, np.ndarray]:
+    """(indices, values) of at most `budget` points; budget <= 0 keeps every point."""
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}")
+    y = np.asarray(y)
+    if budget <= 0 or len(y) <= budget:
+        idx = np.arange(len(y))
+    else:
+        idx = lttb(y, budget) if method == "lttb" else minmax(y, budget)
+    return idx, y[idx]
+
+# -----------------------------------------------------------------------------
+# Full-resolution binary (storage)
+# -----------------------------------------------------------------------------
+_MAGIC = b"EQF1"
+
+def encode_curve(y: np.ndarray, level: int = 6) -> bytes:
+    """float32, byte-shuffled, zlib: MAGIC | n (uint64 LE) | payload."""
+    a = np.ascontiguousarray(y, dtype="<f4")
+    shuffled = a.view(np.uint8).reshape(-1, 4).T.tobytes()
+    return _MAGIC + struct.pack("<Q", len(a)) + zlib.compress(shuffled, level)
+
+def decode_curve(blob: bytes) -> np.ndarray:
+    if blob[:4] != _MAGIC:
+        raise ValueError("not an encoded equity curve")
+    (n,) = struct.unpack("<Q", blob[4:12])
+    raw = np.frombuffer(zlib.decompress(blob[12:]), dtype=np.uint8)
+    if len(raw) != 4 * n:
+        raise ValueError("truncated equity curve")
+    return np.ascontiguousarray(raw.reshape(4, n).T).view("<f4").ravel()
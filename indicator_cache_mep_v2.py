@@ -0,0 +1,214 @@
+# indicator_cache_mep_v2.py
+# In-process cache for indicator frames (LRU + byte budget).
+#
+# Key: (tenant, market, symbol, timeframe, precision, first_ts, last_ts,
+# last-bar digest, specs). The digest covers the last bar's OHLCV, so a
+# still-open candle that changed since it was cached is not served stale.
+# When a request brings the same history plus N new bars (same first_ts, the
+# bar before the cached last one found at the same position), the cached frame
+# is extended instead of recomputed:
+#   - recursive indicators (EMA, RSI, MACD, ATR, OBV, VWAP, stochastic) advance
+#     their saved indicators_stream_mep_v2 state over the N bars;
+#   - finite-window indicators recompute only the last N bars plus warm-up.
+# As in indicators_store_mep_v2, the saved state lags one bar behind the cached
+# frame's last bar, which is recomputed on extension (the open candle).
+# Specs that can be neither (adx, dema, tema, ichimoku's forward shift) make
+# the request a plain miss.
+#
+# Cached frames are shared between callers: treat them as read-only.
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from prometheus_client import Counter, Gauge
+
+from indicators_mep_v2 import (
+    OHLCV_COLS,
+    WINDOW_WARMUP,
+    IndicatorSpec,
+    compute_block,
+    compute_indicators,
+    to_precision,
+)
+from indicators_stream_mep_v2 import STREAM_REGISTRY
+
+CACHE_HITS = Counter("mep_indicator_cache_hits", "Indicator cache exact hits.")
+CACHE_MISSES = Counter("mep_indicator_cache_misses", "Indicator cache misses (full compute).")
+CACHE_EXTENDS = Counter("mep_indicator_cache_extends",
+                        "Indicator cache hits extended with new bars.")
+CACHE_EVICTIONS = Counter("mep_indicator_cache_evictions", "Indicator cache entries evicted.")
+CACHE_BYTES = Gauge("mep_indicator_cache_bytes", "Bytes held by the indicator cache.")
+CACHE_ENTRIES = Gauge("mep_indicator_cache_entries", "Entries held by the indicator cache.")
+
+Key = Tuple[Any, ...]
+
+@dataclass
+class _Entry:
+    frame: pd.DataFrame
+    states: Dict[IndicatorSpec, Any]  # as of the frame's second-to-last bar
+    state_ts: Optional[int]            # that bar's ts (None: single-bar frame)
+    nbytes: int
+
+def _frame_bytes(frame: pd.DataFrame) -> int:
+    return int(frame.memory_usage(index=True, deep=False).sum())
+
+def _last_bar_digest(df: pd.DataFrame) -> str:
+    last = np.array([df[c].iat[-1] for c in OHLCV_COLS if c in df.columns], dtype=np.float64)
+    return hashlib.blake2b(last.tobytes(), digest_size=8).hexdigest()
+
+def _extendable(specs: Sequence[IndicatorSpec]) -> bool:
+    return all(s.name in STREAM_REGISTRY or s.name in WINDOW_WARMUP for s in specs)
+
+class IndicatorCache:
+    def __init__(self, max_entries: int = 256, max_bytes: int = 256 * 2**20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Key, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.extends = self.evictions = 0
+
+    # ---------- public ----------
+    def get_or_compute(self, df: pd.DataFrame, specs: Sequence[IndicatorSpec], *, tenant_id: str,
+                       market: str, symbol: str, timeframe: str,
+                       precision: str = "float64") -> pd.DataFrame:
+        specs = tuple(specs)
+        df = to_precision(df, precision)
+        if df.empty:
+            return compute_indicators(df, specs, precision)
+        ts = df["ts"].to_numpy()
+        prefix = (tenant_id, market.lower(), symbol.upper(), timeframe, precision, int(ts[0]))
+        key = prefix + (int(ts[-1]), _last_bar_digest(df), specs)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and len(entry.frame) == len(df):
+                self._entries.move_to_end(key)
+                self.hits += 1; CACHE_HITS.inc()
+                return entry.frame
+            base_key, base = self._find_prefix(prefix, specs, ts)
+            if base is not None:
+                # take it out while extending; it comes back under the new key
+                self._pop(base_key)
+
+        if base is not None:
+            frame, states = self._extend(base, df, specs)
+        else:
+            frame = compute_indicators(df, specs, precision)
+            states = self._seed_states(df.iloc[:-1], specs)
+        state_ts = int(ts[-2]) if len(ts) > 1 else None
+
+        with self._lock:
+            if base is not None:
+                self.extends += 1; CACHE_EXTENDS.inc()
+            else:
+                self.misses += 1; CACHE_MISSES.inc()
+            self._put(key, _Entry(frame, states, state_ts, _frame_bytes(frame)))
+        return frame
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._sync_gauges()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits,
+                    "misses": self.misses, "extends": self.extends, "evictions": self.evictions}
+
+    # ---------- internals ----------
+    def _find_prefix(self, prefix: Key, specs: Tuple[IndicatorSpec, ...],
+                     ts: np.ndarray) -> Tuple[Optional[Key], Optional[_Entry]]:
+        if not _extendable(specs):
+            return None, None
+        best_key, best = None, None
+        for k, e in self._entries.items():
+            if k[:6] != prefix or k[8] != specs:
+                continue
+            n = len(e.frame)
+            # same bars up to the saved state; the cached last bar (maybe changed) is recomputed
+            same_head = n == 1 or int(ts[n-2]) == e.state_ts
+            if n <= len(ts) and same_head and (best is None or n > len(best.frame)):
+                best_key, best = k, e
+        return best_key, best
+
+    @staticmethod
+    def _seed_states(df: pd.DataFrame, specs: Sequence[IndicatorSpec]) -> Dict[IndicatorSpec, Any]:
+        if not _extendable(specs):
+            return {}
+        return {s: STREAM_REGISTRY[s.name].from_history(df, **s.kwargs)
+                for s in specs if s.name in STREAM_REGISTRY}
+
+    @staticmethod
+    def _extend(base: _Entry, df: pd.DataFrame,
+                specs: Sequence[IndicatorSpec]) -> Tuple[pd.DataFrame, Dict[IndicatorSpec, Any]]:
+        """(frame, states as of df's second-to-last bar); base.states are advanced in place."""
+        n_old = len(base.frame) - 1   # rows the saved states cover
+        new = df.iloc[n_old:]
+        n_new = len(new)
+        cols: Dict[str, np.ndarray] = {}
+        snapshot: Dict[IndicatorSpec, Any] = {}
+        rows = None
+        for spec in specs:
+            names = spec.columns()
+            if spec.name in STREAM_REGISTRY:
+                if rows is None:
+                    rows = new.to_dict("records")
+                st = base.states[spec]
+                vals = []
+                for i, r in enumerate(rows):
+                    if i == n_new - 1:
+                        snapshot[spec] = type(st).load(st.dump())
+                    vals.append(np.atleast_1d(st.update(r)))
+                cols.update(zip(names, np.array(vals, dtype=np.float64).T))
+            else:
+                warm = WINDOW_WARMUP[spec.name](**spec.kwargs)
+                tail = df.iloc[max(0, n_old - warm + 1):]
+                _, block = compute_block(tail, [spec])
+                cols.update(zip(names, block[:, -n_new:]))
+        data = {c: new[c] for c in new.columns if c not in cols}
+        data.update(cols)
+        # keep the cached frame's dtypes (compact entries stay float32)
+        ext = pd.DataFrame(data, index=new.index)[list(base.frame.columns)]
+        ext = ext.astype(base.frame.dtypes.to_dict())
+        return pd.concat([base.frame.iloc[:n_old], ext]), snapshot
+
+    def _pop(self, key: Key) -> None:
+        e = self._entries.pop(key)
+        self._bytes -= e.nbytes
+        self._sync_gauges()
+
+    def _put(self, key: Key, entry: _Entry) -> None:
+        if key in self._entries:
+            self._pop(key)
+        self._entries[key] = entry
+        self._bytes += entry.nbytes
+        while self._entries and (len(self._entries) > self.max_entries
+                                 or self._bytes > self.max_bytes):
+            _, old = self._entries.popitem(last=False)
+            self._bytes -= old.nbytes
+            self.evictions += 1; CACHE_EVICTIONS.inc()
+        self._sync_gauges()
+
+    def _sync_gauges(self) -> None:
+        CACHE_BYTES.set(self._bytes)
+        CACHE_ENTRIES.set(len(self._entries))
+
+INDICATOR_CACHE = IndicatorCache(
+    max_entries=int(os.getenv("INDICATOR_CACHE_MAX_ENTRIES", "256")),
+    max_bytes=int(os.getenv("INDICATOR_CACHE_MAX_MB", "256")) * 2**20,
+)
+
+def cached_indicators(df: pd.DataFrame, specs: Sequence[IndicatorSpec], *,
+                      tenant_id: str = "default", market: str = "binance", symbol: str,
+                      timeframe: str, precision: str = "float64") -> pd.DataFrame:
+    return INDICATOR_CACHE.get_or_compute(df, specs, tenant_id=tenant_id, market=market,
+                                          symbol=symbol, timeframe=timeframe, precision=precision)
@@ -0,0 +1,75 @@
+# indicators_batch_mep_v2.py
+# Universe-wide indicators: one (n_symbols, n_bars) matrix per OHLCV field,
+# aligned on a common ts grid with NaN padding, every indicator computed along
+# axis 1 for all symbols at once.
+#
+#   bars = align_ohlcv({"BTCUSDT": df_btc, "ETHUSDT": df_eth, ...})
+#   out = compute_batch(bars, DEFAULT_INDICATORS)   # {"rsi": (S, T), ...}
+#
+# Leading/trailing padding behaves as if each symbol were computed on its own
+# frame (outputs are NaN where a symbol has no bar). Gaps inside a symbol's
+# range are treated as missing bars, like a NaN row in the per-symbol frame.
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from indicators_mep_v2 import OHLCV_COLS, IndicatorSpec, evaluate_plan
+
+
+@dataclass(frozen=True)
+class UniverseBars:
+    symbols: List[str]
+    ts: np.ndarray                    # (n_bars,) int64 epoch ms
+    fields: Dict[str, np.ndarray]     # field -> (n_symbols, n_bars) float64
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.symbols), len(self.ts)
+
+def align_ohlcv(frames: Mapping[str, pd.DataFrame]) -> UniverseBars:
+    symbols = list(frames)
+    ts_all = [f["ts"].to_numpy(dtype=np.int64) for f in frames.values()]
+    grid = np.unique(np.concatenate(ts_all)) if ts_all else np.empty(0, dtype=np.int64)
+    fields = {c: np.full((len(symbols), len(grid)), np.nan) for c in OHLCV_COLS}
+    for i, (f, ts) in enumerate(zip(frames.values(), ts_all)):
+        pos = np.searchsorted(grid, ts)
+        for c in OHLCV_COLS:
+            if c in f.columns:
+                fields[c][i, pos] = f[c].to_numpy(dtype=np.float64)
+    return UniverseBars(symbols, grid, fields)
+
+# -------------------------------
+# Batch plan
+# -------------------------------
+# The indicator graph of indicators_mep_v2 runs as is: its ops work along the
+# last axis, so every node is one call over all symbols. Each row is first
+# rotated so the symbol's first bar sits in column 0 (its leading padding moves
+# behind the trailing one); the causal ops then see exactly the per-symbol
+# series, and the result is rotated back.
+
+def compute_batch_block(bars: UniverseBars,
+                        specs: Sequence[IndicatorSpec]) -> Tuple[List[str], np.ndarray]:
+    """
+    Run the plan for the whole universe into one (n_cols, n_symbols, n_bars)
+    float64 block; positions where a symbol has no bar are NaN.
+    """
+    n_sym, n = bars.shape
+    present = ~np.isnan(bars.fields["close"])
+    first = np.where(present.any(axis=1), present.argmax(axis=1), 0)
+    rows = np.arange(n_sym)[:, None]
+    rot = (np.arange(n) + first[:, None]) % max(n, 1)
+    src = {c: f[rows, rot] for c, f in bars.fields.items()}
+    cols, block = evaluate_plan(src, specs, bars.shape)
+    if not block.size:
+        return cols, block
+    block = block[:, rows, (np.arange(n) - first[:, None]) % n]
+    block[:, ~present] = np.nan
+    return cols, block
+
+def compute_batch(bars: UniverseBars, specs: Sequence[IndicatorSpec]) -> Dict[str, np.ndarray]:
+    cols, block = compute_batch_block(bars, specs)
+    return dict(zip(cols, block))
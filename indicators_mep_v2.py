@@ -1,204 +1,534 @@
+import math
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Sequence, Tuple
+
 import numpy as np
 import pandas as pd
-import math
+
+import kernels_mep_v2 as kernels
+
+OHLCV_COLS = ("open", "high", "low", "close", "volume")
+PRICE_COLS = ("open", "high", "low", "close")
+
+# -------------------------------
+# Storage precision
+# -------------------------------
+# "compact" (alias "float32") stores prices and indicator columns as float32,
+# half the memory of the default "float64". Ops always run on float64 views of
+# the inputs, so only the stored result is rounded. Volume and the running
+# accumulations (OBV, VWAP cumsums) stay float64 in every mode: a float32
+# cumsum of volume loses whole bars' worth of volume once it passes ~1e7.
+
+PRECISIONS: Dict[str, Any] = {"float64": np.float64, "float32": np.float32, "compact": np.float32}
+ACCUMULATING = frozenset({"obv", "vwap"})
+
+def precision_dtype(precision: str = "float64") -> np.dtype:
+    try:
+        return np.dtype(PRECISIONS[precision])
+    except KeyError:
+        raise ValueError(f"unknown precision '{precision}' "
+                         f"(expected one of {sorted(PRECISIONS)})") from None
+
+def to_precision(df: pd.DataFrame, precision: str = "float64") -> pd.DataFrame:
+    """Compact mode: cast the price columns present in df to float32. float64 is a no-op."""
+    dtype = precision_dtype(precision)
+    if dtype == np.float64:
+        return df
+    cols = {c: dtype for c in PRICE_COLS if c in df.columns and df[c].dtype != dtype}
+    return df.astype(cols) if cols else df
 
 # -------------------------------
 # Helpers
 # -------------------------------
 
+# Every op works along the last axis: a 1-D series, or a (n_symbols, n_bars)
+# matrix (indicators_batch_mep_v2) computed row by row in one call.
+
+def _by_time(x: np.ndarray):
+    # pandas object with time down the index: a Series, or one column per row of x
+    return pd.Series(x) if x.ndim == 1 else pd.DataFrame(x.T)
+
+def _values(obj, x: np.ndarray) -> np.ndarray:
+    # inverse of _by_time for a result computed on it
+    a = obj.to_numpy()
+    return a if x.ndim == 1 else a.T
+
 def _ema(arr: np.ndarray, span: int) -> np.ndarray:
-    return pd.Series(arr).ewm(span=span, adjust=False).mean().to_numpy()
+    return _values(_by_time(arr).ewm(span=span, adjust=False).mean(), arr)
+
+def _true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    prev_close = np.empty_like(close)
+    prev_close[..., 1:] = close[..., :-1]
+    prev_close[..., :1] = close[..., :1]
+    return np.maximum.reduce([high - low, np.abs(high - prev_close), np.abs(low - prev_close)])
+
+# -------------------------------
+# Indicator graph
+# -------------------------------
+# Indicators are declared as expressions over shared nodes, e.g.
+#     dema(span) = 2*ema(close, span) - ema(ema(close, span), span)
+# A Node is a hashable (op, inputs, params) tuple, so an intermediate asked
+# for by several indicators (ema(close, 12) in macd and ema12, typical price in
+# cci and mfi, true range in atr and adx, sma(close, 20) as sma20 and bb_mid)
+# is one node and is evaluated once per plan: cost scales with the number of
+# unique nodes, not with the number of requested indicators.
+
+class Node(NamedTuple):
+    op: str
+    inputs: Tuple["Node", ...] = ()
+    params: Tuple[Tuple[str, Any], ...] = ()
+
+def node(op: str, *inputs: Node, **params: Any) -> Node:
+    return Node(op, inputs, tuple(sorted(params.items())))
+
+CLOSE, HIGH, LOW, VOLUME = (node("src", field=f) for f in ("close", "high", "low", "volume"))
+
+# -------------------------------
+# Ops
+# -------------------------------
+# op(*input arrays, **params) -> new float64 array; ops never write into
+# their inputs (a node's value is shared by all of its consumers).
+
+def _shift(x: np.ndarray, periods: int) -> np.ndarray:
+    return _values(_by_time(x).shift(periods), x)
+
+def _delta(x: np.ndarray) -> np.ndarray:
+    # first bar has no previous value: delta 0
+    return np.diff(x, axis=-1, prepend=x[..., :1])
+
+def _up_move(x: np.ndarray) -> np.ndarray:
+    return np.clip(np.diff(x, axis=-1, prepend=np.full(x.shape[:-1] + (1,), np.nan)), 0, None)
+
+def _rolling(x: np.ndarray, period: int, how: str, **kw: Any) -> np.ndarray:
+    return _values(getattr(_by_time(x).rolling(period), how)(**kw), x)
+
+def _rsi(roll_up: np.ndarray, roll_down: np.ndarray) -> np.ndarray:
+    rs = np.divide(roll_up, np.where(roll_down==0, np.nan, roll_down))
+    return np.nan_to_num(100 - (100 / (1 + rs)), nan=50.0)
+
+def _stoch_k(close: np.ndarray, low_min: np.ndarray, high_max: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100 * (close - low_min) / (high_max - low_min)
+
+def _cci(tp: np.ndarray, ma: np.ndarray, md: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (tp - ma) / (0.015 * md)
+
+def _dx(plus_s: np.ndarray, minus_s: np.ndarray, atr: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        plus_di = 100 * (plus_s / atr)
+        minus_di = 100 * (minus_s / atr)
+        return (np.abs(plus_di - minus_di) / (plus_di + minus_di)) * 100
+
+def _obv(close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    step = np.zeros_like(close)
+    step[..., 1:] = np.sign(np.diff(close, axis=-1)) * volume[..., 1:]
+    return np.cumsum(np.nan_to_num(step, nan=0.0), axis=-1)
+
+def _vwap(close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.cumsum(close * volume, axis=-1) / np.cumsum(volume, axis=-1)
+
+def _mfi(tp: np.ndarray, volume: np.ndarray, period: int) -> np.ndarray:
+    x, tp = tp, _by_time(tp)
+    mf = tp * _by_time(volume)
+    pos_mf = mf.where(tp > tp.shift(1), 0.0)
+    neg_mf = mf.where(tp < tp.shift(1), 0.0)
+    mr = pos_mf.rolling(period).sum() / neg_mf.rolling(period).sum()
+    return _values(100 - (100 / (1 + mr)), x)
+
+OPS: Dict[str, Callable[..., np.ndarray]] = {
+    "ema": _ema,
+    "ewm": lambda x, alpha, adjust=False: _values(
+        _by_time(x).ewm(alpha=alpha, adjust=adjust).mean(), x),
+    "sma": lambda x, period: _rolling(x, period, "mean"),
+    "std": lambda x, period: _rolling(x, period, "std", ddof=0),
+    "max": lambda x, period: _rolling(x, period, "max"),
+    "min": lambda x, period: _rolling(x, period, "min"),
+    "wma": lambda x, period: kernels.wma(x, period),
+    "mean_dev": lambda x, center, period: kernels.mean_deviation(x, period, center),
+    "shift": _shift,
+    "delta": _delta,
+    "gain": lambda d: np.where(d > 0, d, 0.0),
+    "loss": lambda d: np.where(d < 0, -d, 0.0),
+    "up_move": _up_move,
+    "tp": kernels.typical_price,
+    "tr": _true_range,
+    "sub": np.subtract,
+    "mid": lambda a, b: (a + b) / 2,
+    "band": lambda mid, std, k: mid + k*std,
+    "dema": lambda e1, e2: 2*e1 - e2,
+    "tema": lambda e1, e2, e3: 3*(e1 - e2) + e3,
+    "neg": np.negative,
+    "rsi": _rsi,
+    "stoch_k": _stoch_k,
+    "cci": _cci,
+    "dx": _dx,
+    "obv": _obv,
+    "vwap": _vwap,
+    "mfi": _mfi,
+}
+
+# -------------------------------
+# Indicator definitions
+# -------------------------------
+# name(**params) -> one output node per column, in column order
+
+Outputs = Tuple[Node, ...]
+
+def _ema_chain(span: int, depth: int) -> List[Node]:
+    chain = [node("ema", CLOSE, span=span)]
+    while len(chain) < depth:
+        chain.append(node("ema", chain[-1], span=span))
+    return chain
+
+def _g_dema(span: int = 20) -> Outputs:
+    return (node("dema", *_ema_chain(span, 2)),)
+
+def _g_tema(span: int = 20) -> Outputs:
+    return (node("tema", *_ema_chain(span, 3)),)
+
+def _g_rsi(period: int = 14) -> Outputs:
+    delta = node("delta", CLOSE)
+    roll_up = node("ewm", node("gain", delta), alpha=1/period)
+    roll_down = node("ewm", node("loss", delta), alpha=1/period)
+    return (node("rsi", roll_up, roll_down),)
+
+def _g_stochastic(k_period: int = 14, d_period: int = 3) -> Outputs:
+    lo, hi = node("min", LOW, period=k_period), node("max", HIGH, period=k_period)
+    k = node("stoch_k", CLOSE, lo, hi)
+    return k, node("sma", k, period=d_period)
+
+def _g_cci(period: int = 20) -> Outputs:
+    tp = node("tp", HIGH, LOW, CLOSE)
+    ma = node("sma", tp, period=period)
+    return (node("cci", tp, ma, node("mean_dev", tp, ma, period=period)),)
+
+def _g_adx(period: int = 14) -> Outputs:
+    # shares atr's true-range node, whose first bar measures against close[0]
+    # (the standalone adx used high - low there), so the first TR differs when
+    # close[0] lies outside [low[0], high[0]]; atr cancels out of dx, so adx
+    # itself only moves by rounding
+    atr = node("sma", node("tr", HIGH, LOW, CLOSE), period=period)
+    plus_s = node("ewm", node("up_move", HIGH), alpha=1/period, adjust=True)
+    minus_s = node("ewm", node("neg", node("up_move", LOW)), alpha=1/period, adjust=True)
+    return (node("ewm", node("dx", plus_s, minus_s, atr), alpha=1/period, adjust=True),)
+
+def _g_macd(fast: int = 12, slow: int = 26, signal: int = 9) -> Outputs:
+    line = node("sub", node("ema", CLOSE, span=fast), node("ema", CLOSE, span=slow))
+    sig = node("ema", line, span=signal)
+    return line, sig, node("sub", line, sig)
+
+def _g_bollinger(period: int = 20, k: float = 2.0) -> Outputs:
+    mid = node("sma", CLOSE, period=period)
+    std = node("std", CLOSE, period=period)
+    return mid, node("band", mid, std, k=k), node("band", mid, std, k=-k)
+
+def _g_ichimoku() -> Outputs:
+    def hl(period: int) -> Node:
+        return node("mid", node("max", HIGH, period=period), node("min", LOW, period=period))
+    tenkan, kijun = hl(9), hl(26)
+    return (tenkan, kijun,
+            node("shift", node("mid", tenkan, kijun), periods=26),
+            node("shift", hl(52), periods=26),
+            node("shift", CLOSE, periods=-26))
+
+def _names(*cols: str, **defaults: Any) -> Callable[..., List[str]]:
+    """
+    Column names of an indicator whose names do not already carry its params:
+    `cols` at the defaults, otherwise suffixed with every param value in
+    signature order (rsi period=7 -> rsi_7, macd 8/21/5 -> macd_8_21_5, ...).
+    """
+    def columns(**params: Any) -> List[str]:
+        unknown = set(params) - set(defaults)
+        if unknown:
+            raise TypeError(f"unexpected params {sorted(unknown)}")
+        vals = {**defaults, **params}
+        if vals == defaults:
+            return list(cols)
+        suffix = "_".join(f"{v:g}" if isinstance(v, float) else str(v) for v in vals.values())
+        return [f"{c}_{suffix}" for c in cols]
+    return columns
+
+# name -> (output nodes for the given params, output column names for the given params)
+INDICATOR_REGISTRY: Dict[str, Tuple[Callable[..., Outputs], Callable[..., List[str]]]] = {
+    "sma": (lambda period=20: (node("sma", CLOSE, period=period),),
+            lambda period=20: [f"sma{period}"]),
+    "ema": (lambda span=20: (node("ema", CLOSE, span=span),), lambda span=20: [f"ema{span}"]),
+    "wma": (lambda period=20: (node("wma", CLOSE, period=period),),
+            lambda period=20: [f"wma{period}"]),
+    "dema": (_g_dema, lambda span=20: [f"dema{span}"]),
+    "tema": (_g_tema, lambda span=20: [f"tema{span}"]),
+    "trima": (lambda period=20: (node("sma", node("sma", CLOSE, period=period), period=period),),
+              lambda period=20: [f"trima{period}"]),
+    "rsi": (_g_rsi, _names("rsi", period=14)),
+    "stochastic": (_g_stochastic, _names("stoch_k", "stoch_d", k_period=14, d_period=3)),
+    "cci": (_g_cci, _names("cci", period=20)),
+    "adx": (_g_adx, _names("adx", period=14)),
+    "macd": (_g_macd, _names("macd", "macd_signal", "macd_hist", fast=12, slow=26, signal=9)),
+    "atr": (lambda period=14: (node("ewm", node("tr", HIGH, LOW, CLOSE), alpha=1/period),),
+            _names("atr", period=14)),
+    "bollinger": (_g_bollinger, _names("bb_mid", "bb_up", "bb_low", period=20, k=2.0)),
+    "obv": (lambda: (node("obv", CLOSE, VOLUME),), lambda: ["obv"]),
+    "vwap": (lambda: (node("vwap", CLOSE, VOLUME),), lambda: ["vwap"]),
+    "mfi": (lambda period=14: (node("mfi", node("tp", HIGH, LOW, CLOSE), VOLUME, period=period),),
+            _names("mfi", period=14)),
+    "ichimoku": (_g_ichimoku, lambda: ["ichimoku_tenkan", "ichimoku_kijun", "ichimoku_span_a",
+                                       "ichimoku_span_b", "ichimoku_chikou"]),
+}
+
+# -------------------------------
+# Indicator plan
+# -------------------------------
+
+# bars of history a finite-window indicator needs before the first new bar
+# (incremental updates recompute only the new bars plus this warm-up)
+WINDOW_WARMUP: Dict[str, Callable[..., int]] = {
+    "sma": lambda period=20: period,
+    "wma": lambda period=20: period,
+    "trima": lambda period=20: 2*period - 1,
+    "bollinger": lambda period=20, k=2.0: period,
+    "cci": lambda period=20: period,
+    "mfi": lambda period=14: period + 1,
+}
+
+@dataclass(frozen=True)
+class IndicatorSpec:
+    name: str
+    params: Tuple[Tuple[str, Any], ...] = ()
+
+    @classmethod
+    def of(cls, name: str, **params: Any) -> "IndicatorSpec":
+        if name not in INDICATOR_REGISTRY:
+            raise ValueError(f"unknown indicator '{name}'")
+        return cls(name, tuple(sorted(params.items())))
+
+    @classmethod
+    def parse(cls, obj: Any) -> "IndicatorSpec":
+        """
+        Spec from a JSON-ish value: "rsi" or {"name": "ema", "params": {"span": 50}}.
+        Unknown names or parameters raise ValueError.
+        """
+        if isinstance(obj, str):
+            name, params = obj, {}
+        elif isinstance(obj, dict) and isinstance(obj.get("name"), str):
+            name, params = obj["name"], obj.get("params") or {}
+        else:
+            raise ValueError(f"invalid indicator spec {obj!r}")
+        if not isinstance(params, dict):
+            raise ValueError(f"params of '{name}' must be an object")
+        spec = cls.of(name, **params)
+        try:
+            spec.columns()
+        except TypeError as e:
+            raise ValueError(f"bad params for '{name}': {e}") from None
+        return spec
+
+    @property
+    def kwargs(self) -> Dict[str, Any]:
+        return dict(self.params)
+
+    def columns(self) -> List[str]:
+        return INDICATOR_REGISTRY[self.name][1](**self.kwargs)
+
+    def nodes(self) -> Outputs:
+        return INDICATOR_REGISTRY[self.name][0](**self.kwargs)
+
+def plan_columns(specs: Iterable[IndicatorSpec]) -> List[str]:
+    """Output columns in spec order; two different specs writing one column raise ValueError."""
+    cols: List[str] = []
+    owner: Dict[str, IndicatorSpec] = {}
+    for spec in specs:
+        for c in spec.columns():
+            if owner.setdefault(c, spec) != spec:
+                raise ValueError(f"indicators {owner[c]} and {spec} both write column '{c}'")
+            cols.append(c)
+    return cols
+
+def plan_nodes(specs: Iterable[IndicatorSpec]) -> List[Node]:
+    """Unique nodes the plan evaluates, every node after its inputs."""
+    order: List[Node] = []
+    seen = set()
+    def visit(n: Node) -> None:
+        if n in seen:
+            return
+        seen.add(n)
+        for i in n.inputs:
+            visit(i)
+        order.append(n)
+    for spec in specs:
+        for out in spec.nodes():
+            visit(out)
+    return order
+
+def compute_block(df: pd.DataFrame, specs: Sequence[IndicatorSpec],
+                  dtype: Any = np.float64) -> Tuple[List[str], np.ndarray]:
+    """
+    Run the plan into one preallocated (n_cols, n_bars) block of `dtype`
+    (float64 by default). Column j of the result frame is row j of the block.
+    """
+    src = {c: df[c].to_numpy(dtype=np.float64) for c in OHLCV_COLS if c in df.columns}
+    return evaluate_plan(src, specs, (len(df),), dtype)
+
+def evaluate_plan(src: Dict[str, np.ndarray], specs: Sequence[IndicatorSpec],
+                  shape: Tuple[int, ...], dtype: Any = np.float64) -> Tuple[List[str], np.ndarray]:
+    """
+    The plan over float64 field arrays of `shape` (time on the last axis) into
+    one (n_cols, *shape) block of `dtype`.
+    """
+    cols = plan_columns(specs)
+    block = np.empty((len(cols),) + tuple(shape), dtype=dtype)
+    if block.size:
+        _run_plan(src, specs, block)
+    return cols, block
+
+def _run_plan(src: Dict[str, np.ndarray], specs: Sequence[IndicatorSpec],
+              targets: Sequence[np.ndarray]) -> None:
+    """Evaluate every plan node once; output j is written (and cast) into targets[j]."""
+    outputs = [out for spec in specs for out in spec.nodes()]
+    rows: Dict[Node, List[int]] = {}
+    for j, out in enumerate(outputs):
+        rows.setdefault(out, []).append(j)
+    order = plan_nodes(specs)
+    # each value is dropped as soon as its last consumer has run
+    uses = Counter(i for nd in order for i in nd.inputs)
+    values: Dict[Node, np.ndarray] = {}
+    for nd in order:
+        if nd.op == "src":
+            val = src[nd.params[0][1]]
+        else:
+            val = OPS[nd.op](*(values[i] for i in nd.inputs), **dict(nd.params))
+        for j in rows.get(nd, ()):
+            targets[j][...] = val
+        for i in nd.inputs:
+            uses[i] -= 1
+            if not uses[i]:
+                values.pop(i, None)
+        if uses[nd]:
+            values[nd] = val
+
+def compute_indicators(df: pd.DataFrame, specs: Sequence[IndicatorSpec],
+                       precision: str = "float64") -> pd.DataFrame:
+    dtype = precision_dtype(precision)
+    if dtype == np.float64:
+        cols, block = compute_block(df, specs)
+        computed = dict(zip(cols, block))
+    else:
+        # compact: one plan, accumulating indicators emitted into their own float64 block
+        df = to_precision(df, precision)
+        cols = plan_columns(specs)
+        wide = [s.name in ACCUMULATING for s in specs for _ in s.columns()]
+        narrow_block = np.empty((wide.count(False), len(df)), dtype=dtype)
+        wide_block = np.empty((wide.count(True), len(df)))
+        narrow_rows, wide_rows = iter(narrow_block), iter(wide_block)
+        targets = [next(wide_rows) if w else next(narrow_rows) for w in wide]
+        if len(df):
+            src = {c: df[c].to_numpy(dtype=np.float64) for c in OHLCV_COLS if c in df.columns}
+            _run_plan(src, specs, targets)
+        computed = dict(zip(cols, targets))
+    # hand the block rows to pandas as-is: no consolidation, no second copy
+    data = {c: df[c] for c in df.columns if c not in cols}
+    data.update((c, computed[c]) for c in cols)
+    return pd.DataFrame(data, index=df.index, copy=False)
+
+def _single(df: pd.DataFrame, name: str, **params: Any) -> pd.DataFrame:
+    """One indicator under its historical column names ("rsi" whatever the period)."""
+    spec = IndicatorSpec.of(name, **params)
+    out = compute_indicators(df, [spec])
+    names, plain = spec.columns(), IndicatorSpec.of(name).columns()
+    if names == plain:
+        return out
+    # the new values replace a plain column the frame already has, as before
+    out = out.drop(columns=[c for c in plain if c in out.columns])
+    return out.rename(columns=dict(zip(names, plain)))
 
 # -------------------------------
 # Moving Averages
 # -------------------------------
 
 def sma(df: pd.DataFrame, period: int = 20) -> pd.DataFrame:
-    out = df.copy()
-    out[f"sma{period}"] = df["close"].rolling(period).mean()
-    return out
+    return compute_indicators(df, [IndicatorSpec.of("sma", period=period)])
 
 def ema(df: pd.DataFrame, span: int = 20) -> pd.DataFrame:
-    out = df.copy()
-    out[f"ema{span}"] = _ema(out["close"].to_numpy(), span)
-    return out
+    return compute_indicators(df, [IndicatorSpec.of("ema", span=span)])
 
 def wma(df: pd.DataFrame, period: int = 20) -> pd.DataFrame:
-    weights = np.arange(1, period+1)
-    out = df.copy()
-    out[f"wma{period}"] = (
-        df["close"].rolling(period).apply(lambda x: np.dot(x, weights)/weights.sum(), raw=True)
-    )
-    return out
+    return compute_indicators(df, [IndicatorSpec.of("wma", period=period)])
 
 def dema(df: pd.DataFrame, span: int = 20) -> pd.DataFrame:
-    ema1 = pd.Series(df["close"]).ewm(span=span, adjust=False).mean()
-    ema2 = ema1.ewm(span=span, adjust=False).mean()
-    out = df.copy()
-    out[f"dema{span}"] = 2*ema1 - ema2
-    return out
+    return compute_indicators(df, [IndicatorSpec.of("dema", span=span)])
 
 def tema(df: pd.DataFrame, span: int = 20) -> pd.DataFrame:
-    ema1 = pd.Series(df["close"]).ewm(span=span, adjust=False).mean()
-    ema2 = ema1.ewm(span=span, adjust=False).mean()
-    ema3 = ema2.ewm(span=span, adjust=False).mean()
-    out = df.copy()
-    out[f"tema{span}"] = 3*(ema1 - ema2) + ema3
-    return out
+    return compute_indicators(df, [IndicatorSpec.of("tema", span=span)])
 
 def trima(df: pd.DataFrame, period: int = 20) -> pd.DataFrame:
-    out = df.copy()
-    out[f"trima{period}"] = df["close"].rolling(period).mean().rolling(period).mean()
-    return out
+    return compute_indicators(df, [IndicatorSpec.of("trima", period=period)])
 
 # -------------------------------
 # Oscillators
 # -------------------------------
 
 def rsi(df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
-    close = df["close"].to_numpy()
-    delta = np.diff(close, prepend=close[0])
-    up = np.where(delta > 0, delta, 0.0)
-    down = np.where(delta < 0, -delta, 0.0)
-    roll_up = pd.Series(up).ewm(alpha=1/period, adjust=False).mean().to_numpy()
-    roll_down = pd.Series(down).ewm(alpha=1/period, adjust=False).mean().to_numpy()
-    rs = np.divide(roll_up, np.where(roll_down==0, np.nan, roll_down))
-    rsi = 100 - (100 / (1 + rs))
-    out = df.copy()
-    out["rsi"] = np.nan_to_num(rsi, nan=50.0)
-    return out
+    return _single(df, "rsi", period=period)
 
 def stochastic(df: pd.DataFrame, k_period: int = 14, d_period: int = 3) -> pd.DataFrame:
-    low_min = df["low"].rolling(window=k_period).min()
-    high_max = df["high"].rolling(window=k_period).max()
-    k = 100 * (df["close"] - low_min) / (high_max - low_min)
-    d = k.rolling(window=d_period).mean()
-    out = df.copy()
-    out["stoch_k"] = k
-    out["stoch_d"] = d
-    return out
+    return _single(df, "stochastic", k_period=k_period, d_period=d_period)
 
 def cci(df: pd.DataFrame, period: int = 20) -> pd.DataFrame:
-    tp = (df["high"] + df["low"] + df["close"]) / 3
-    ma = tp.rolling(period).mean()
-    md = (tp - ma).abs().rolling(period).mean()
-    cci = (tp - ma) / (0.015 * md)
-    out = df.copy()
-    out["cci"] = cci
-    return out
+    return _single(df, "cci", period=period)
 
 def adx(df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
-    high, low, close = df["high"], df["low"], df["close"]
-    plus_dm = high.diff().clip(lower=0)
-    minus_dm = -low.diff().clip(lower=0)
-    tr = pd.concat([(high-low), (high-close.shift()).abs(), (low-close.shift()).abs()], axis=1).max(axis=1)
-    atr = tr.rolling(period).mean()
-    plus_di = 100 * (plus_dm.ewm(alpha=1/period).mean() / atr)
-    minus_di = 100 * (minus_dm.ewm(alpha=1/period).mean() / atr)
-    dx = (abs(plus_di - minus_di) / (plus_di + minus_di)) * 100
-    adx = dx.ewm(alpha=1/period).mean()
-    out = df.copy()
-    out["adx"] = adx
-    return out
+    return _single(df, "adx", period=period)
 
 # -------------------------------
 # Trend / Volatility
 # -------------------------------
 
 def macd(df: pd.DataFrame, fast: int = 12, slow: int = 26, signal: int = 9) -> pd.DataFrame:
-    fast_ = _ema(df["close"].to_numpy(), fast)
-    slow_ = _ema(df["close"].to_numpy(), slow)
-    macd_line = fast_ - slow_
-    signal_line = pd.Series(macd_line).ewm(span=signal, adjust=False).mean().to_numpy()
-    hist = macd_line - signal_line
-    out = df.copy()
-    out["macd"] = macd_line
-    out["macd_signal"] = signal_line
-    out["macd_hist"] = hist
-    return out
+    return _single(df, "macd", fast=fast, slow=slow, signal=signal)
 
 def atr(df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
-    high, low, close = df["high"], df["low"], df["close"]
-    prev_close = close.shift(1).fillna(close.iloc[0])
-    tr = pd.concat([high-low, (high-prev_close).abs(), (low-prev_close).abs()], axis=1).max(axis=1)
-    out = df.copy()
-    out["atr"] = tr.ewm(alpha=1/period, adjust=False).mean()
-    return out
+    return _single(df, "atr", period=period)
 
 def bollinger(df: pd.DataFrame, period: int = 20, k: float = 2.0) -> pd.DataFrame:
-    s = df["close"]
-    ma = s.rolling(period).mean()
-    std = s.rolling(period).std(ddof=0)
-    out = df.copy()
-    out["bb_mid"] = ma
-    out["bb_up"] = ma + k*std
-    out["bb_low"] = ma - k*std
-    return out
+    return _single(df, "bollinger", period=period, k=k)
 
 # -------------------------------
 # Volume Indicators
 # -------------------------------
 
 def obv(df: pd.DataFrame) -> pd.DataFrame:
-    obv = (np.sign(df["close"].diff()) * df["volume"]).fillna(0).cumsum()
-    out = df.copy()
-    out["obv"] = obv
-    return out
+    return compute_indicators(df, [IndicatorSpec.of("obv")])
 
 def vwap(df: pd.DataFrame) -> pd.DataFrame:
-    cum_vol = df["volume"].cumsum()
-    cum_vol_price = (df["close"] * df["volume"]).cumsum()
-    out = df.copy()
-    out["vwap"] = cum_vol_price / cum_vol
-    return out
+    return compute_indicators(df, [IndicatorSpec.of("vwap")])
 
 def mfi(df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
-    tp = (df["high"] + df["low"] + df["close"]) / 3
-    mf = tp * df["volume"]
-    pos_mf = mf.where(tp > tp.shift(1), 0.0)
-    neg_mf = mf.where(tp < tp.shift(1), 0.0)
-    mr = pos_mf.rolling(period).sum() / neg_mf.rolling(period).sum()
-    mfi = 100 - (100 / (1 + mr))
-    out = df.copy()
-    out["mfi"] = mfi
-    return out
+    return _single(df, "mfi", period=period)
 
 # -------------------------------
 # Ichimoku Cloud
 # -------------------------------
 
 def ichimoku(df: pd.DataFrame) -> pd.DataFrame:
-    high9 = df["high"].rolling(9).max()
-    low9 = df["low"].rolling(9).min()
-    tenkan = (high9 + low9) / 2
-    high26 = df["high"].rolling(26).max()
-    low26 = df["low"].rolling(26).min()
-    kijun = (high26 + low26) / 2
-    span_a = ((tenkan + kijun) / 2).shift(26)
-    high52 = df["high"].rolling(52).max()
-    low52 = df["low"].rolling(52).min()
-    span_b = ((high52 + low52) / 2).shift(26)
-    chikou = df["close"].shift(-26)
-    out = df.copy()
-    out["ichimoku_tenkan"] = tenkan
-    out["ichimoku_kijun"] = kijun
-    out["ichimoku_span_a"] = span_a
-    out["ichimoku_span_b"] = span_b
-    out["ichimoku_chikou"] = chikou
-    return out
+    return compute_indicators(df, [IndicatorSpec.of("ichimoku")])
 
 # -------------------------------
 # Apply default set
 # -------------------------------
 
-def apply_default_indicators_v2(df: pd.DataFrame) -> pd.DataFrame:
-    out = ema(df, 20)
-    out = sma(out, 20)
-    out = rsi(out, 14)
-    out = macd(out, 12, 26, 9)
-    out = atr(out, 14)
-    out = bollinger(out, 20, 2.0)
-    out = obv(out)
-    out = vwap(out)
-    out = stochastic(out, 14, 3)
-    return out
+DEFAULT_INDICATORS: Tuple[IndicatorSpec, ...] = (
+    IndicatorSpec.of("ema", span=20),
+    IndicatorSpec.of("sma", period=20),
+    IndicatorSpec.of("rsi", period=14),
+    IndicatorSpec.of("macd", fast=12, slow=26, signal=9),
+    IndicatorSpec.of("atr", period=14),
+    IndicatorSpec.of("bollinger", period=20, k=2.0),
+    IndicatorSpec.of("obv"),
+    IndicatorSpec.of("vwap"),
+    IndicatorSpec.of("stochastic", k_period=14, d_period=3),
+)
+
+def apply_default_indicators_v2(df: pd.DataFrame, precision: str = "float64") -> pd.DataFrame:
+    return compute_indicators(df, DEFAULT_INDICATORS, precision)
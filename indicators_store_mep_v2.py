@@ -0,0 +1,344 @@
+# indicators_store_mep_v2.py
+# Materialized default indicators: the `indicators` hypertable (keyed like
+# ohlcv) plus `indicator_state`, the carried stream state of each key.
+#
+# After an OHLCV upsert, materialize_key() rewrites only the affected tail:
+#   - recursive indicators (EMA, RSI, MACD, ATR, OBV, VWAP, stochastic) resume
+#     from the saved indicators_stream_mep_v2 state;
+#   - window indicators (sma, bollinger) recompute the new bars plus warm-up.
+# The saved state lags one bar behind the last materialized bar, so re-upserting
+# the still-open last candle (the usual live-ingest pattern) stays incremental.
+# Rewriting anything older falls back to a full recompute of the key, and the
+# live backtest states (backtest_state_mep_v2) that covered rewritten bars are
+# dropped (invalidate_states).
+#
+# Reads (read_indicators) are a range scan on the hypertable's primary key;
+# indicators_frame() serves request frames from it when every bar is
+# materialized and computes them (indicator_cache_mep_v2) otherwise.
+#
+#   python indicators_store_mep_v2.py backfill [--tenant t] [--market m] [--symbol s]
+#                                               [--timeframe tf]
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from indicator_cache_mep_v2 import cached_indicators
+from indicators_mep_v2 import (
+    DEFAULT_INDICATORS,
+    OHLCV_COLS,
+    WINDOW_WARMUP,
+    IndicatorSpec,
+    compute_block,
+    compute_indicators,
+    plan_columns,
+    precision_dtype,
+)
+from indicators_stream_mep_v2 import STREAM_REGISTRY
+
+logger = logging.getLogger("mep.indicators_store")
+
+# changing this set needs a migration adding/removing the matching columns
+MATERIALIZED_SPECS: Tuple[IndicatorSpec, ...] = DEFAULT_INDICATORS
+MATERIALIZED_COLUMNS: List[str] = plan_columns(MATERIALIZED_SPECS)
+KEY_COLS = ("tenant_id", "market", "symbol", "timeframe")
+CHUNK = 2000
+NO_STATE_TS = -1  # state_ts before the first bar
+
+Key = Tuple[str, str, str, str]
+States = Dict[IndicatorSpec, Any]
+
+# -------------------------------
+# Pure part (no DB)
+# -------------------------------
+
+def _specs_json(specs: Sequence[IndicatorSpec]) -> List[List[Any]]:
+    return [[s.name, s.kwargs] for s in specs]
+
+def dump_states(states: States) -> List[List[Any]]:
+    return [[s.name, s.kwargs, states[s].dump()] for s in states]
+
+def load_states(data: Iterable[Sequence[Any]]) -> States:
+    return {IndicatorSpec.of(name, **params): STREAM_REGISTRY[name].load(st)
+            for name, params, st in data}
+
+def full_tail(bars: pd.DataFrame, specs: Sequence[IndicatorSpec] = MATERIALIZED_SPECS
+              ) -> Tuple[pd.DataFrame, States, int]:
+    """Everything from scratch: (indicator frame, states as of bar n-2, that bar's ts)."""
+    frame = compute_indicators(bars, specs)
+    head = bars.iloc[:-1]
+    states = {s: STREAM_REGISTRY[s.name].from_history(head, **s.kwargs)
+              for s in specs if s.name in STREAM_REGISTRY}
+    state_ts = int(head["ts"].iloc[-1]) if len(head) else NO_STATE_TS
+    return frame, states, state_ts
+
+def incremental_tail(prev: pd.DataFrame, new: pd.DataFrame, states: States,
+                     specs: Sequence[IndicatorSpec] = MATERIALIZED_SPECS
+                     ) -> Tuple[pd.DataFrame, States, Optional[int]]:
+    """
+    Indicators for `new` (the bars after the saved state) given the bars before
+    it (`prev`, at least the window warm-up) and the saved states. Returns the
+    frame for `new`, the states advanced over all of `new` but its last bar and
+    that bar's ts (None when `new` has a single bar: state unchanged).
+    """
+    n = len(new)
+    cols: Dict[str, np.ndarray] = {}
+    rows = new[list(OHLCV_COLS)].to_dict("records")
+    snapshot: States = {}
+    for spec in specs:
+        names = spec.columns()
+        if spec.name in STREAM_REGISTRY:
+            st = states[spec]
+            vals = []
+            for i, r in enumerate(rows):
+                if i == n - 1:
+                    # the open bar is re-materialized next time: snapshot before it
+                    snapshot[spec] = type(st).load(st.dump())
+                vals.append(np.atleast_1d(st.update(r)))
+            cols.update(zip(names, np.array(vals, dtype=np.float64).T))
+        else:
+            _, block = compute_block(pd.concat([prev, new]), [spec])
+            cols.update(zip(names, block[:, -n:]))
+    frame = pd.DataFrame({"ts": new["ts"].to_numpy(), **{c: cols[c] for c in plan_columns(specs)}})
+    state_ts = int(new["ts"].iloc[-2]) if n > 1 else None
+    return frame, snapshot, state_ts
+
+def warmup_bars(specs: Sequence[IndicatorSpec] = MATERIALIZED_SPECS) -> int:
+    return max([WINDOW_WARMUP[s.name](**s.kwargs) for s in specs if s.name in WINDOW_WARMUP],
+               default=1)
+
+# -------------------------------
+# DB part (sync Connection, e.g. engine.begin())
+# -------------------------------
+
+def _key_params(key: Key) -> Dict[str, Any]:
+    return dict(zip(KEY_COLS, key))
+
+_KEY_WHERE = "tenant_id=:tenant_id AND market=:market AND symbol=:symbol AND timeframe=:timeframe"
+
+def _read_bars(conn, key: Key, after: Optional[int] = None,
+               last_upto: Optional[Tuple[int, int]] = None) -> pd.DataFrame:
+    cols = "ts," + ",".join(OHLCV_COLS)
+    p = _key_params(key)
+    if last_upto is not None:
+        # the last `limit` bars at or before `upto`
+        p["upto"], p["limit"] = last_upto
+        q = (f"SELECT {cols} FROM ohlcv WHERE {_KEY_WHERE} AND ts <= :upto "
+             "ORDER BY ts DESC LIMIT :limit")
+        rows = conn.execute(text(q), p).mappings().all()[::-1]
+    else:
+        q = (f"SELECT {cols} FROM ohlcv WHERE {_KEY_WHERE}"
+             + (" AND ts > :after" if after is not None else "") + " ORDER BY ts")
+        if after is not None:
+            p["after"] = after
+        rows = conn.execute(text(q), p).mappings().all()
+    df = pd.DataFrame([dict(r) for r in rows], columns=["ts", *OHLCV_COLS])
+    return df.astype({"ts": "int64", **{c: "float64" for c in OHLCV_COLS}})
+
+def _upsert_rows(conn, key: Key, frame: pd.DataFrame) -> int:
+    cols = ["ts"] + MATERIALIZED_COLUMNS
+    sql = text(f"""
+        INSERT INTO indicators({",".join(KEY_COLS)},{",".join(cols)})
+        VALUES ({",".join(":" + c for c in KEY_COLS)},{",".join(":" + c for c in cols)})
+        ON CONFLICT ({",".join(KEY_COLS)},ts) DO UPDATE SET
+          {", ".join(f"{c}=EXCLUDED.{c}" for c in MATERIALIZED_COLUMNS)}
+    """)
+    base = _key_params(key)
+    # NaN (warm-up) is stored as NULL
+    values = frame[cols].astype(object).where(frame[cols].notna(), None)
+    values["ts"] = frame["ts"].astype("int64").tolist()
+    records = [{**base, **r} for r in values.to_dict("records")]
+    for i in range(0, len(records), CHUNK):
+        conn.execute(sql, records[i:i+CHUNK])
+    return len(records)
+
+def _save_state(conn, key: Key, state_ts: int, states: States) -> None:
+    conn.execute(text(f"""
+        INSERT INTO indicator_state({",".join(KEY_COLS)},state_ts,specs,state,updated_at)
+        VALUES (:tenant_id,:market,:symbol,:timeframe,:state_ts,CAST(:specs AS jsonb),
+                CAST(:state AS jsonb),now())
+        ON CONFLICT ({",".join(KEY_COLS)}) DO UPDATE SET
+          state_ts=EXCLUDED.state_ts, specs=EXCLUDED.specs, state=EXCLUDED.state, updated_at=now()
+    """), {**_key_params(key), "state_ts": state_ts,
+           "specs": json.dumps(_specs_json(MATERIALIZED_SPECS)),
+           "state": json.dumps(dump_states(states), allow_nan=False)})
+
+def _load_state(conn, key: Key) -> Tuple[Optional[int], Optional[States]]:
+    q = f"SELECT state_ts, specs, state FROM indicator_state WHERE {_KEY_WHERE}"
+    row = conn.execute(text(q), _key_params(key)).mappings().first()
+    if row is None or row["specs"] != _specs_json(MATERIALIZED_SPECS):
+        return None, None
+    return int(row["state_ts"]), load_states(row["state"])
+
+def invalidate_states(conn, key: Key, since_ts: Optional[int] = None) -> None:
+    """Drop the backtest_state rows of a key that cover bars from since_ts on (None: all)."""
+    q = f"DELETE FROM backtest_state WHERE {_KEY_WHERE}"
+    p = _key_params(key)
+    if since_ts is not None:
+        q += " AND state_ts >= :since"; p["since"] = since_ts
+    conn.execute(text(q), p)
+
+def materialize_key(conn, tenant_id: str, market: str, symbol: str, timeframe: str,
+                    since_ts: Optional[int] = None) -> int:
+    """
+    Bring `indicators` up to date for one key after bars from `since_ts` on were
+    upserted (None: full recompute). Returns the number of indicator rows written.
+    """
+    key: Key = (tenant_id, market, symbol, timeframe)
+    # serialize writers of the same key (concurrent ingests of one symbol)
+    conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:k))"),
+                 {"k": "indicators:" + "|".join(key)})
+    # live backtest states that covered rewritten bars restart from bar 0
+    invalidate_states(conn, key, since_ts)
+    state_ts, states = _load_state(conn, key) if since_ts is not None else (None, None)
+    if states is not None and since_ts > state_ts:
+        new = _read_bars(conn, key, after=state_ts)
+        if new.empty:
+            return 0
+        if state_ts != NO_STATE_TS:
+            prev = _read_bars(conn, key, last_upto=(state_ts, warmup_bars()))
+        else:
+            prev = new.iloc[:0]
+        frame, snapshot, next_ts = incremental_tail(prev, new, states)
+        if next_ts is not None:
+            _save_state(conn, key, next_ts, snapshot)
+    else:
+        bars = _read_bars(conn, key)
+        if bars.empty:
+            return 0
+        frame, snapshot, next_ts = full_tail(bars)
+        _save_state(conn, key, next_ts, snapshot)
+    return _upsert_rows(conn, key, frame)
+
+def materialize_after_upsert(engine, rows: Iterable[Mapping[str, Any]]) -> int:
+    """Ingest hook: one incremental pass per key touched by an OHLCV upsert."""
+    since: Dict[Key, int] = {}
+    for r in rows:
+        k = tuple(r[c] for c in KEY_COLS)
+        since[k] = min(int(r["ts"]), since.get(k, int(r["ts"])))
+    written = 0
+    for k, ts in since.items():
+        try:
+            with engine.begin() as conn:
+                written += materialize_key(conn, *k, since_ts=ts)
+        except Exception as e:  # the OHLCV upsert already succeeded; backfill repairs a missed key
+            logger.error("indicator materialization failed for %s: %s", k, e)
+    return written
+
+def read_bars(conn, tenant_id: str, market: str, symbol: str, timeframe: str,
+              since: Optional[int] = None, until: Optional[int] = None,
+              limit: Optional[int] = None) -> pd.DataFrame:
+    """Stored `ohlcv` bars in [since, until), ts order; with limit, the last `limit` of them."""
+    p = _key_params((tenant_id, market, symbol, timeframe))
+    q = f"SELECT ts,{','.join(OHLCV_COLS)} FROM ohlcv WHERE {_KEY_WHERE}"
+    if since is not None:
+        q += " AND ts >= :since"; p["since"] = since
+    if until is not None:
+        q += " AND ts < :until"; p["until"] = until
+    if limit is not None:
+        p["limit"] = int(limit)
+        rows = conn.execute(text(q + " ORDER BY ts DESC LIMIT :limit"), p).mappings().all()[::-1]
+    else:
+        rows = conn.execute(text(q + " ORDER BY ts"), p).mappings().all()
+    df = pd.DataFrame([dict(r) for r in rows], columns=["ts", *OHLCV_COLS])
+    return df.astype({"ts": "int64", **{c: "float64" for c in OHLCV_COLS}})
+
+def read_indicators(conn, tenant_id: str, market: str, symbol: str, timeframe: str,
+                    since: Optional[int] = None, until: Optional[int] = None,
+                    columns: Optional[Sequence[str]] = None,
+                    fields: Sequence[str] = ()) -> pd.DataFrame:
+    """Materialized `columns` in [since, until), plus the bars' OHLCV `fields` (from ohlcv)."""
+    cols = list(columns or MATERIALIZED_COLUMNS)
+    bad = [c for c in cols if c not in MATERIALIZED_COLUMNS]
+    bad += [f for f in fields if f not in OHLCV_COLS]
+    if bad:
+        raise ValueError(f"not materialized: {bad}")
+    p = _key_params((tenant_id, market, symbol, timeframe))
+    sel = ",".join(["i.ts", *(f"o.{f}" for f in fields), *(f"i.{c}" for c in cols)])
+    q = f"SELECT {sel} FROM indicators i"
+    if fields:
+        q += f" JOIN ohlcv o USING ({','.join(KEY_COLS)},ts)"
+    q += " WHERE " + " AND ".join(f"i.{c}=:{c}" for c in KEY_COLS)
+    if since is not None:
+        q += " AND i.ts >= :since"; p["since"] = since
+    if until is not None:
+        q += " AND i.ts < :until"; p["until"] = until
+    rows = conn.execute(text(q + " ORDER BY i.ts"), p).mappings().all()
+    out = ["ts", *fields, *cols]
+    df = pd.DataFrame([dict(r) for r in rows], columns=out)
+    return df.astype({"ts": "int64", **{c: "float64" for c in out[1:]}})
+
+def indicators_frame(engine, df: pd.DataFrame, specs: Sequence[IndicatorSpec], *,
+                     tenant_id: str = "default", market: str = "binance", symbol: str,
+                     timeframe: str, precision: str = "float64") -> pd.DataFrame:
+    """
+    df plus the columns of `specs`, like cached_indicators. Read from `indicators`
+    when every column is materialized and the stored bars of df's range are df's
+    bars (same ts and OHLCV, so a moved open candle is not served stale);
+    computed otherwise.
+    """
+    cols = plan_columns(specs)
+    stored = engine is not None and not df.empty and set(cols) <= set(MATERIALIZED_COLUMNS)
+    if stored and precision_dtype(precision) == np.float64:
+        ts = df["ts"].to_numpy(dtype=np.int64)
+        fields = [c for c in OHLCV_COLS if c in df.columns]
+        try:
+            with engine.connect() as conn:
+                ind = read_indicators(conn, tenant_id, market, symbol, timeframe,
+                                      int(ts[0]), int(ts[-1]) + 1, cols, fields)
+        except SQLAlchemyError as e:
+            logger.warning("materialized indicators unavailable for %s: %s",
+                           (market, symbol, timeframe), e)
+            ind = None
+        same = (ind is not None and np.array_equal(ind["ts"].to_numpy(), ts)
+                and all(np.array_equal(ind[f].to_numpy(), df[f].to_numpy(dtype=np.float64),
+                                       equal_nan=True) for f in fields))
+        if same:
+            data = {c: df[c] for c in df.columns if c not in cols}
+            data.update((c, ind[c].to_numpy()) for c in cols)
+            return pd.DataFrame(data, index=df.index)
+    return cached_indicators(df, specs, tenant_id=tenant_id, market=market, symbol=symbol,
+                             timeframe=timeframe, precision=precision)
+
+# -------------------------------
+# Backfill
+# -------------------------------
+
+def backfill(engine, tenant_id: Optional[str] = None, market: Optional[str] = None,
+             symbol: Optional[str] = None, timeframe: Optional[str] = None) -> Dict[str, int]:
+    filters, p = [], {}
+    for col, val in zip(KEY_COLS, (tenant_id, market, symbol, timeframe)):
+        if val is not None:
+            filters.append(f"{col}=:{col}"); p[col] = val
+    where = ("WHERE " + " AND ".join(filters)) if filters else ""
+    with engine.connect() as conn:
+        q = f"SELECT DISTINCT {','.join(KEY_COLS)} FROM ohlcv {where}"
+        keys = [tuple(r) for r in conn.execute(text(q), p)]
+    total = 0
+    for k in keys:
+        with engine.begin() as conn:
+            n = materialize_key(conn, *k)
+        logger.info("backfilled %s: %d rows", k, n)
+        total += n
+    return {"keys": len(keys), "rows": total}
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Materialized indicators maintenance")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    bf = sub.add_parser("backfill", help="full recompute of every (filtered) ohlcv key")
+    for c in KEY_COLS:
+        bf.add_argument("--" + c.replace("_id", ""), dest=c)
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    from db_mep_v2 import engine
+    print(json.dumps(backfill(engine, args.tenant_id, args.market, args.symbol, args.timeframe)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+# indicators_stream_mep_v2.py
+# Streaming (incremental) counterparts of indicators_mep_v2.
+#
+# Each state object holds only what the recursion needs, updates in O(1) per bar
+# and matches the batch functions to float tolerance:
+#
+#   st = RSIState.from_history(df, period=14)   # seed on stored history
+#   st.update({"close": 101.2, ...})            # -> new rsi value
+#
+# `bar` is any mapping with the OHLCV keys an indicator needs (dict, pandas row).
+from __future__ import annotations
+
+import math
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Dict, Mapping, Optional, Tuple, Type
+
+import numpy as np
+import pandas as pd
+
+from indicators_mep_v2 import _ema, _true_range
+
+Bar = Mapping[str, Any]
+
+class _StreamState(ABC):
+    __slots__ = ()
+    # OHLCV fields `update` reads; used to replay history rows
+    fields: Tuple[str, ...] = ("close",)
+
+    @abstractmethod
+    def update(self, bar: Bar):
+        """Advance by one bar and return the indicator value(s) for it."""
+
+    @classmethod
+    def replay(cls, df: pd.DataFrame, **params: Any) -> "_StreamState":
+        st = cls(**params)
+        cols = list(cls.fields)
+        for row in df[cols].to_numpy(dtype=np.float64):
+            st.update(dict(zip(cols, row)))
+        return st
+
+    @classmethod
+    def from_history(cls, df: pd.DataFrame, **params: Any) -> "_StreamState":
+        return cls.replay(df, **params)
+
+    def dump(self) -> Dict[str, Any]:
+        """JSON-safe snapshot (jsonb-storable: no NaN/inf literals); inverse of load."""
+        return {k: _dump(getattr(self, k)) for k in self.__slots__}
+
+    @classmethod
+    def load(cls, data: Mapping[str, Any]) -> "_StreamState":
+        st = cls.__new__(cls)
+        for k in cls.__slots__:
+            setattr(st, k, _load(data[k]))
+        return st
+
+def _state_classes() -> Dict[str, Type[_StreamState]]:
+    return {c.__name__: c for c in _StreamState.__subclasses__()}
+
+def _dump(v: Any) -> Any:
+    if isinstance(v, _StreamState):
+        return {"__state__": type(v).__name__, "slots": v.dump()}
+    if isinstance(v, deque):
+        return {"__deque__": [_dump(x) for x in v], "maxlen": v.maxlen}
+    if isinstance(v, tuple):
+        return {"__tuple__": [_dump(x) for x in v]}
+    if isinstance(v, float) and not math.isfinite(v):
+        return {"__float__": repr(v)}
+    return v
+
+def _load(v: Any) -> Any:
+    if not isinstance(v, dict):
+        return v
+    if "__state__" in v:
+        return _state_classes()[v["__state__"]].load(v["slots"])
+    if "__deque__" in v:
+        return deque((_load(x) for x in v["__deque__"]), maxlen=v["maxlen"])
+    if "__tuple__" in v:
+        return tuple(_load(x) for x in v["__tuple__"])
+    return float(v["__float__"])
+
+# -------------------------------
+# Moving averages
+# -------------------------------
+
+class EMAState(_StreamState):
+    __slots__ = ("alpha", "value")
+
+    def __init__(self, span: int = 20, value: Optional[float] = None):
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = value
+
+    def update(self, bar: Bar) -> float:
+        x = float(bar["close"])
+        self.value = x if self.value is None else self.value + self.alpha * (x - self.value)
+        return self.value
+
+    def push(self, x: float) -> float:
+        # same recursion on a raw value (used by MACD for the signal line)
+        self.value = x if self.value is None else self.value + self.alpha * (x - self.value)
+        return self.value
+
+    @classmethod
+    def from_history(cls, df: pd.DataFrame, span: int = 20) -> "EMAState":
+        close = df["close"].to_numpy(dtype=np.float64)
+        return cls(span, float(_ema(close, span)[-1]) if len(close) else None)
+
+# -------------------------------
+# Oscillators
+# -------------------------------
+
+class RSIState(_StreamState):
+    __slots__ = ("alpha", "prev_close", "avg_up", "avg_down")
+
+    def __init__(self, period: int = 14):
+        self.alpha = 1.0 / period
+        self.prev_close: Optional[float] = None
+        self.avg_up = 0.0
+        self.avg_down = 0.0
+
+    def _value(self) -> float:
+        if self.avg_down == 0:
+            return 50.0
+        rs = self.avg_up / self.avg_down
+        return 100.0 - 100.0 / (1.0 + rs)
+
+    def update(self, bar: Bar) -> float:
+        x = float(bar["close"])
+        if self.prev_close is None:
+            # first bar: delta is 0, both averages start at 0
+            self.prev_close = x
+            return self._value()
+        delta = x - self.prev_close
+        self.prev_close = x
+        a = self.alpha
+        self.avg_up += a * ((delta if delta > 0 else 0.0) - self.avg_up)
+        self.avg_down += a * ((-delta if delta < 0 else 0.0) - self.avg_down)
+        return self._value()
+
+    @classmethod
+    def from_history(cls, df: pd.DataFrame, period: int = 14) -> "RSIState":
+        st = cls(period)
+        close = df["close"].to_numpy(dtype=np.float64)
+        if not len(close):
+            return st
+        delta = np.diff(close, prepend=close[0])
+        up = pd.Series(np.where(delta > 0, delta, 0.0)).ewm(alpha=1/period, adjust=False).mean()
+        down = pd.Series(np.where(delta < 0, -delta, 0.0)).ewm(alpha=1/period, adjust=False).mean()
+        st.prev_close = float(close[-1])
+        st.avg_up = float(up.iloc[-1])
+        st.avg_down = float(down.iloc[-1])
+        return st
+
+class StochasticState(_StreamState):
+    __slots__ = ("k_period", "d_period", "i", "_highs", "_lows", "_ks")
+    fields = ("high", "low", "close")
+
+    def __init__(self, k_period: int = 14, d_period: int = 3):
+        self.k_period = k_period
+        self.d_period = d_period
+        self.i = 0
+        # monotonic deques of (index, value): amortised O(1) rolling max/min
+        self._highs: deque = deque()
+        self._lows: deque = deque()
+        self._ks: deque = deque(maxlen=d_period)
+
+    def update(self, bar: Bar) -> Tuple[float, float]:
+        i = self.i; self.i += 1
+        high, low, close = float(bar["high"]), float(bar["low"]), float(bar["close"])
+        while self._highs and self._highs[-1][1] <= high:
+            self._highs.pop()
+        self._highs.append((i, high))
+        while self._lows and self._lows[-1][1] >= low:
+            self._lows.pop()
+        self._lows.append((i, low))
+        start = i - self.k_period + 1
+        while self._highs[0][0] < start:
+            self._highs.popleft()
+        while self._lows[0][0] < start:
+            self._lows.popleft()
+        if start < 0:
+            k = math.nan
+        else:
+            hi, lo = self._highs[0][1], self._lows[0][1]
+            rng = hi - lo
+            if rng != 0:
+                k = 100.0 * (close - lo) / rng
+            else:
+                k = math.nan if close == lo else math.copysign(math.inf, close - lo)
+        self._ks.append(k)
+        d = sum(self._ks) / self.d_period if len(self._ks) == self.d_period else math.nan
+        return k, d
+
+    @classmethod
+    def from_history(cls, df: pd.DataFrame, k_period: int = 14,
+                     d_period: int = 3) -> "StochasticState":
+        # only the last k_period + d_period - 1 bars influence future values
+        tail = k_period + d_period - 1
+        st = cls.replay(df.tail(tail), k_period=k_period, d_period=d_period)
+        st.i = len(df)
+        if len(df) > tail:
+            # re-base deque indices onto the full history
+            shift = len(df) - tail
+            st._highs = deque((j + shift, v) for j, v in st._highs)
+            st._lows = deque((j + shift, v) for j, v in st._lows)
+        return st
+
+# -------------------------------
+# Trend / Volatility
+# -------------------------------
+
+class MACDState(_StreamState):
+    __slots__ = ("fast", "slow", "signal")
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = EMAState(fast)
+        self.slow = EMAState(slow)
+        self.signal = EMAState(signal)
+
+    def update(self, bar: Bar) -> Tuple[float, float, float]:
+        line = self.fast.update(bar) - self.slow.update(bar)
+        sig = self.signal.push(line)
+        return line, sig, line - sig
+
+    @classmethod
+    def from_history(cls, df: pd.DataFrame, fast: int = 12, slow: int = 26,
+                     signal: int = 9) -> "MACDState":
+        st = cls(fast, slow, signal)
+        close = df["close"].to_numpy(dtype=np.float64)
+        if not len(close):
+            return st
+        f, s = _ema(close, fast), _ema(close, slow)
+        st.fast.value = float(f[-1]); st.slow.value = float(s[-1])
+        st.signal.value = float(_ema(f - s, signal)[-1])
+        return st
+
+class ATRState(_StreamState):
+    __slots__ = ("alpha", "prev_close", "value")
+    fields = ("high", "low", "close")
+
+    def __init__(self, period: int = 14):
+        self.alpha = 1.0 / period
+        self.prev_close: Optional[float] = None
+        self.value: Optional[float] = None
+
+    def update(self, bar: Bar) -> float:
+        high, low, close = float(bar["high"]), float(bar["low"]), float(bar["close"])
+        pc = close if self.prev_close is None else self.prev_close
+        tr = max(high - low, abs(high - pc), abs(low - pc))
+        self.prev_close = close
+        self.value = tr if self.value is None else self.value + self.alpha * (tr - self.value)
+        return self.value
+
+    @classmethod
+    def from_history(cls, df: pd.DataFrame, period: int = 14) -> "ATRState":
+        st = cls(period)
+        if not len(df):
+            return st
+        high, low, close = (df[k].to_numpy(dtype=np.float64) for k in ("high", "low", "close"))
+        tr = _true_range(high, low, close)
+        st.value = float(pd.Series(tr).ewm(alpha=1/period, adjust=False).mean().iloc[-1])
+        st.prev_close = float(close[-1])
+        return st
+
+# -------------------------------
+# Volume
+# -------------------------------
+
+class OBVState(_StreamState):
+    __slots__ = ("prev_close", "value")
+    fields = ("close", "volume")
+
+    def __init__(self):
+        self.prev_close: Optional[float] = None
+        self.value = 0.0
+
+    def update(self, bar: Bar) -> float:
+        c, v = float(bar["close"]), float(bar["volume"])
+        if self.prev_close is not None:
+            step = ((c > self.prev_close) - (c < self.prev_close)) * v
+            if not math.isnan(step):
+                self.value += step
+        self.prev_close = c
+        return self.value
+
+    @classmethod
+    def from_history(cls, df: pd.DataFrame) -> "OBVState":
+        st = cls()
+        if not len(df):
+            return st
+        close = df["close"]
+        st.value = float((np.sign(close.diff()) * df["volume"]).fillna(0).sum())
+        st.prev_close = float(close.iloc[-1])
+        return st
+
+class VWAPState(_StreamState):
+    __slots__ = ("cum_vol", "cum_pv")
+    fields = ("close", "volume")
+
+    def __init__(self):
+        self.cum_vol = 0.0
+        self.cum_pv = 0.0
+
+    def update(self, bar: Bar) -> float:
+        c, v = float(bar["close"]), float(bar["volume"])
+        self.cum_vol += v
+        self.cum_pv += c * v
+        if self.cum_vol == 0:
+            return math.nan if self.cum_pv == 0 else math.copysign(math.inf, self.cum_pv)
+        return self.cum_pv / self.cum_vol
+
+    @classmethod
+    def from_history(cls, df: pd.DataFrame) -> "VWAPState":
+        st = cls()
+        if len(df):
+            st.cum_vol = float(df["volume"].sum())
+            st.cum_pv = float((df["close"] * df["volume"]).sum())
+        return st
+
+# name -> state class; names and params follow indicators_mep_v2.INDICATOR_REGISTRY
+STREAM_REGISTRY: Dict[str, Type[_StreamState]] = {
+    "ema": EMAState,
+    "rsi": RSIState,
+    "macd": MACDState,
+    "atr": ATRState,
+    "obv": OBVState,
+    "vwap": VWAPState,
+    "stochastic": StochasticState,
+}
@@ -0,0 +1,73 @@
+# indicators_sweep_mep_v2.py
+# Parameter sweeps: one indicator over many periods in a single call, returned
+# as an (n_periods, n_bars) float64 matrix (row i <-> periods[i]).
+#
+#   rsi = rsi_sweep(close, range(5, 31))                     # (26, n)
+#   sig = mean_reversion_signal_matrix(rsi, 30, 70)          # strategies_mep_v1
+#   res = [event_backtest_arrays(close, s, ts) for s in sig]
+#
+# Work that does not depend on the period is done once per sweep: prefix sums
+# for SMA/Bollinger mid, close->delta->up/down for RSI. Each row matches the
+# single-period function in indicators_mep_v2 (same warm-up NaNs, rsi nan->50).
+from __future__ import annotations
+
+from typing import Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+
+import kernels_mep_v2 as kernels
+from indicators_mep_v2 import _ema
+
+
+def _periods(periods: Iterable[int]) -> np.ndarray:
+    p = np.asarray(list(periods), dtype=np.int64)
+    if p.ndim != 1 or (p < 1).any():
+        raise ValueError("periods must be a flat sequence of ints >= 1")
+    return p
+
+def sma_sweep(close: np.ndarray, periods: Iterable[int]) -> np.ndarray:
+    p = _periods(periods)
+    cs, cn = kernels.prefix_sums(close)
+    out = np.empty((len(p), cs.shape[-1] - 1))
+    for i, period in enumerate(p):
+        out[i] = kernels.window_sums(cs, cn, int(period)) / period
+    return out
+
+def ema_sweep(close: np.ndarray, spans: Iterable[int]) -> np.ndarray:
+    s = _periods(spans)
+    close = np.asarray(close, dtype=np.float64)
+    out = np.empty((len(s), len(close)))
+    for i, span in enumerate(s):
+        out[i] = _ema(close, int(span))
+    return out
+
+def rsi_sweep(close: np.ndarray, periods: Iterable[int]) -> np.ndarray:
+    p = _periods(periods)
+    close = np.asarray(close, dtype=np.float64)
+    out = np.empty((len(p), len(close)))
+    if not len(close):
+        return out
+    delta = np.diff(close, prepend=close[0])
+    # up/down side by side: one ewm call per period smooths both
+    updown = pd.DataFrame({"up": np.where(delta > 0, delta, 0.0),
+                           "down": np.where(delta < 0, -delta, 0.0)})
+    for i, period in enumerate(p):
+        roll = updown.ewm(alpha=1/period, adjust=False).mean().to_numpy()
+        rs = np.divide(roll[:, 0], np.where(roll[:, 1]==0, np.nan, roll[:, 1]))
+        out[i] = np.nan_to_num(100 - (100 / (1 + rs)), nan=50.0)
+    return out
+
+def bollinger_sweep(close: np.ndarray, periods: Iterable[int],
+                    k: float = 2.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(mid, up, low), each (n_periods, n_bars)."""
+    p = _periods(periods)
+    close = np.asarray(close, dtype=np.float64)
+    mid = sma_sweep(close, p)
+    s = pd.Series(close)
+    std = np.empty_like(mid)
+    for i, period in enumerate(p):
+        # pandas' rolling std is numerically stable; sum-of-squares prefix sums are not
+        std[i] = s.rolling(int(period)).std(ddof=0).to_numpy()
+    std *= k
+    return mid, mid + std, mid - std
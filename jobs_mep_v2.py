@@ -0,0 +1,133 @@
+# jobs_mep_v2.py
+# In-process job workers for the `runs` queue (see runs_mep_v2).
+#
+# Each worker thread loops: claim_run() (SELECT ... FOR UPDATE SKIP LOCKED) ->
+# run the kind's handler -> finish_run(). Handlers are the async route bodies
+# (routers_jobs_mep_v2.JOB_HANDLERS), called as handler(payload, run_id) on a
+# private event loop, so a job computes exactly what the synchronous route
+# would. While a job runs, a heartbeat thread renews its lease every third of
+# JOB_LEASE_SECONDS; if the worker dies, the job is claimed again once the
+# lease expires. Workers can run inside the API (JOB_WORKERS, started on app
+# startup) or as separate processes on compute nodes:
+#
+#   python jobs_mep_v2.py worker --threads 4
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional
+
+from fastapi import HTTPException
+from fastapi.responses import Response
+
+from runs_mep_v2 import JOB_LEASE_SECONDS, RunCancelled, claim_run, finish_run, heartbeat
+
+logger = logging.getLogger("mep.jobs")
+
+Handler = Callable[[Dict[str, Any], str], Awaitable[Any]]
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1.0"))
+
+class JobWorker:
+    def __init__(self, engine, handlers: Mapping[str, Handler], threads: int = 1,
+                 poll_seconds: float = JOB_POLL_SECONDS, lease_seconds: float = JOB_LEASE_SECONDS):
+        self.engine = engine
+        self.handlers = dict(handlers)
+        self.threads = threads
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        self._stop.clear()
+        for i in range(self.threads):
+            t = threading.Thread(target=self._loop, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        logger.info("started %d job worker thread(s) for %s", self.threads, sorted(self.handlers))
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop claiming; a job in progress finishes first (up to `timeout`)."""
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads.clear()
+
+    def run_once(self) -> Optional[str]:
+        """Claim and run one job; returns its id, or None if the queue was empty."""
+        job = claim_run(self.engine, list(self.handlers), self.lease_seconds)
+        if job is None:
+            return None
+        self._run(job)
+        return job["id"]
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if self.run_once() is None:
+                    self._stop.wait(self.poll_seconds)
+            except Exception as e:  # DB down etc.: back off, keep the thread alive
+                logger.warning("job worker: %s", e)
+                self._stop.wait(self.poll_seconds)
+
+    def _heartbeat(self, run_id: str, lease: str, done: threading.Event) -> None:
+        while not done.wait(self.lease_seconds / 3):
+            try:
+                if not heartbeat(self.engine, run_id, lease, self.lease_seconds):
+                    return  # cancelled, or claimed again: finish_run will drop the result
+            except Exception as e:  # a missed beat is retried; the lease has slack
+                logger.warning("job %s heartbeat failed: %s", run_id, e)
+
+    def _run(self, job: Dict[str, Any]) -> None:
+        run_id, kind = job["id"], job["kind"]
+        params = job["params"] or {}
+        done = threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(run_id, job["lease"], done),
+                                name=f"job-heartbeat-{run_id}", daemon=True)
+        beat.start()
+        try:
+            result = asyncio.run(self.handlers[kind](params.get("payload") or {}, run_id))
+            if isinstance(result, Response):  # memoized routes return the encoded body
+                result = json.loads(result.body)
+            status = "done"
+        except RunCancelled:
+            logger.info("job %s (%s) cancelled", run_id, kind)
+            return
+        except HTTPException as e:
+            status, result = "error", {"error": e.detail, "status_code": e.status_code}
+        except Exception as e:
+            logger.exception("job %s (%s) failed", run_id, kind)
+            status, result = "error", {"error": str(e)}
+        finally:
+            done.set()
+            beat.join()
+        if not finish_run(self.engine, run_id, status, result, lease=job["lease"]):
+            logger.info("job %s (%s) was cancelled or reclaimed while running; result dropped",
+                        run_id, kind)
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="runs queue worker")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    w = sub.add_parser("worker")
+    w.add_argument("--threads", type=int, default=max(1, JOB_WORKERS))
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+    from db_mep_v2 import engine
+    from routers_jobs_mep_v2 import JOB_HANDLERS
+    if engine is None:
+        raise SystemExit("job worker needs the database (DATABASE_URL)")
+    worker = JobWorker(engine, JOB_HANDLERS, threads=args.threads)
+    worker.start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        worker.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# kernels_mep_v2.py
+# Vectorized rolling-window kernels on plain float64 arrays.
+#
+# No Python callbacks per bar: rolling sums/means use cumulative sums (O(n)),
+# WMA uses one np.convolve pass, rolling min/max use log2(k) doubling passes
+# and the CCI mean deviation uses sliding_window_view in bounded chunks
+# (O(n*k) work, O(chunk*k) memory).
+# Warm-up positions and any window touching a NaN come back as NaN, the same
+# contract as pandas' rolling(period).
+#
+# Every kernel works along the last axis, so a (n_symbols, n_bars) matrix is
+# processed in the same single pass as a 1-D series.
+from __future__ import annotations
+
+from typing import Callable
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# windows (summed over leading axes) materialised at once by mean_deviation
+MD_CHUNK = 1 << 16
+
+def _check(x: np.ndarray, period: int) -> np.ndarray:
+    if period < 1:
+        raise ValueError("period must be >= 1")
+    return np.asarray(x, dtype=np.float64)
+
+def prefix_sums(x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """NaN-as-zero cumulative sum and cumulative NaN count, both with a leading 0."""
+    x = np.asarray(x, dtype=np.float64)
+    n = x.shape[-1]
+    nan = np.isnan(x)
+    cs = np.zeros(x.shape[:-1] + (n + 1,))
+    np.cumsum(np.where(nan, 0.0, x), axis=-1, out=cs[..., 1:])
+    cn = np.zeros(x.shape[:-1] + (n + 1,), dtype=np.int64)
+    np.cumsum(nan, axis=-1, out=cn[..., 1:])
+    return cs, cn
+
+def window_sums(cs: np.ndarray, cn: np.ndarray, period: int) -> np.ndarray:
+    """Rolling sums from prefix_sums; reuse one (cs, cn) pair across periods."""
+    if period < 1:
+        raise ValueError("period must be >= 1")
+    n = cs.shape[-1] - 1
+    out = np.full(cs.shape[:-1] + (n,), np.nan)
+    if n < period:
+        return out
+    s = cs[..., period:] - cs[..., :-period]
+    s[(cn[..., period:] - cn[..., :-period]) > 0] = np.nan
+    out[..., period-1:] = s
+    return out
+
+def rolling_sum(x: np.ndarray, period: int) -> np.ndarray:
+    x = _check(x, period)
+    return window_sums(*prefix_sums(x), period)
+
+def rolling_mean(x: np.ndarray, period: int) -> np.ndarray:
+    return rolling_sum(x, period) / period
+
+def _window_reduce(x: np.ndarray, period: int, fn: Callable[[np.ndarray, np.ndarray], np.ndarray],
+                   center: np.ndarray | None = None) -> np.ndarray:
+    # fn(windows[..., m, period], center[..., m]) -> [..., m]
+    n = x.shape[-1]
+    out = np.full(x.shape, np.nan)
+    if n < period:
+        return out
+    win = sliding_window_view(x, period, axis=-1)
+    ctr = None if center is None else np.asarray(center, dtype=np.float64)[..., period-1:]
+    res = out[..., period-1:]
+    step = max(1, MD_CHUNK // max(1, int(np.prod(x.shape[:-1]))))
+    for a in range(0, win.shape[-2], step):
+        b = a + step
+        res[..., a:b] = fn(win[..., a:b, :], None if ctr is None else ctr[..., a:b])
+    return out
+
+def _rolling_extreme(x: np.ndarray, period: int, op: np.ufunc) -> np.ndarray:
+    # doubling: after the loop m[t] = op(x[t-w+1..t]) with w the largest power
+    # of two <= period; two overlapping w-windows then cover the full period.
+    # log2(period) whole-array passes instead of one reduction per window.
+    x = _check(x, period)
+    n = x.shape[-1]
+    out = np.full(x.shape, np.nan)
+    if n < period:
+        return out
+    m = x.copy()
+    w = 1
+    while 2 * w <= period:
+        m[..., w:] = op(m[..., w:], m[..., :-w])
+        w *= 2
+    r = period - w
+    out[..., period-1:] = op(m[..., period-1:], m[..., period-1-r:n-r])
+    return out
+
+def rolling_max(x: np.ndarray, period: int) -> np.ndarray:
+    return _rolling_extreme(x, period, np.maximum)
+
+def rolling_min(x: np.ndarray, period: int) -> np.ndarray:
+    return _rolling_extreme(x, period, np.minimum)
+
+def wma(x: np.ndarray, period: int) -> np.ndarray:
+    """Linearly weighted moving average; the newest bar gets weight `period`."""
+    x = _check(x, period)
+    n = x.shape[-1]
+    out = np.full(x.shape, np.nan)
+    if n < period:
+        return out
+    weights = np.arange(1, period+1, dtype=np.float64)
+    if x.ndim == 1:
+        # np.convolve flips the kernel, so pass the weights oldest-last
+        out[period-1:] = np.convolve(x, weights[::-1], mode="valid")
+    else:
+        windows = sliding_window_view(x, period, axis=-1)
+        out[..., period-1:] = np.einsum("...k,k->...", windows, weights)
+    out /= weights.sum()
+    return out
+
+def trima(x: np.ndarray, period: int) -> np.ndarray:
+    """Triangular MA as the SMA of the SMA (same period twice)."""
+    return rolling_mean(rolling_mean(x, period), period)
+
+def mean_deviation(x: np.ndarray, period: int, center: np.ndarray | None = None) -> np.ndarray:
+    """
+    Textbook rolling mean absolute deviation:
+        md[t] = mean(|x[t-period+1..t] - center[t]|)
+    with center defaulting to the rolling mean ending at t.
+    """
+    x = _check(x, period)
+    if center is None:
+        center = rolling_mean(x, period)
+    return _window_reduce(x, period, lambda w, c: np.abs(w - c[..., None]).mean(axis=-1), center)
+
+def typical_price(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    return sum(np.asarray(a, np.float64) for a in (high, low, close)) / 3
+
+def cci(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 20) -> np.ndarray:
+    tp = typical_price(high, low, close)
+    ma = rolling_mean(tp, period)
+    md = mean_deviation(tp, period, ma)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (tp - ma) / (0.015 * md)
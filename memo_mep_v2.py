@@ -0,0 +1,164 @@
+# memo_mep_v2.py
+# Content-addressed memo for backtest responses.
+#
+# Key: blake2b of (MEMO_VERSION, route kind, digest of the input bar arrays,
+# canonical JSON of everything else the result depends on: strategy, params,
+# fees, slippage, window/step, indicator specs, ...). Same bars + same spec
+# -> same key, whatever symbol/tenant/lookback produced the bars.
+#
+# Values are the encoded JSON response body, so a hit is byte-identical to
+# the recompute that stored it.
+#   - memory tier: LRU bounded by entries and bytes (per process);
+#   - persistent tier (BACKTEST_MEMO_PERSIST=1): a `runs` row with id
+#     "memo:<key>", kind="memo", the spec in `params` and {"body": <text>}
+#     in `result`. Memory misses fall through to it and promote the hit.
+#
+# Bump MEMO_VERSION whenever engine semantics change: persisted entries from
+# older code then simply stop matching.
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from prometheus_client import Counter, Gauge
+from sqlalchemy import text
+
+from indicators_mep_v2 import OHLCV_COLS
+
+logger = logging.getLogger("mep.memo")
+
+MEMO_VERSION = 1
+MEMO_HITS = Counter("mep_backtest_memo_hits", "Backtest memo hits.", ["tier"])
+MEMO_MISSES = Counter("mep_backtest_memo_misses", "Backtest memo misses (recomputed).")
+MEMO_BYTES = Gauge("mep_backtest_memo_bytes", "Bytes held by the in-memory backtest memo.")
+
+BAR_COLS = ("ts",) + OHLCV_COLS
+
+def bars_digest(df: pd.DataFrame, cols: Sequence[str] = BAR_COLS) -> str:
+    """Digest of the bar arrays (dtype, length and raw bytes per column)."""
+    h = hashlib.blake2b(digest_size=20)
+    for c in cols:
+        a = np.ascontiguousarray(df[c].to_numpy())
+        h.update(f"{c}:{a.dtype.str}:{len(a)};".encode())
+        h.update(a.tobytes())
+    return h.hexdigest()
+
+def memo_key(kind: str, digest: str, spec: Mapping[str, Any]) -> str:
+    blob = json.dumps([MEMO_VERSION, kind, digest, spec], sort_keys=True, separators=(",", ":"),
+                      default=str)
+    return hashlib.blake2b(blob.encode(), digest_size=20).hexdigest()
+
+def encode(result: Any) -> bytes:
+    return json.dumps(result, separators=(",", ":"), allow_nan=False).encode()
+
+class BacktestMemo:
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 2**20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key: str, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = body
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, ev = self._entries.popitem(last=False)
+                self._bytes -= len(ev)
+                self.evictions += 1
+            MEMO_BYTES.set(self._bytes)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            MEMO_BYTES.set(0)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions}
+
+BACKTEST_MEMO = BacktestMemo(
+    max_entries=int(os.getenv("BACKTEST_MEMO_MAX_ENTRIES", "1024")),
+    max_bytes=int(os.getenv("BACKTEST_MEMO_MAX_MB", "64")) * 2**20,
+)
+PERSIST = os.getenv("BACKTEST_MEMO_PERSIST", "0").lower() in ("1", "true", "yes")
+
+# -----------------------------------------------------------------------------
+# Persistent tier (`runs`)
+# -----------------------------------------------------------------------------
+def load_persistent(engine, key: str) -> Optional[bytes]:
+    if engine is None:
+        return None
+    with engine.connect() as conn:
+        body = conn.execute(text("SELECT result->>'body' FROM runs "
+                                 "WHERE id=:id AND kind='memo' AND status='done'"),
+                            {"id": "memo:" + key}).scalar()
+    return body.encode() if body is not None else None
+
+def save_persistent(engine, key: str, kind: str, digest: str, spec: Mapping[str, Any], body: bytes,
+                    tenant_id: str = "default") -> None:
+    if engine is None:
+        return
+    params = json.dumps({"kind": kind, "bars": digest, "spec": spec, "version": MEMO_VERSION},
+                        default=str)
+    result = json.dumps({"body": body.decode()})
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO runs (id, tenant_id, kind, status, params, result)
+            VALUES (:id, :tenant_id, 'memo', 'done', CAST(:params AS jsonb), CAST(:result AS jsonb))
+            ON CONFLICT (id) DO NOTHING
+        """), {"id": "memo:" + key, "tenant_id": tenant_id, "params": params, "result": result})
+
+# -----------------------------------------------------------------------------
+# Both tiers (sync; call from a threadpool when the persistent tier is on)
+# -----------------------------------------------------------------------------
+def lookup(key: str, engine=None, persist: Optional[bool] = None) -> Optional[bytes]:
+    body = BACKTEST_MEMO.get(key)
+    if body is not None:
+        MEMO_HITS.labels("memory").inc()
+        return body
+    if PERSIST if persist is None else persist:
+        try:
+            body = load_persistent(engine, key)
+        except Exception as e:
+            logger.warning("memo read failed: %s", e)
+        if body is not None:
+            MEMO_HITS.labels("persistent").inc()
+            BACKTEST_MEMO.put(key, body)
+            return body
+    MEMO_MISSES.inc()
+    return None
+
+def store(key: str, body: bytes, engine=None, persist: Optional[bool] = None, *, kind: str,
+          digest: str, spec: Mapping[str, Any], tenant_id: str = "default") -> None:
+    BACKTEST_MEMO.put(key, body)
+    if PERSIST if persist is None else persist:
+        try:
+            save_persistent(engine, key, kind, digest, spec, body, tenant_id)
+        except Exception as e:
+            logger.warning("memo write failed: %s", e)
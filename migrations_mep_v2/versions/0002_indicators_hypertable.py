@@ -0,0 +1,44 @@
+from alembic import op
+
+revision = '0002_indicators_hypertable'
+down_revision = '0001_init_timescale'
+branch_labels = None
+depends_on = None
+
+# columns of indicators_mep_v2.DEFAULT_INDICATORS (indicators_store_mep_v2.MATERIALIZED_COLUMNS)
+def upgrade():
+    op.execute("""
+    CREATE TABLE IF NOT EXISTS indicators (
+        tenant_id text NOT NULL,
+        market text NOT NULL,
+        symbol text NOT NULL,
+        timeframe text NOT NULL,
+        ts bigint NOT NULL,
+        ema20 double precision, sma20 double precision, rsi double precision,
+        macd double precision, macd_signal double precision, macd_hist double precision,
+        atr double precision,
+        bb_mid double precision, bb_up double precision, bb_low double precision,
+        obv double precision, vwap double precision,
+        stoch_k double precision, stoch_d double precision,
+        PRIMARY KEY (tenant_id, market, symbol, timeframe, ts)
+    );
+    """)
+    op.execute("SELECT create_hypertable('indicators','ts', chunk_time_interval => 604800000, "
+               "if_not_exists => TRUE);")
+    op.execute("""
+    CREATE TABLE IF NOT EXISTS indicator_state (
+        tenant_id text NOT NULL,
+        market text NOT NULL,
+        symbol text NOT NULL,
+        timeframe text NOT NULL,
+        state_ts bigint NOT NULL,
+        specs jsonb NOT NULL,
+        state jsonb NOT NULL,
+        updated_at timestamptz DEFAULT now(),
+        PRIMARY KEY (tenant_id, market, symbol, timeframe)
+    );
+    """)
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS indicator_state;")
+    op.execute("DROP TABLE IF EXISTS indicators;")
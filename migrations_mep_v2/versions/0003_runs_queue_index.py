@@ -0,0 +1,15 @@
+from alembic import op
+
+revision = '0003_runs_queue_index'
+down_revision = '0002_indicators_hypertable'
+branch_labels = None
+depends_on = None
+
+# runs_mep_v2.claim_run: oldest queued run of some kinds; the partial index keeps
+# the claim cheap however many done/memo rows the table accumulates
+def upgrade():
+    op.execute("CREATE INDEX IF NOT EXISTS runs_queued_idx ON runs (created_at, id) "
+               "WHERE status = 'queued';")
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS runs_queued_idx;")
@@ -0,0 +1,14 @@
+from alembic import op
+
+revision = '0004_pnl_equity_full'
+down_revision = '0003_runs_queue_index'
+branch_labels = None
+depends_on = None
+
+# simulated_pnl.equity_full: full-resolution equity as compressed float32
+# (downsample_mep_v2.encode_curve); equity_curve keeps only the downsampled points
+def upgrade():
+    op.execute("ALTER TABLE IF EXISTS simulated_pnl ADD COLUMN IF NOT EXISTS equity_full bytea;")
+
+def downgrade():
+    op.execute("ALTER TABLE IF EXISTS simulated_pnl DROP COLUMN IF EXISTS equity_full;")
@@ -0,0 +1,28 @@
+from alembic import op
+
+revision = '0005_backtest_state'
+down_revision = '0004_pnl_equity_full'
+branch_labels = None
+depends_on = None
+
+# backtesting_mep_v2.BacktestState of live runs (backtest_state_mep_v2), one per
+# key x strategy x params hash; state_ts is the last bar the state covers
+def upgrade():
+    op.execute("""
+    CREATE TABLE IF NOT EXISTS backtest_state (
+        tenant_id text NOT NULL,
+        market text NOT NULL,
+        symbol text NOT NULL,
+        timeframe text NOT NULL,
+        strategy text NOT NULL,
+        params_hash text NOT NULL,
+        params jsonb NOT NULL,
+        state_ts bigint NOT NULL,
+        state jsonb NOT NULL,
+        updated_at timestamptz DEFAULT now(),
+        PRIMARY KEY (tenant_id, market, symbol, timeframe, strategy, params_hash)
+    );
+    """)
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS backtest_state;")
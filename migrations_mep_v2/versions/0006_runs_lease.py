@@ -0,0 +1,20 @@
+from alembic import op
+
+revision = '0006_runs_lease'
+down_revision = '0005_backtest_state'
+branch_labels = None
+depends_on = None
+
+# runs_mep_v2 job leases: a claimed job is `running` until lease_until, renewed
+# by its worker's heartbeat; claim_run takes over running jobs whose lease
+# expired (crashed worker). lease_token identifies the claim holding the lease.
+def upgrade():
+    op.execute("ALTER TABLE IF EXISTS runs ADD COLUMN IF NOT EXISTS lease_until timestamptz;")
+    op.execute("ALTER TABLE IF EXISTS runs ADD COLUMN IF NOT EXISTS lease_token text;")
+    op.execute("CREATE INDEX IF NOT EXISTS runs_lease_idx ON runs (lease_until) "
+               "WHERE status = 'running';")
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS runs_lease_idx;")
+    op.execute("ALTER TABLE IF EXISTS runs DROP COLUMN IF EXISTS lease_token;")
+    op.execute("ALTER TABLE IF EXISTS runs DROP COLUMN IF EXISTS lease_until;")
@@ -21,6 +21,8 @@ class Run(Base):
     params = Column(JSON, nullable=False)
     result = Column(JSON)
     created_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"))
+    lease_until = Column(TIMESTAMP(timezone=True))  # running jobs: claimed again after this
+    lease_token = Column(String)
 
 class Signal(Base):
     __tablename__ = "signals"
@@ -44,8 +46,10 @@ class AuditLog(Base):
 
 
 # === NEW: Metrics models (v2) ===
+from sqlalchemy import Integer, LargeBinary
 from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy import Integer
+from sqlalchemy.orm import deferred
+
 
 class AccuracyMetric(Base):
     __tablename__ = "accuracy_metrics"
@@ -74,6 +78,8 @@ class SimulatedPnL(Base):
     total_pnl = Column(Float, nullable=False, default=0.0)
     max_drawdown = Column(Float, nullable=False, default=0.0)
     n_trades = Column(Integer, nullable=False, default=0)
-    equity_curve = Column(JSONB)
+    equity_curve = Column(JSONB)  # downsampled {"n", "ts", "equity"}; a plain list in older rows
+    # full resolution, downsample_mep_v2.encode_curve; deferred: loaded only on access
+    equity_full = deferred(Column(LargeBinary))
     created_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"))
     __table_args__ = (UniqueConstraint('tenant_id','market','symbol','timeframe','fee_bps','slippage_bps', name='uq_pnl_key'),)
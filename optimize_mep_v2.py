@@ -0,0 +1,359 @@
+# optimize_mep_v2.py
+# Grid search of a STRATEGY_REGISTRY strategy over one indicator frame.
+#
+#   out = optimize(df, "mean_reversion",
+#                  {"rsi_buy": range(20, 41, 2), "rsi_sell": range(60, 81, 2)},
+#                  top_k=10, rank_by="pnl")
+#
+#   wf = walk_forward_optimize(df, "mean_reversion", grid, window=500, step=100)
+#   cv = cross_validate(df, "mean_reversion", grid, k=5, purge=20, embargo=10)
+#
+# The grid is split into chunks; each chunk is one pool task that builds the
+# chunk's signals, stacks them and runs event_backtest_matrix once. The frame
+# is published once to shared memory and attached zero-copy by every worker
+# (pool initializer); tasks only carry param dicts, so IPC per task stays small
+# next to the work it buys.
+from __future__ import annotations
+
+import inspect
+import itertools
+import math
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backtesting_mep_v2 import (
+    RANK_METRICS,
+    event_backtest_arrays,
+    event_backtest_matrix,
+    purged_kfold,
+    rank_order,
+    ret_dd,
+    walk_forward_anchored,
+)
+from shm_mep_v2 import ShmHandle, attach_frame, publish_frame
+from strategies_mep_v1 import STRATEGY_REGISTRY
+
+# refuse grids larger than this (each point is a full backtest)
+MAX_GRID = int(os.getenv("OPTIMIZE_MAX_GRID", "200000"))
+# target tasks per worker: enough for load balancing/progress, few enough to amortize IPC
+TASKS_PER_WORKER = 4
+MAX_CHUNK = 256
+
+Progress = Callable[[int, int], None]
+
+def pool_context():
+    # the API process is multi-threaded (event loop + threadpool): never plain fork it
+    return mp.get_context("forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn")
+
+def default_workers() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # not on Linux
+        return os.cpu_count() or 1
+
+def _check(strategy: str, rank_by: str, params_list: Sequence[Mapping[str, Any]] = ()) -> None:
+    if strategy not in STRATEGY_REGISTRY:
+        raise ValueError(f"unknown strategy {strategy!r}")
+    if rank_by not in RANK_METRICS:
+        raise ValueError(f"rank_by must be one of {sorted(RANK_METRICS)}")
+    # params the strategy does not take fail here, not as a TypeError in a worker
+    sig = inspect.signature(STRATEGY_REGISTRY[strategy])
+    for p in params_list:
+        try:
+            sig.bind(None, **p)
+        except TypeError as e:
+            raise ValueError(f"bad params for {strategy!r}: {e}") from None
+
+def param_grid(grid: Mapping[str, Any]) -> List[Dict[str, Any]]:
+    """Cartesian product of {name: values}; a scalar value is a one-point axis."""
+    if not isinstance(grid, Mapping) or not grid:
+        raise ValueError("grid must be a non-empty mapping of param -> values")
+    names, axes = [], []
+    for name, vals in grid.items():
+        vals = list(vals) if isinstance(vals, (list, tuple, range, np.ndarray)) else [vals]
+        if not vals:
+            raise ValueError(f"grid axis {name!r} is empty")
+        names.append(name); axes.append(vals)
+    size = math.prod(len(a) for a in axes)
+    if size > MAX_GRID:
+        raise ValueError(f"grid has {size} points; limit is {MAX_GRID}")
+    return [dict(zip(names, combo)) for combo in itertools.product(*axes)]
+
+def _chunks(n: int, workers: int, chunk_size: Optional[int]) -> List[range]:
+    size = chunk_size or min(MAX_CHUNK, max(1, math.ceil(n / (workers * TASKS_PER_WORKER))))
+    return [range(a, min(n, a + size)) for a in range(0, n, size)]
+
+# -----------------------------------------------------------------------------
+# Evaluation (runs in workers, or inline)
+# -----------------------------------------------------------------------------
+def evaluate_params(df: pd.DataFrame, strategy: str, params_list: Sequence[Mapping[str, Any]],
+                    fee_bps: float = 10.0, slippage_bps: float = 5.0) -> Dict[str, np.ndarray]:
+    """event_backtest_matrix result for every params in params_list, in order."""
+    fn = STRATEGY_REGISTRY[strategy]
+    sigs = np.empty((len(params_list), len(df)), dtype=np.int8)
+    for i, p in enumerate(params_list):
+        sigs[i] = fn(df, **p)["signal"].to_numpy()
+    return event_backtest_matrix(df["close"].to_numpy(), sigs, fee_bps, slippage_bps)
+
+_WORKER: Dict[str, Any] = {}
+
+def _init_worker(handles: Mapping[str, ShmHandle], fee_bps: float, slippage_bps: float) -> None:
+    _WORKER.update(df=attach_frame(handles), fee_bps=fee_bps, slippage_bps=slippage_bps)
+
+def _in_worker(fn: Callable, *args):
+    return fn(_WORKER["df"], _WORKER["fee_bps"], _WORKER["slippage_bps"], *args)
+
+def _eval_chunk(df: pd.DataFrame, fee_bps: float, slippage_bps: float, strategy: str,
+                params_list: Sequence[Mapping[str, Any]]) -> Dict[str, np.ndarray]:
+    return evaluate_params(df, strategy, params_list, fee_bps, slippage_bps)
+
+def pool_size(workers: Optional[int], n_tasks: int) -> int:
+    return max(1, min(workers or default_workers(), n_tasks))
+
+def iter_tasks(df: pd.DataFrame, tasks: Sequence[Tuple[Callable, tuple, int]], fee_bps: float,
+               slippage_bps: float, workers: Optional[int] = None) -> Iterator[Tuple[int, Any]]:
+    """
+    Run fn(df, fee_bps, slippage_bps, *args) for each (fn, args, weight) task,
+    yielding (task index, result) as tasks complete. pool_size(workers, len(tasks))
+    == 1 runs inline, in order; otherwise df is published to shared memory
+    (shm_mep_v2) for the pool's lifetime, workers attach it zero-copy in the
+    initializer and tasks only carry fn and args. Closing the generator early
+    cancels the tasks not yet started.
+    """
+    workers = pool_size(workers, len(tasks))
+    if workers == 1:
+        for j, (fn, args, _) in enumerate(tasks):
+            yield j, fn(df, fee_bps, slippage_bps, *args)
+        return
+    with publish_frame(df) as shared, ProcessPoolExecutor(
+            max_workers=workers, mp_context=pool_context(), initializer=_init_worker,
+            initargs=(shared.handles, fee_bps, slippage_bps)) as pool:
+        futs = {pool.submit(_in_worker, fn, *args): j for j, (fn, args, _) in enumerate(tasks)}
+        try:
+            for f in as_completed(futs):
+                yield futs[f], f.result()
+        except BaseException:  # includes GeneratorExit
+            for f in futs:  # don't wait for the remaining tasks
+                f.cancel()
+            raise
+
+def run_tasks(df: pd.DataFrame, tasks: Sequence[Tuple[Callable, tuple, int]], fee_bps: float,
+              slippage_bps: float, workers: Optional[int] = None,
+              progress: Optional[Progress] = None) -> Tuple[List[Any], int]:
+    """
+    iter_tasks collected: (results in task order, workers used).
+    progress(done, total) counts task weights, called in this process.
+    """
+    total = sum(w for _, _, w in tasks)
+    out: List[Any] = [None] * len(tasks)
+    done = 0
+    for j, r in iter_tasks(df, tasks, fee_bps, slippage_bps, workers):
+        out[j] = r
+        done += tasks[j][2]
+        if progress:
+            progress(done, total)
+    return out, pool_size(workers, len(tasks))
+
+def _concat(parts: Sequence[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    return {k: np.concatenate([p[k] for p in parts]) for k in ("pnl", "max_dd", "trades")}
+
+def summarize(res: Dict[str, np.ndarray], params_list: Sequence[Mapping[str, Any]],
+              rank_by: str = "pnl", top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Ranked rows (best first) of an evaluation result; JSON-safe (NaN ret_dd -> None)."""
+    rdd = ret_dd(res)
+    order = rank_order(res, rank_by)
+    out = []
+    for rank, i in enumerate(order[:top_k] if top_k else order, 1):
+        out.append({"rank": rank, "params": dict(params_list[i]), "pnl": float(res["pnl"][i]),
+                    "max_dd": float(res["max_dd"][i]), "trades": int(res["trades"][i]),
+                    "ret_dd": None if np.isnan(rdd[i]) else float(rdd[i])})
+    return out
+
+# -----------------------------------------------------------------------------
+# Grid search
+# -----------------------------------------------------------------------------
+def optimize(df: pd.DataFrame, strategy: str, grid: Mapping[str, Any], top_k: int = 10,
+             rank_by: str = "pnl", fee_bps: float = 10.0, slippage_bps: float = 5.0,
+             workers: Optional[int] = None, chunk_size: Optional[int] = None,
+             progress: Optional[Progress] = None) -> Dict[str, Any]:
+    """
+    Evaluate every point of `grid` and return the top_k by rank_by.
+    workers=None uses every core this process may run on; workers=1 (or a
+    single chunk) evaluates inline. progress(done, total) counts grid points
+    and is called in the caller's process after each chunk.
+    """
+    params_list = param_grid(grid)
+    _check(strategy, rank_by, params_list)
+    n = len(params_list)
+    chunks = _chunks(n, max(1, min(workers or default_workers(), n)), chunk_size)
+    tasks = [(_eval_chunk, (strategy, params_list[r.start:r.stop]), len(r)) for r in chunks]
+    parts, workers = run_tasks(df, tasks, fee_bps, slippage_bps, workers, progress)
+    res = _concat(parts)
+    return {"strategy": strategy, "evaluated": n, "workers": workers, "chunks": len(chunks),
+            "rank_by": rank_by, "top": summarize(res, params_list, rank_by, top_k)}
+
+# -----------------------------------------------------------------------------
+# Walk-forward optimization
+# -----------------------------------------------------------------------------
+def _oos(df: pd.DataFrame, fee_bps: float, slippage_bps: float, strategy: str,
+         params: Mapping[str, Any], te: slice) -> Tuple[float, float, int, np.ndarray]:
+    # one bar of lead-in, so the window's first signal sees the bar before it
+    lead = 1 if te.start > 0 else 0
+    frame = df.iloc[te.start - lead:te.stop]
+    sig = STRATEGY_REGISTRY[strategy](frame, **params)["signal"].to_numpy()[lead:]
+    pnl, dd, trades, _ = event_backtest_arrays(df["close"].to_numpy()[te], sig, None, fee_bps,
+                                               slippage_bps)
+    return pnl, dd, len(trades), sig
+
+def _wf_fold(df: pd.DataFrame, fee_bps: float, slippage_bps: float, strategy: str,
+             params_list: Sequence[Mapping[str, Any]], rank_by: str, tr: slice, te: slice,
+             keep: int) -> Dict[str, Any]:
+    # in-sample: whole grid in one matrix pass, keep the best
+    res = evaluate_params(df.iloc[tr], strategy, params_list, fee_bps, slippage_bps)
+    best = int(rank_order(res, rank_by)[0])
+    pnl, dd, trades, sig = _oos(df, fee_bps, slippage_bps, strategy, params_list[best], te)
+    return {"best": best, "is": {k: res[k][best].item() for k in ("pnl", "max_dd", "trades")},
+            "pnl": pnl, "max_dd": dd, "trades": trades, "signal": sig[:keep]}
+
+def iter_walk_forward(df: pd.DataFrame, strategy: str, grid: Optional[Mapping[str, Any]],
+                      window: int = 500, step: int = 100, rank_by: str = "pnl",
+                      fee_bps: float = 10.0, slippage_bps: float = 5.0,
+                      workers: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Anchored walk-forward (walk_forward_anchored): each fold picks the best
+    grid point on its in-sample bars [0, start) and trades it on the OOS window.
+    Folds are independent and run as pool tasks.
+
+    Yields {"type": "fold", "fold": i, ...} as each fold completes (completion
+    order, not fold order), then one {"type": "oos", ...} with the stitched
+    OOS backtest. Only the folds' stitched signal pieces are kept meanwhile.
+
+    OOS windows overlap when step < window, so the stitched OOS curve trades
+    each fold's params from its window start until the next fold takes over
+    (the last fold runs to its window end), as one continuous backtest.
+    An empty grid evaluates the strategy defaults.
+    """
+    params_list = param_grid(grid) if grid else [{}]
+    _check(strategy, rank_by, params_list)
+    folds = [(tr, te) for tr, te in walk_forward_anchored(len(df), window, step) if te.start > 0]
+    if not folds:
+        yield {"type": "oos", "start": None, "pnl": 0.0, "max_dd": 0.0, "trades": 0,
+               "equity": np.ones(0)}
+        return
+    stops = [te.start for _, te in folds[1:]] + [folds[-1][1].stop]
+    tasks = [(_wf_fold, (strategy, params_list, rank_by, tr, te, stop - te.start), 1)
+             for (tr, te), stop in zip(folds, stops)]
+    sigs: List[Optional[np.ndarray]] = [None] * len(folds)
+    for j, r in iter_tasks(df, tasks, fee_bps, slippage_bps, workers):
+        (tr, te), stop = folds[j], stops[j]
+        sigs[j] = r["signal"]
+        yield {"type": "fold", "fold": j, "is": [tr.start, tr.stop], "oos": [te.start, te.stop],
+               "stitched": [te.start, stop], "params": dict(params_list[r["best"]]),
+               "is_metrics": r["is"], "pnl": r["pnl"], "max_dd": r["max_dd"], "trades": r["trades"]}
+    a, b = folds[0][1].start, stops[-1]
+    pnl, dd, trades, eq = event_backtest_arrays(df["close"].to_numpy()[a:b], np.concatenate(sigs),
+                                                None, fee_bps, slippage_bps)
+    yield {"type": "oos", "start": a, "pnl": pnl, "max_dd": dd, "trades": len(trades), "equity": eq}
+
+def walk_forward_optimize(df: pd.DataFrame, strategy: str, grid: Optional[Mapping[str, Any]],
+                          window: int = 500, step: int = 100, rank_by: str = "pnl",
+                          fee_bps: float = 10.0, slippage_bps: float = 5.0,
+                          workers: Optional[int] = None,
+                          progress: Optional[Progress] = None) -> Dict[str, Any]:
+    """iter_walk_forward collected: folds in fold order plus the stitched "oos" record."""
+    n_folds = sum(1 for _, te in walk_forward_anchored(len(df), window, step) if te.start > 0)
+    folds: List[Dict[str, Any]] = [{}] * n_folds
+    oos: Dict[str, Any] = {}
+    done = 0
+    for rec in iter_walk_forward(df, strategy, grid, window, step, rank_by, fee_bps, slippage_bps,
+                                 workers):
+        if rec.pop("type") == "oos":
+            oos = rec
+            continue
+        folds[rec.pop("fold")] = rec
+        done += 1
+        if progress:
+            progress(done, n_folds)
+    return {"strategy": strategy, "rank_by": rank_by,
+            "evaluated": len(param_grid(grid)) if grid else 1,
+            "workers": pool_size(workers, n_folds) if n_folds else 0, "folds": folds, "oos": oos}
+
+# -----------------------------------------------------------------------------
+# Purged k-fold cross-validation
+# -----------------------------------------------------------------------------
+CV_METRICS = ("pnl", "max_dd", "trades", "ret_dd")
+
+def _blocks(idx: np.ndarray) -> List[slice]:
+    """Contiguous runs of a sorted index array as slices."""
+    if not len(idx):
+        return []
+    cut = np.flatnonzero(np.diff(idx) != 1) + 1
+    return [slice(int(r[0]), int(r[-1]) + 1) for r in np.split(idx, cut)]
+
+def _cv_fold(df: pd.DataFrame, fee_bps: float, slippage_bps: float, strategy: str,
+             params_list: Sequence[Mapping[str, Any]], rank_by: str, train: List[slice],
+             te: slice) -> Dict[str, Any]:
+    # train is up to two blocks (before / after the test fold), backtested apart: pnl and
+    # trades add up, max_dd is the worse of the two
+    if not train:
+        raise ValueError(f"fold {te.start}:{te.stop} has no training bars")
+    parts = [evaluate_params(df.iloc[b], strategy, params_list, fee_bps, slippage_bps)
+             for b in train]
+    res = {"pnl": sum(p["pnl"] for p in parts),
+           "max_dd": np.max([p["max_dd"] for p in parts], axis=0),
+           "trades": sum(p["trades"] for p in parts)}
+    best = int(rank_order(res, rank_by)[0])
+    pnl, dd, trades, _ = _oos(df, fee_bps, slippage_bps, strategy, params_list[best], te)
+    return {"best": best, "is": {k: res[k][best].item() for k in ("pnl", "max_dd", "trades")},
+            "pnl": pnl, "max_dd": dd, "trades": trades}
+
+def distribution(values: Sequence[Optional[float]]) -> Dict[str, Optional[float]]:
+    """Summary of per-fold values (None/NaN dropped); JSON-safe."""
+    v = np.asarray([x for x in values if x is not None], dtype=np.float64)
+    v = v[~np.isnan(v)]
+    if not len(v):
+        return {"n": 0, "mean": None, "std": None, "min": None, "p25": None, "median": None,
+                "p75": None, "max": None}
+    q = np.percentile(v, [0, 25, 50, 75, 100])
+    return {"n": int(len(v)), "mean": float(v.mean()), "std": float(v.std()),
+            "min": float(q[0]), "p25": float(q[1]), "median": float(q[2]), "p75": float(q[3]),
+            "max": float(q[4])}
+
+def cross_validate(df: pd.DataFrame, strategy: str, grid: Optional[Mapping[str, Any]], k: int = 5,
+                   purge: int = 20, embargo: int = 0, rank_by: str = "pnl", fee_bps: float = 10.0,
+                   slippage_bps: float = 5.0, workers: Optional[int] = None,
+                   progress: Optional[Progress] = None) -> Dict[str, Any]:
+    """
+    Purged k-fold (backtesting_mep_v2.purged_kfold): each fold picks the best
+    grid point on its train bars and is scored on its test fold. Folds run as
+    pool tasks over the same indicator frame, computed once by the caller and
+    shared with the workers through shared memory. An empty grid scores the strategy defaults.
+    Returns the per-fold results and the distribution of each fold metric.
+    """
+    params_list = param_grid(grid) if grid else [{}]
+    _check(strategy, rank_by, params_list)
+    if k < 2 or purge < 0 or embargo < 0:
+        raise ValueError("need k >= 2, purge >= 0, embargo >= 0")
+    if len(df) < 2 * k:
+        raise ValueError(f"{len(df)} bars is too few for {k} folds")
+    folds = [(_blocks(tr), te) for tr, te in purged_kfold(len(df), k, purge, embargo)]
+    empty = [f"{te.start}:{te.stop}" for tr, te in folds if not tr]
+    if empty:
+        raise ValueError(f"purge/embargo leave no training bars for test folds {empty}")
+    tasks = [(_cv_fold, (strategy, params_list, rank_by, tr, te), 1) for tr, te in folds]
+    results, workers = run_tasks(df, tasks, fee_bps, slippage_bps, workers, progress)
+    out_folds = []
+    for (tr, te), r in zip(folds, results):
+        rdd = r["pnl"] / r["max_dd"] if r["max_dd"] > 0 else None
+        out_folds.append({"test": [te.start, te.stop], "train": [[b.start, b.stop] for b in tr],
+                          "params": dict(params_list[r["best"]]), "is_metrics": r["is"],
+                          "pnl": r["pnl"], "max_dd": r["max_dd"], "trades": r["trades"],
+                          "ret_dd": rdd})
+    return {"strategy": strategy, "rank_by": rank_by, "k": k, "purge": purge, "embargo": embargo,
+            "evaluated": len(params_list), "workers": workers, "folds": out_folds,
+            "distribution": {m: distribution([f[m] for f in out_folds]) for m in CV_METRICS}}
@@ -0,0 +1,127 @@
+# portfolio_mep_v2.py
+# Multi-asset portfolio backtest on aligned (n_assets, n_bars) matrices
+# (indicators_batch_mep_v2.UniverseBars): every asset's signal becomes a
+# portfolio weight, and equity, turnover and costs come out of whole-matrix
+# NumPy ops instead of one event_backtest per symbol.
+#
+# Timing follows event_backtest_arrays: the weight set at bar t's close is
+# held over bar t+1, nothing is held into bar 1, and a rebalance is charged
+# on the bar it is decided. Costs are (fee + slippage) per unit of traded
+# weight, |w[t] - w[t-1]| summed over assets. With one asset, weight 1 and
+# a strategy that never goes flat again after entering, the result equals
+# event_backtest_arrays; closing to flat there is charged a round trip, here
+# only the unit actually traded.
+#
+# Weighting (per bar, over the assets with a non-zero signal and a price):
+#   equal   each active asset gets gross / n_active
+#   atr     inverse volatility: 1 / (atr / close), normalized to `gross`
+# Bars where an asset has no price (NaN padding) give it no weight and no return.
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from backtesting_mep_v2 import MATRIX_BLOCK
+from indicators_batch_mep_v2 import UniverseBars, compute_batch
+from indicators_mep_v2 import IndicatorSpec
+from strategies_mep_v1 import mean_reversion_signal_matrix
+
+WEIGHTINGS = ("equal", "atr")
+
+def _mean_reversion(bars: UniverseBars, rsi_buy: float=30.0, rsi_sell: float=70.0) -> np.ndarray:
+    rsi = compute_batch(bars, [IndicatorSpec.of("rsi", period=14)])["rsi"]
+    return mean_reversion_signal_matrix(rsi, rsi_buy, rsi_sell)
+
+# strategy -> (bars, **params) -> (n_assets, n_bars) int8 signals; same names
+# and params as strategies_mep_v1.STRATEGY_REGISTRY, on the batch indicators
+SIGNAL_MATRICES: Dict[str, Callable[..., np.ndarray]] = {
+    "mean_reversion": _mean_reversion,
+}
+
+def target_weights(sigs: np.ndarray, close: np.ndarray, scheme: str="equal",
+                   atr: Optional[np.ndarray]=None, gross: float=1.0) -> np.ndarray:
+    """
+    (n_assets, n_bars) weights: sign and size of each signal times the scheme's
+    share of `gross`.
+    """
+    if scheme not in WEIGHTINGS:
+        raise ValueError(f"unknown weighting {scheme!r}; expected one of {list(WEIGHTINGS)}")
+    S = np.nan_to_num(np.asarray(sigs, dtype=np.float64))
+    c = np.asarray(close, dtype=np.float64)
+    if S.shape != c.shape:
+        raise ValueError(f"signals {S.shape} and prices {c.shape} are not aligned")
+    active = (S != 0) & np.isfinite(c)
+    if scheme == "equal":
+        raw = active.astype(np.float64)
+    else:
+        if atr is None:
+            raise ValueError("atr weighting needs the atr matrix")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            raw = np.divide(c, atr)                   # 1 / (atr / close)
+        raw[~(active & np.isfinite(raw) & (raw > 0))] = 0.0
+    raw *= np.abs(S)
+    denom = raw.sum(axis=0)
+    np.divide(gross, denom, out=denom, where=denom > 0)
+    raw *= denom
+    return np.copysign(raw, S, out=raw)
+
+def portfolio_backtest(close: np.ndarray, weights: np.ndarray, fee_bps: float=10.0,
+                       slippage_bps: float=5.0, return_curves: bool=False) -> Dict[str, Any]:
+    """
+    Backtest a weight matrix over aligned closes.
+    Returns {"pnl", "max_dd", "turnover", "costs", "asset_pnl": (n_assets,),
+    "asset_turnover": (n_assets,)} plus, with return_curves, per-bar
+    "equity", "returns", "turnover_bars", "gross" arrays of length n_bars.
+    """
+    c = np.asarray(close, dtype=np.float64); W = np.asarray(weights, dtype=np.float64)
+    if W.shape != c.shape or c.ndim != 2:
+        raise ValueError(f"weights {W.shape} and prices {c.shape} must be the same "
+                         "(n_assets, n_bars) shape")
+    A, n = c.shape
+    cost = (fee_bps + slippage_bps)/1e4
+    bar_ret = np.zeros(n); bar_turn = np.zeros(n); bar_gross = np.zeros(n)
+    asset_pnl = np.zeros(A); asset_turn = np.zeros(A)
+    rows = max(1, MATRIX_BLOCK // max(n, 1))
+    for a in range(0, A, rows):
+        b = min(A, a + rows)
+        if n < 2:
+            break
+        cb = c[a:b]
+        # weight held over bar t+1 is the one set at t; nothing is held into bar 1
+        held = W[a:b, :-1].copy()
+        held[:, 0] = 0.0
+        r = np.diff(cb, axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            np.divide(r, cb[:, :-1], out=r)
+        np.multiply(r, held, out=r)
+        r[~np.isfinite(r)] = 0.0                     # no price on either side: no return
+        # traded weight at each bar t >= 1, from what was held into it
+        traded = np.abs(W[a:b, 1:] - held)
+        bar_ret[1:] += r.sum(axis=0) - cost * traded.sum(axis=0)
+        bar_turn[1:] += traded.sum(axis=0)
+        bar_gross[1:] += np.abs(W[a:b, 1:]).sum(axis=0)
+        asset_pnl[a:b] = r.sum(axis=1) - cost * traded.sum(axis=1)
+        asset_turn[a:b] = traded.sum(axis=1)
+    eq = 1.0 + np.cumsum(bar_ret)
+    peak = np.fmax.accumulate(eq)
+    turnover = float(bar_turn.sum())
+    out: Dict[str, Any] = {"pnl": float(eq[-1] - 1.0) if n else 0.0,
+                           "max_dd": float(np.max(peak - eq)) if n else 0.0,
+                           "turnover": turnover, "costs": turnover * cost,
+                           "asset_pnl": asset_pnl, "asset_turnover": asset_turn}
+    if return_curves:
+        out.update(equity=eq, returns=bar_ret, turnover_bars=bar_turn, gross=bar_gross)
+    return out
+
+def backtest_universe(bars: UniverseBars, sigs: np.ndarray, scheme: str="equal", atr_period: int=14,
+                      gross: float=1.0, fee_bps: float=10.0, slippage_bps: float=5.0,
+                      return_curves: bool=False) -> Dict[str, Any]:
+    """portfolio_backtest over a UniverseBars; the atr scheme uses the batch `atr` indicator."""
+    close = bars.fields["close"]
+    atr = None
+    if scheme == "atr":
+        spec = IndicatorSpec.of("atr", period=atr_period)
+        atr = compute_batch(bars, [spec])[spec.columns()[0]]
+    W = target_weights(sigs, close, scheme, atr, gross)
+    return portfolio_backtest(close, W, fee_bps, slippage_bps, return_curves)
@@ -1,10 +1,14 @@
 # repository.py
 from __future__ import annotations
-from typing import Iterable, Sequence
+
+import os
+from typing import Iterable, Optional, Sequence
 
 from sqlalchemy import text
+
 from db_mep_v2 import engine  # FIX: antes era from app.db import engine
 
+
 def _chunks(it: Iterable, n: int):
     it = iter(it)
     while True:
@@ -18,10 +22,12 @@ def _chunks(it: Iterable, n: int):
                 return
         yield buf
 
-def upsert_ohlcv(rows: Sequence, chunk_size: int = 2000) -> int:
+def upsert_ohlcv(rows: Sequence, chunk_size: int = 2000, materialize: Optional[bool] = None) -> int:
     """
     rows: sequência de objetos Pydantic ou dicts com:
       tenant_id, market, symbol, timeframe, ts, open, high, low, close, volume
+    materialize: atualiza a tabela `indicators` das chaves tocadas
+      (default: env INDICATORS_MATERIALIZE, ligado)
     """
     sql = text("""
         INSERT INTO ohlcv(tenant_id,market,symbol,timeframe,ts,open,high,low,close,volume)
@@ -33,10 +39,19 @@ def upsert_ohlcv(rows: Sequence, chunk_size: int = 2000) -> int:
     def to_dict(r):
         return r.model_dump() if hasattr(r, "model_dump") else dict(r)
     total = 0
+    keys = []
     with engine.begin() as conn:
         for chunk in _chunks(rows, chunk_size):
-            conn.execute(sql, [to_dict(r) for r in chunk])
+            batch = [to_dict(r) for r in chunk]
+            conn.execute(sql, batch)
+            keys.extend({k: d[k] for k in ("tenant_id", "market", "symbol", "timeframe", "ts")}
+                        for d in batch)
             total += len(chunk)
+    if materialize is None:
+        materialize = os.getenv("INDICATORS_MATERIALIZE", "1").lower() in ("1", "true", "yes")
+    if materialize and keys:
+        from indicators_store_mep_v2 import materialize_after_upsert
+        materialize_after_upsert(engine, keys)
     return total
 
 def upsert_signals(rows: Sequence, chunk_size: int = 2000) -> int:
@@ -1,47 +1,554 @@
-import uuid, pandas as pd
-from fastapi import APIRouter, Body
-from typing import Dict, Any
+import asyncio
+import json
+import os
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi import APIRouter, Body, HTTPException
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+import memo_mep_v2 as memo
+from backtest_state_mep_v2 import SIGNAL_LOOKBACK, advance_key
+from backtesting_mep_v2 import (
+    RANK_METRICS,
+    event_backtest,
+    event_backtest_matrix,
+    rank_order,
+    ret_dd,
+)
+from chunked_mep_v2 import BACKTEST_CHUNK_BARS, chunked_backtest, iter_ohlcv_chunks
+from db_mep_v2 import engine
+from downsample_mep_v2 import EQUITY_MAX_POINTS, downsample
+from downsample_mep_v2 import METHODS as DOWNSAMPLE_METHODS
+from indicators_batch_mep_v2 import align_ohlcv
+from indicators_mep_v2 import DEFAULT_INDICATORS, precision_dtype, to_precision
+from indicators_store_mep_v2 import indicators_frame
+from optimize_mep_v2 import (
+    cross_validate,
+    iter_walk_forward,
+    optimize,
+    param_grid,
+    walk_forward_optimize,
+)
+from portfolio_mep_v2 import SIGNAL_MATRICES, WEIGHTINGS, backtest_universe
+from robustness_mep_v2 import UNITS, monte_carlo
+from runs_mep_v2 import RunCancelled, create_run, finish_run, progress_recorder
 from services_market_mep_v2 import fetch_binance_ohlcv
-from indicators_mep_v2 import apply_default_indicators_v2 as apply_default_indicators
 from strategies_mep_v1 import STRATEGY_REGISTRY
-from backtesting_mep_v2 import event_backtest, purged_kfold, walk_forward_anchored
 
 router = APIRouter(tags=["backtests-v2"])
 
+def _indicator_spec():
+    return [[s.name, s.kwargs] for s in DEFAULT_INDICATORS]
+
+def _check_precision(precision: str) -> None:
+    try:
+        precision_dtype(precision)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def _default_indicators(df: pd.DataFrame, tenant_id: str, symbol: str, tf: str,
+                              precision: str) -> pd.DataFrame:
+    # materialized rows when `indicators` has these exact bars, computed otherwise
+    return await run_in_threadpool(indicators_frame, engine, df, DEFAULT_INDICATORS,
+                                   tenant_id=tenant_id, symbol=symbol, timeframe=tf,
+                                   precision=precision)
+
+async def _memo_get(key: str):
+    if memo.PERSIST:
+        return await run_in_threadpool(memo.lookup, key, engine)
+    return memo.lookup(key)
+
+async def _memo_put(key: str, result: Dict[str, Any], kind: str, digest: str, spec: Dict[str, Any],
+                    tenant_id: str) -> Response:
+    body = memo.encode(result)
+    if memo.PERSIST:
+        await run_in_threadpool(memo.store, key, body, engine, kind=kind, digest=digest, spec=spec,
+                                tenant_id=tenant_id)
+    else:
+        memo.store(key, body, kind=kind, digest=digest, spec=spec, tenant_id=tenant_id)
+    return Response(content=body, media_type="application/json")
+
 @router.post("/backtests/ab")
 async def backtest_ab(payload: Dict[str, Any] = Body(...)):
     symbol = payload.get("symbol","BTCUSDT"); tf = payload.get("timeframe","1h"); lookback=int(payload.get("lookback",1000))
     s1 = payload.get("strategy_a","mean_reversion"); p1 = payload.get("params_a",{})
     s2 = payload.get("strategy_b","mean_reversion"); p2 = payload.get("params_b",{"rsi_sell":60.0,"rsi_buy":40.0})
+    fee_bps = float(payload.get("fee_bps",10.0))
+    slippage_bps = float(payload.get("slippage_bps",5.0))
+    tenant_id = payload.get("tenant_id","default"); precision = payload.get("precision","float64")
+    _check_precision(precision)
     rows = await fetch_binance_ohlcv(symbol, tf, None, None)
-    df = pd.DataFrame(rows).tail(lookback)
-    df = apply_default_indicators(df)
-    a = STRATEGY_REGISTRY[s1](df.copy(), **p1); b = STRATEGY_REGISTRY[s2](df.copy(), **p2)
-    pnl_a, dd_a, tr_a, eq_a = event_backtest(a)
-    pnl_b, dd_b, tr_b, eq_b = event_backtest(b)
-    return {
+    df = to_precision(pd.DataFrame(rows).tail(lookback), precision)
+    # memo: same bars + same request -> the stored response body
+    digest = memo.bars_digest(df)
+    spec = {"symbol": symbol, "tf": tf, "a": [s1, p1], "b": [s2, p2], "fee_bps": fee_bps,
+            "slippage_bps": slippage_bps, "indicators": _indicator_spec()}
+    key = memo.memo_key("ab", digest, spec)
+    if payload.get("memo", True):
+        body = await _memo_get(key)
+        if body is not None:
+            return Response(content=body, media_type="application/json")
+    df = await _default_indicators(df, tenant_id, symbol, tf, precision)
+    a = STRATEGY_REGISTRY[s1](df, **p1); b = STRATEGY_REGISTRY[s2](df, **p2)
+    pnl_a, dd_a, tr_a, eq_a = event_backtest(a, fee_bps=fee_bps, slippage_bps=slippage_bps)
+    pnl_b, dd_b, tr_b, eq_b = event_backtest(b, fee_bps=fee_bps, slippage_bps=slippage_bps)
+    result = {
       "symbol": symbol, "tf": tf,
       "A": {"pnl": pnl_a, "max_dd": dd_a, "trades": len(tr_a)},
       "B": {"pnl": pnl_b, "max_dd": dd_b, "trades": len(tr_b)}
     }
+    return await _memo_put(key, result, "ab", digest, spec, tenant_id)
+
+MONTECARLO_MAX_PATHS = int(os.getenv("MONTECARLO_MAX_PATHS", "10000"))
+
+@router.post("/backtests/montecarlo")
+async def backtest_montecarlo(payload: Dict[str, Any] = Body(...)):
+    """
+    Block-bootstrap confidence intervals for one strategy run (robustness_mep_v2):
+    {"strategy", "params", "unit": "bar"|"trade", "n_paths", "block", "seed", "levels",
+    "periods_per_year", fees}.
+    Responses are memoized only when a seed makes them reproducible.
+    """
+    symbol = payload.get("symbol","BTCUSDT"); tf = payload.get("timeframe","1h")
+    lookback=int(payload.get("lookback",1000))
+    strat = payload.get("strategy","mean_reversion"); params = payload.get("params",{})
+    fee_bps = float(payload.get("fee_bps",10.0))
+    slippage_bps = float(payload.get("slippage_bps",5.0))
+    unit = payload.get("unit","bar"); n_paths = int(payload.get("n_paths",1000))
+    block = payload.get("block"); seed = payload.get("seed")
+    levels = [float(x) for x in payload.get("levels",[0.9, 0.95])]
+    ppy = payload.get("periods_per_year")
+    tenant_id = payload.get("tenant_id","default"); precision = payload.get("precision","float64")
+    _check_precision(precision)
+    if strat not in STRATEGY_REGISTRY:
+        raise HTTPException(status_code=400, detail=f"unknown strategy {strat!r}")
+    if unit not in UNITS:
+        raise HTTPException(status_code=400, detail=f"unit must be one of {list(UNITS)}")
+    if not 1 <= n_paths <= MONTECARLO_MAX_PATHS:
+        raise HTTPException(status_code=400,
+                            detail=f"n_paths must be in [1, {MONTECARLO_MAX_PATHS}]")
+    if block is not None and int(block) < 1:
+        raise HTTPException(status_code=400, detail="block must be >= 1")
+    if not all(0.0 < lv < 1.0 for lv in levels):
+        raise HTTPException(status_code=400, detail="levels must be in (0, 1)")
+    rows = await fetch_binance_ohlcv(symbol, tf, None, None)
+    df = to_precision(pd.DataFrame(rows).tail(lookback), precision)
+    digest = memo.bars_digest(df)
+    spec = {"symbol": symbol, "tf": tf, "strategy": [strat, params], "fee_bps": fee_bps,
+            "slippage_bps": slippage_bps, "unit": unit, "n_paths": n_paths, "block": block,
+            "seed": seed, "levels": levels, "periods_per_year": ppy,
+            "indicators": _indicator_spec()}
+    key = memo.memo_key("montecarlo", digest, spec)
+    use_memo = seed is not None and payload.get("memo", True)
+    if use_memo:
+        body = await _memo_get(key)
+        if body is not None:
+            return Response(content=body, media_type="application/json")
+    df = await _default_indicators(df, tenant_id, symbol, tf, precision)
+    try:
+        sig = STRATEGY_REGISTRY[strat](df, **params)["signal"].to_numpy()
+    except TypeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    res = await run_in_threadpool(monte_carlo, df["close"].to_numpy(), sig, fee_bps, slippage_bps,
+                                  unit, n_paths, None if block is None else int(block),
+                                  None if seed is None else int(seed), levels,
+                                  None if ppy is None else float(ppy))
+    result = {"symbol": symbol, "tf": tf, "strategy": strat, "params": params, **res}
+    if not use_memo:
+        return result
+    return await _memo_put(key, result, "montecarlo", digest, spec, tenant_id)
+
+PORTFOLIO_MAX_ASSETS = int(os.getenv("PORTFOLIO_MAX_ASSETS", "500"))
+
+@router.post("/backtests/portfolio")
+async def backtest_portfolio(payload: Dict[str, Any] = Body(...)):
+    """
+    One strategy across a universe, traded as a portfolio (portfolio_mep_v2):
+    {"symbols": [...], "strategy", "params", "weighting": "equal"|"atr", "atr_period", "gross",
+    fees, "max_points"}.
+    Returns portfolio pnl/max_dd/turnover/costs, per-symbol pnl and turnover,
+    and the equity curve cut to max_points.
+    """
+    symbols = payload.get("symbols") or []
+    tf = payload.get("timeframe","1h"); lookback=int(payload.get("lookback",1000))
+    strat = payload.get("strategy","mean_reversion"); params = payload.get("params",{})
+    weighting = payload.get("weighting","equal"); atr_period = int(payload.get("atr_period",14))
+    gross = float(payload.get("gross",1.0))
+    fee_bps = float(payload.get("fee_bps",10.0))
+    slippage_bps = float(payload.get("slippage_bps",5.0))
+    max_points = int(payload.get("max_points", EQUITY_MAX_POINTS))
+    if not isinstance(symbols, list) or not symbols or len(symbols) > PORTFOLIO_MAX_ASSETS:
+        raise HTTPException(status_code=400,
+                            detail=f"symbols must be a list of 1..{PORTFOLIO_MAX_ASSETS} symbols")
+    if strat not in SIGNAL_MATRICES:
+        raise HTTPException(status_code=400,
+                            detail=f"strategy must be one of {sorted(SIGNAL_MATRICES)}")
+    if weighting not in WEIGHTINGS:
+        raise HTTPException(status_code=400, detail=f"weighting must be one of {list(WEIGHTINGS)}")
+    symbols = list(dict.fromkeys(symbols))
+    rows = await asyncio.gather(*(fetch_binance_ohlcv(s, tf, None, None) for s in symbols))
+    bars = align_ohlcv({s: pd.DataFrame(r).tail(lookback) for s, r in zip(symbols, rows) if r})
+    if not bars.symbols:
+        raise HTTPException(status_code=404, detail="No OHLCV data available.")
+
+    def run():
+        sigs = SIGNAL_MATRICES[strat](bars, **params)
+        return backtest_universe(bars, sigs, weighting, atr_period, gross, fee_bps, slippage_bps,
+                                 return_curves=True)
+    try:
+        res = await run_in_threadpool(run)
+    except TypeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    idx, eq = downsample(res["equity"], max_points)
+    return {"symbols": bars.symbols, "tf": tf, "strategy": strat, "weighting": weighting,
+            "pnl": res["pnl"], "max_dd": res["max_dd"], "turnover": res["turnover"],
+            "costs": res["costs"],
+            "assets": {s: {"pnl": float(p), "turnover": float(t)}
+                       for s, p, t in zip(bars.symbols, res["asset_pnl"], res["asset_turnover"])},
+            "n": len(res["equity"]), "ts": bars.ts[idx].tolist(), "equity": eq.tolist()}
+
+@router.post("/backtests/live")
+async def backtest_live(payload: Dict[str, Any] = Body(...)):
+    """
+    Live run kept current from the stored bars (backtest_state_mep_v2): only
+    the bars since the last call are backtested, from the persisted end state.
+    {"symbol", "timeframe", "market", "strategy", "params", fees, "reset"}.
+    """
+    symbol = payload.get("symbol","BTCUSDT"); tf = payload.get("timeframe","1h")
+    market = (payload.get("market") or "binance").lower()
+    strat = payload.get("strategy","mean_reversion"); params = payload.get("params",{})
+    fee_bps = float(payload.get("fee_bps",10.0))
+    slippage_bps = float(payload.get("slippage_bps",5.0))
+    tenant_id = payload.get("tenant_id","default")
+    if engine is None:
+        raise HTTPException(status_code=503, detail="live backtests need the database")
+    if strat not in SIGNAL_LOOKBACK:
+        raise HTTPException(status_code=400,
+                            detail=f"strategy must be one of {sorted(SIGNAL_LOOKBACK)}")
+
+    def run():
+        with engine.begin() as conn:
+            return advance_key(conn, tenant_id, market, symbol, tf, strat, params, fee_bps,
+                               slippage_bps, reset=bool(payload.get("reset", False)))
+    try:
+        res = await run_in_threadpool(run)
+    except TypeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if res is None:
+        raise HTTPException(status_code=404, detail="No materialized bars for this key.")
+    return {"symbol": symbol, "tf": tf, "market": market, "strategy": strat, "params": params,
+            **res}
+
+@router.post("/backtests/chunked")
+async def backtest_chunked(payload: Dict[str, Any] = Body(...)):
+    """
+    Backtest a whole stored history without loading it (chunked_mep_v2): bars
+    stream from `ohlcv` chunk_bars at a time, indicators and positions carry over.
+    {"symbol", "timeframe", "market", "strategy", "params", fees, "since", "until", "chunk_bars"}.
+    """
+    symbol = payload.get("symbol","BTCUSDT"); tf = payload.get("timeframe","1h")
+    market = (payload.get("market") or "binance").lower()
+    strat = payload.get("strategy","mean_reversion"); params = payload.get("params",{})
+    fee_bps = float(payload.get("fee_bps",10.0))
+    slippage_bps = float(payload.get("slippage_bps",5.0))
+    since = payload.get("since"); until = payload.get("until")
+    chunk_bars = int(payload.get("chunk_bars", BACKTEST_CHUNK_BARS))
+    tenant_id = payload.get("tenant_id","default")
+    if engine is None:
+        raise HTTPException(status_code=503, detail="chunked backtests read bars from the database")
+    if strat not in SIGNAL_LOOKBACK:
+        raise HTTPException(status_code=400,
+                            detail=f"strategy must be one of {sorted(SIGNAL_LOOKBACK)}")
+    if chunk_bars < 1:
+        raise HTTPException(status_code=400, detail="chunk_bars must be >= 1")
+
+    def run():
+        with engine.connect() as conn:
+            chunks = iter_ohlcv_chunks(conn, (tenant_id, market, symbol, tf), chunk_bars,
+                                       None if since is None else int(since),
+                                       None if until is None else int(until))
+            return chunked_backtest(chunks, strat, params, fee_bps, slippage_bps)
+    try:
+        res = await run_in_threadpool(run)
+    except TypeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not res["bars"]:
+        raise HTTPException(status_code=404, detail="No OHLCV data available.")
+    return {"symbol": symbol, "tf": tf, "market": market, "strategy": strat, "params": params,
+            "chunk_bars": chunk_bars, **res}
+
+@router.post("/backtests/compare")
+async def backtest_compare(payload: Dict[str, Any] = Body(...)):
+    """
+    N strategy/param variants over the same bars. Signals are stacked into an
+    (N, n_bars) matrix and backtested in one pass; results ranked by rank_by.
+      {"variants": [{"strategy": "mean_reversion", "params": {...}, "name": "opt"}, ...],
+       "rank_by": "pnl" | "max_dd" | "trades" | "ret_dd"}
+    """
+    symbol = payload.get("symbol","BTCUSDT"); tf = payload.get("timeframe","1h")
+    lookback = int(payload.get("lookback",1000))
+    variants = payload.get("variants") or []; rank_by = payload.get("rank_by","pnl")
+    fee_bps = float(payload.get("fee_bps",10.0))
+    slippage_bps = float(payload.get("slippage_bps",5.0))
+    tenant_id = payload.get("tenant_id","default"); precision = payload.get("precision","float64")
+    _check_precision(precision)
+    if not isinstance(variants, list) or not variants:
+        raise HTTPException(status_code=400, detail="variants must be a non-empty list")
+    if rank_by not in RANK_METRICS:
+        raise HTTPException(status_code=400,
+                            detail=f"rank_by must be one of {sorted(RANK_METRICS)}")
+    for v in variants:
+        if not isinstance(v, dict) or v.get("strategy","mean_reversion") not in STRATEGY_REGISTRY:
+            raise HTTPException(status_code=400, detail=f"unknown strategy in variant {v!r}")
+    rows = await fetch_binance_ohlcv(symbol, tf, None, None)
+    df = to_precision(pd.DataFrame(rows).tail(lookback), precision)
+    df = await _default_indicators(df, tenant_id, symbol, tf, precision)
+    sigs = np.empty((len(variants), len(df)), dtype=np.int8)
+    try:
+        for i, v in enumerate(variants):
+            strategy = STRATEGY_REGISTRY[v.get("strategy","mean_reversion")]
+            sigs[i] = strategy(df, **(v.get("params") or {}))["signal"].to_numpy()
+    except TypeError as e:  # bad params for the strategy
+        raise HTTPException(status_code=400, detail=str(e))
+    res = event_backtest_matrix(df["close"].to_numpy(), sigs, fee_bps, slippage_bps)
+    rdd = ret_dd(res)
+    ranked = []
+    for rank, i in enumerate(rank_order(res, rank_by), 1):
+        v = variants[i]
+        ranked.append({"rank": rank, "index": int(i), "name": v.get("name", f"v{i}"),
+                       "strategy": v.get("strategy","mean_reversion"),
+                       "params": v.get("params") or {},
+                       "pnl": float(res["pnl"][i]), "max_dd": float(res["max_dd"][i]),
+                       "trades": int(res["trades"][i]),
+                       "ret_dd": None if np.isnan(rdd[i]) else float(rdd[i])})
+    return {"symbol": symbol, "tf": tf, "bars": len(df), "rank_by": rank_by, "results": ranked}
+
+@router.post("/backtests/optimize")
+async def backtest_optimize(payload: Dict[str, Any] = Body(...)):
+    """
+    Grid search of one strategy on a process pool; the run and its progress
+    are recorded in `runs` (kind="optimize").
+      {"strategy": "mean_reversion", "grid": {"rsi_buy": [25, 30, 35], "rsi_sell": [65, 70, 75]},
+       "top_k": 10, "rank_by": "pnl", "workers": null, "chunk_size": null}
+    """
+    return await run_optimize(payload)
+
+async def run_optimize(payload: Dict[str, Any], run_id: Optional[str] = None) -> Dict[str, Any]:
+    # run_id: an already claimed job (routers_jobs_mep_v2); progress goes there and the job
+    # worker writes the result
+    symbol = payload.get("symbol","BTCUSDT"); tf = payload.get("timeframe","1h")
+    lookback = int(payload.get("lookback",1000))
+    strat = payload.get("strategy","mean_reversion"); grid = payload.get("grid") or {}
+    top_k = int(payload.get("top_k",10)); rank_by = payload.get("rank_by","pnl")
+    workers = payload.get("workers"); chunk_size = payload.get("chunk_size")
+    fee_bps = float(payload.get("fee_bps",10.0))
+    slippage_bps = float(payload.get("slippage_bps",5.0))
+    tenant_id = payload.get("tenant_id","default"); precision = payload.get("precision","float64")
+    _check_precision(precision)
+    if strat not in STRATEGY_REGISTRY:
+        raise HTTPException(status_code=400, detail=f"unknown strategy {strat!r}")
+    if rank_by not in RANK_METRICS:
+        raise HTTPException(status_code=400,
+                            detail=f"rank_by must be one of {sorted(RANK_METRICS)}")
+    try:
+        param_grid(grid)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    rows = await fetch_binance_ohlcv(symbol, tf, None, None)
+    df = to_precision(pd.DataFrame(rows).tail(lookback), precision)
+    df = await _default_indicators(df, tenant_id, symbol, tf, precision)
+    own_run = run_id is None
+    if own_run:
+        run_params = {"symbol": symbol, "timeframe": tf, "lookback": lookback, "strategy": strat,
+                      "grid": grid, "top_k": top_k, "rank_by": rank_by, "fee_bps": fee_bps,
+                      "slippage_bps": slippage_bps}
+        run_id = await run_in_threadpool(create_run, engine, "optimize", run_params, tenant_id)
+    try:
+        out = await run_in_threadpool(optimize, df, strat, grid, top_k, rank_by, fee_bps,
+                                      slippage_bps, int(workers) if workers else None,
+                                      int(chunk_size) if chunk_size else None,
+                                      progress_recorder(engine, run_id))
+    except RunCancelled:
+        if own_run:
+            raise HTTPException(status_code=409, detail=f"run {run_id} was cancelled")
+        raise
+    except Exception as e:
+        if own_run:
+            await run_in_threadpool(finish_run, engine, run_id, "error", {"error": str(e)})
+        if isinstance(e, ValueError):  # params the strategy does not take
+            raise HTTPException(status_code=400, detail=str(e))
+        raise
+    if own_run:
+        await run_in_threadpool(finish_run, engine, run_id, "done", out)
+    return {"run_id": run_id, "symbol": symbol, "tf": tf, "bars": len(df), **out}
+
+def _segment(fold: Dict[str, Any], ts: np.ndarray) -> Dict[str, Any]:
+    return {"is": [int(ts[0]), int(ts[fold["is"][1]-1])],
+            "oos": [int(ts[fold["oos"][0]]), int(ts[fold["oos"][1]-1])],
+            "params": fold["params"], "is_metrics": fold["is_metrics"],
+            "pnl": fold["pnl"], "dd": fold["max_dd"], "trades": fold["trades"]}
 
 @router.post("/backtests/walkforward")
 async def backtest_walkforward(payload: Dict[str, Any] = Body(...)):
+    """
+    Walk-forward optimization: each anchored fold picks the best `grid` point
+    in-sample and trades it out-of-sample; folds run concurrently on a process
+    pool. Without a grid, `params` is the single (fixed) point.
+    Returns per-fold chosen params and the stitched OOS equity curve, cut to
+    "max_points" (default EQUITY_MAX_POINTS, 0 = every bar) with "downsample"
+    "lttb" (default) or "minmax".
+    Responses are memoized on (bars, request); "memo": false forces a recompute.
+    """
     symbol = payload.get("symbol","BTCUSDT"); tf = payload.get("timeframe","1h"); lookback=int(payload.get("lookback",2000))
     window=int(payload.get("window",500)); step=int(payload.get("step",100))
     strat = payload.get("strategy","mean_reversion"); params = payload.get("params",{})
+    grid = payload.get("grid") or {k: [v] for k, v in params.items()}
+    rank_by = payload.get("rank_by","pnl"); workers = payload.get("workers")
+    fee_bps = float(payload.get("fee_bps",10.0))
+    slippage_bps = float(payload.get("slippage_bps",5.0))
+    tenant_id = payload.get("tenant_id","default"); precision = payload.get("precision","float64")
+    _check_precision(precision)
+    max_points = int(payload.get("max_points", EQUITY_MAX_POINTS))
+    method = payload.get("downsample","lttb")
+    if window < 1 or step < 1:
+        raise HTTPException(status_code=400, detail="window and step must be >= 1")
+    if method not in DOWNSAMPLE_METHODS:
+        raise HTTPException(status_code=400,
+                            detail=f"downsample must be one of {list(DOWNSAMPLE_METHODS)}")
+    rows = await fetch_binance_ohlcv(symbol, tf, None, None)
+    df = to_precision(pd.DataFrame(rows).tail(lookback), precision)
+    digest = memo.bars_digest(df)
+    spec = {"symbol": symbol, "tf": tf, "strategy": strat, "grid": grid, "window": window,
+            "step": step, "rank_by": rank_by, "fee_bps": fee_bps, "slippage_bps": slippage_bps,
+            "indicators": _indicator_spec(),
+            "max_points": max_points, "downsample": method}
+    key = memo.memo_key("walkforward", digest, spec)
+    if payload.get("memo", True):
+        body = await _memo_get(key)
+        if body is not None:
+            return Response(content=body, media_type="application/json")
+    df = await _default_indicators(df, tenant_id, symbol, tf, precision)
+    try:
+        wf = await run_in_threadpool(walk_forward_optimize, df, strat, grid, window, step, rank_by,
+                                     fee_bps, slippage_bps, int(workers) if workers else None)
+    except ValueError as e:  # bad strategy/rank_by/grid, or params the strategy does not take
+        raise HTTPException(status_code=400, detail=str(e))
+    ts = df["ts"].to_numpy()
+    segments = [_segment(f, ts) for f in wf["folds"]]
+    oos = wf["oos"]
+    stitched = {"pnl": oos["pnl"], "max_dd": oos["max_dd"], "trades": oos["trades"],
+                "n": len(oos["equity"]), "ts": [], "equity": []}
+    if oos["start"] is not None:
+        idx, eq = downsample(oos["equity"], max_points, method)
+        stitched["ts"] = ts[oos["start"] + idx].tolist()
+        stitched["equity"] = eq.tolist()
+    result = {"symbol": symbol, "tf": tf, "rank_by": rank_by, "segments": segments,
+              "total_pnl": float(sum(f["pnl"] for f in wf["folds"])),
+              "worst_dd": float(max((f["max_dd"] for f in wf["folds"]), default=0.0)),
+              "oos": stitched}
+    return await _memo_put(key, result, "walkforward", digest, spec, tenant_id)
+
+STREAM_FORMATS = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+@router.post("/backtests/walkforward/stream")
+async def backtest_walkforward_stream(payload: Dict[str, Any] = Body(...)):
+    """
+    /backtests/walkforward as a stream: one {"type": "segment", "fold": i, ...}
+    record per fold as soon as it completes (completion order), then a
+    {"type": "summary", ...} record with the totals and the stitched OOS
+    metrics (no equity curve: the server keeps only per-fold signals).
+    A failure mid-stream ends it with {"type": "error", "error": ...}.
+    "format": "ndjson" (default, one JSON object per line) or "sse".
+    """
+    symbol = payload.get("symbol","BTCUSDT"); tf = payload.get("timeframe","1h")
+    lookback=int(payload.get("lookback",2000))
+    window=int(payload.get("window",500)); step=int(payload.get("step",100))
+    strat = payload.get("strategy","mean_reversion"); params = payload.get("params",{})
+    grid = payload.get("grid") or {k: [v] for k, v in params.items()}
+    rank_by = payload.get("rank_by","pnl"); workers = payload.get("workers")
+    fee_bps = float(payload.get("fee_bps",10.0))
+    slippage_bps = float(payload.get("slippage_bps",5.0))
+    tenant_id = payload.get("tenant_id","default"); precision = payload.get("precision","float64")
+    _check_precision(precision)
+    fmt = payload.get("format","ndjson")
+    if fmt not in STREAM_FORMATS:
+        raise HTTPException(status_code=400,
+                            detail=f"format must be one of {sorted(STREAM_FORMATS)}")
+    if window < 1 or step < 1:
+        raise HTTPException(status_code=400, detail="window and step must be >= 1")
+    # everything that can be checked before the 200 goes out
+    if strat not in STRATEGY_REGISTRY:
+        raise HTTPException(status_code=400, detail=f"unknown strategy {strat!r}")
+    if rank_by not in RANK_METRICS:
+        raise HTTPException(status_code=400,
+                            detail=f"rank_by must be one of {sorted(RANK_METRICS)}")
+    try:
+        if grid:
+            param_grid(grid)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    rows = await fetch_binance_ohlcv(symbol, tf, None, None)
+    df = to_precision(pd.DataFrame(rows).tail(lookback), precision)
+    df = await _default_indicators(df, tenant_id, symbol, tf, precision)
+    ts = df["ts"].to_numpy()
+
+    def frame(kind: str, rec: Dict[str, Any]) -> bytes:
+        body = json.dumps({"type": kind, **rec}, separators=(",", ":"), allow_nan=False)
+        return (f"event: {kind}\ndata: {body}\n\n" if fmt == "sse" else body + "\n").encode()
+
+    def records():
+        # sync generator: StreamingResponse pulls it from a threadpool
+        n = 0; total_pnl = 0.0; worst_dd = 0.0
+        try:
+            for rec in iter_walk_forward(df, strat, grid, window, step, rank_by, fee_bps,
+                                         slippage_bps, int(workers) if workers else None):
+                if rec["type"] == "fold":
+                    n += 1; total_pnl += rec["pnl"]; worst_dd = max(worst_dd, rec["max_dd"])
+                    yield frame("segment", {"fold": rec["fold"], **_segment(rec, ts)})
+                else:
+                    start = rec["start"]
+                    oos = {"pnl": rec["pnl"], "max_dd": rec["max_dd"], "trades": rec["trades"],
+                           "ts": [int(ts[start]), int(ts[start + len(rec["equity"]) - 1])]
+                           if start is not None else None}
+                    yield frame("summary", {"symbol": symbol, "tf": tf, "rank_by": rank_by,
+                                            "segments": n, "total_pnl": total_pnl,
+                                            "worst_dd": worst_dd, "oos": oos})
+        except Exception as e:
+            yield frame("error", {"error": str(e)})
+
+    return StreamingResponse(records(), media_type=STREAM_FORMATS[fmt])
+
+@router.post("/backtests/cv")
+async def backtest_cv(payload: Dict[str, Any] = Body(...)):
+    """
+    Purged k-fold CV: k test folds, training bars exclude `purge` bars before
+    and `embargo` bars after each fold. With a `grid`, each fold picks its
+    params on its training bars. Indicators are computed once for all folds;
+    folds run concurrently. Returns per-fold metrics and their distribution.
+    """
+    symbol = payload.get("symbol","BTCUSDT"); tf = payload.get("timeframe","1h")
+    lookback = int(payload.get("lookback",2000))
+    k = int(payload.get("k",5)); purge = int(payload.get("purge",20))
+    embargo = int(payload.get("embargo",0))
+    strat = payload.get("strategy","mean_reversion"); params = payload.get("params",{})
+    grid = payload.get("grid") or {key: [v] for key, v in params.items()}
+    rank_by = payload.get("rank_by","pnl"); workers = payload.get("workers")
+    fee_bps = float(payload.get("fee_bps",10.0))
+    slippage_bps = float(payload.get("slippage_bps",5.0))
+    tenant_id = payload.get("tenant_id","default"); precision = payload.get("precision","float64")
+    _check_precision(precision)
     rows = await fetch_binance_ohlcv(symbol, tf, None, None)
-    df = pd.DataFrame(rows).tail(lookback)
-    df = apply_default_indicators(df)
-    segments=[]; total_pnl=0.0; worst_dd=0.0
-    for tr_slice, te_slice in walk_forward_anchored(len(df), window=window, step=step):
-        if te_slice.start==0:  # no in-sample before first window
-            continue
-        train = df.iloc[tr_slice]; test = df.iloc[te_slice]
-        sig = STRATEGY_REGISTRY[strat](test.copy(), **params)  # params fixos; otimização OOS fica para v3
-        pnl, dd, tr, eq = event_backtest(sig)
-        total_pnl += pnl; worst_dd = max(worst_dd, dd)
-        segments.append({"is": [int(df["ts"].iloc[tr_slice.start] if tr_slice.start>0 else df["ts"].iloc[0]), int(df["ts"].iloc[tr_slice.stop-1])],
-                         "oos": [int(df["ts"].iloc[te_slice.start]), int(df["ts"].iloc[te_slice.stop-1])],
-                         "pnl": pnl, "dd": dd})
-    return {"symbol": symbol, "tf": tf, "segments": segments, "total_pnl": total_pnl, "worst_dd": worst_dd}
+    df = to_precision(pd.DataFrame(rows).tail(lookback), precision)
+    df = await _default_indicators(df, tenant_id, symbol, tf, precision)
+    try:
+        cv = await run_in_threadpool(cross_validate, df, strat, grid, k, purge, embargo, rank_by,
+                                     fee_bps, slippage_bps, int(workers) if workers else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    ts = df["ts"].to_numpy()
+    for f in cv["folds"]:
+        f["test_ts"] = [int(ts[f["test"][0]]), int(ts[f["test"][1]-1])]
+    return {"symbol": symbol, "tf": tf, "bars": len(df), **cv}
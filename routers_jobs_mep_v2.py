@@ -0,0 +1,103 @@
+# routers_jobs_mep_v2.py
+# Async jobs on the `runs` table: submit returns at once, workers
+# (jobs_mep_v2.JobWorker) compute, clients poll or cancel.
+#
+#   POST /jobs               {"kind": "optimize", "payload": {...same body as the route...}}
+#                            -> 202 {"id", "status"}
+#   GET  /jobs/{id}          status, progress while running, result when done
+#   POST /jobs/{id}/cancel   queued/running -> cancelled
+from __future__ import annotations
+
+from typing import Any, Dict
+
+from fastapi import APIRouter, Body, HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from db_mep_v2 import engine
+from jobs_mep_v2 import JOB_WORKERS, Handler, JobWorker
+from routers_backtests_mep_v2 import (
+    backtest_ab,
+    backtest_chunked,
+    backtest_compare,
+    backtest_cv,
+    backtest_montecarlo,
+    backtest_portfolio,
+    backtest_walkforward,
+    run_optimize,
+)
+from runs_mep_v2 import cancel_run, get_run, submit_run
+
+router = APIRouter(tags=["jobs-v2"])
+
+def _route(fn) -> Handler:
+    async def handler(payload: Dict[str, Any], run_id: str):
+        return await fn(payload)
+    return handler
+
+# kind -> handler(payload, run_id); kinds are also the runs.kind of the job
+JOB_HANDLERS: Dict[str, Handler] = {
+    "backtest": _route(backtest_ab),
+    "compare": _route(backtest_compare),
+    "walkforward": _route(backtest_walkforward),
+    "optimize": run_optimize,
+    "cv": _route(backtest_cv),
+    "montecarlo": _route(backtest_montecarlo),
+    "portfolio": _route(backtest_portfolio),
+    "chunked": _route(backtest_chunked),
+}
+
+def _require_db() -> None:
+    if engine is None:
+        raise HTTPException(status_code=503, detail="job queue needs the database")
+
+@router.post("/jobs", status_code=202)
+async def submit_job(body: Dict[str, Any] = Body(...)):
+    kind = body.get("kind"); payload = body.get("payload") or {}
+    if kind not in JOB_HANDLERS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {sorted(JOB_HANDLERS)}")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="payload must be an object")
+    _require_db()
+    tenant_id = body.get("tenant_id") or payload.get("tenant_id","default")
+    run_id = await run_in_threadpool(submit_run, engine, kind, {"payload": payload}, tenant_id)
+    return {"id": run_id, "kind": kind, "status": "queued"}
+
+async def _get_job(run_id: str) -> Dict[str, Any]:
+    # memo entries (memo_mep_v2) share the runs table but are not jobs
+    run = await run_in_threadpool(get_run, engine, run_id)
+    if run is None or run["kind"] == "memo":
+        raise HTTPException(status_code=404, detail="job not found")
+    return run
+
+@router.get("/jobs/{run_id}")
+async def get_job(run_id: str):
+    _require_db()
+    run = await _get_job(run_id)
+    out = {"id": run["id"], "kind": run["kind"], "status": run["status"],
+           "tenant_id": run["tenant_id"],
+           "created_at": run["created_at"].isoformat() if run["created_at"] else None}
+    result = run["result"]
+    if run["status"] == "running":
+        out["progress"] = result
+    elif run["status"] == "done":
+        out["result"] = result
+    elif run["status"] == "error":
+        out["error"] = result
+    return out
+
+@router.post("/jobs/{run_id}/cancel")
+async def cancel_job(run_id: str):
+    _require_db()
+    await _get_job(run_id)
+    status = await run_in_threadpool(cancel_run, engine, run_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return {"id": run_id, "status": status}
+
+def start_job_workers(threads: int = JOB_WORKERS):
+    """In-process workers for the API (JOB_WORKERS=0 leaves jobs to `jobs_mep_v2.py worker`)."""
+    if threads <= 0 or engine is None:
+        return None
+    worker = JobWorker(engine, JOB_HANDLERS, threads=threads)
+    worker.start()
+    return worker
@@ -1,22 +1,32 @@
 # routers_metrics_mep_v2.py
+#   POST /metrics/accuracy, /metrics/pnl   signal accuracy / simulated PnL of a key
+#   POST /metrics/equity                   compute_pnl run, upserted into simulated_pnl with
+#                                          the curve cut to max_points and, unless
+#                                          full_resolution=false, the whole curve as a blob
+#   GET  /metrics/equity/{id}              that blob, fetched on demand
 from __future__ import annotations
 
 import uuid
 from typing import Any, Dict, List, Optional, Tuple
 
 import pandas as pd
-from fastapi import APIRouter, Body, Depends, HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
 from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from db_mep_v2 import get_session_optional
-from services_storage_mep_v2 import read_ohlcv
+from downsample_mep_v2 import EQUITY_MAX_POINTS, downsample
+from downsample_mep_v2 import METHODS as DOWNSAMPLE_METHODS
+from indicator_cache_mep_v2 import cached_indicators
+from indicators_mep_v2 import IndicatorSpec, precision_dtype, to_precision
 from services_market_mep_v2 import fetch_binance_ohlcv
+from services_metrics_mep_v2 import compute_pnl, load_equity_full, upsert_pnl
+from services_storage_mep_v2 import read_ohlcv
 
 router = APIRouter(tags=["metrics-v2"])
 
 # ---------- helpers ----------
-def _to_df(rows: List[Dict[str, Any]]) -> pd.DataFrame:
+def _to_df(rows: List[Dict[str, Any]], precision: str = "float64") -> pd.DataFrame:
     if not rows:
         return pd.DataFrame(columns=["ts","open","high","low","close","volume"])
     df = pd.DataFrame(rows)
@@ -25,14 +35,15 @@ def _to_df(rows: List[Dict[str, Any]]) -> pd.DataFrame:
             df[c] = pd.to_numeric(df[c], errors="coerce")
     df["ts"] = pd.to_numeric(df["ts"], errors="coerce")
     df = df.dropna(subset=["ts","close"]).sort_values("ts").reset_index(drop=True)
-    return df
+    return to_precision(df, precision)
 
 async def _load_df(
     session: Optional[AsyncSession],
     market: str,
     symbol: str,
     timeframe: str,
-    lookback: int
+    lookback: int,
+    precision: str = "float64",
 ) -> pd.DataFrame:
     rows: List[Dict[str, Any]] = []
     if session is not None:
@@ -41,7 +52,7 @@ async def _load_df(
         if market.lower() != "binance":
             raise HTTPException(status_code=400, detail="Only 'binance' supported for live fetch.")
         rows = await fetch_binance_ohlcv(symbol, timeframe, None, None)
-    df = _to_df(rows)
+    df = _to_df(rows, precision)
     if lookback and lookback > 0 and not df.empty:
         df = df.tail(int(lookback))
     return df
@@ -64,16 +75,30 @@ async def _load_signals(
     res = await session.execute(q, dict(tenant_id=tenant_id, market=market, symbol=symbol, timeframe=timeframe))
     return [{"ts": int(r[0]), "signal": int(r[1])} for r in res.fetchall()]
 
-def _ema(series: pd.Series, span: int) -> pd.Series:
-    return series.ewm(span=span, adjust=False, min_periods=span).mean()
+def _check_downsample(method: str) -> None:
+    if method not in DOWNSAMPLE_METHODS:
+        raise HTTPException(status_code=400,
+                            detail=f"downsample must be one of {list(DOWNSAMPLE_METHODS)}")
+
+def _check_precision(precision: str) -> None:
+    try:
+        precision_dtype(precision)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-def _fallback_signals_ema20(df: pd.DataFrame) -> List[Dict[str, int]]:
+_FALLBACK_SPECS = (IndicatorSpec.of("ema", span=12), IndicatorSpec.of("ema", span=26))
+
+def _fallback_signals_ema20(df: pd.DataFrame, tenant_id: str = "default", market: str = "binance",
+                            symbol: str = "", timeframe: str = "",
+                            precision: str = "float64") -> List[Dict[str, int]]:
     if df.empty:
         return []
-    ema_fast = _ema(df["close"], span=12)
-    ema_slow = _ema(df["close"], span=26)
+    ind = cached_indicators(df, _FALLBACK_SPECS, tenant_id=tenant_id, market=market,
+                            symbol=symbol, timeframe=timeframe, precision=precision)
+    ema_fast = ind["ema12"].to_numpy(); ema_slow = ind["ema26"].to_numpy()
     sig = (ema_fast > ema_slow).astype(int) - (ema_fast < ema_slow).astype(int)
-    return [{"ts": int(ts), "signal": int(s)} for ts, s in zip(df["ts"], sig.fillna(0))]
+    sig[:26-1] = 0  # min_periods=span on the slow EMA: no signal during warm-up
+    return [{"ts": int(ts), "signal": int(s)} for ts, s in zip(df["ts"], sig)]
 
 def _align_signals(df: pd.DataFrame, signals: List[Dict[str,int]]) -> pd.DataFrame:
     if df.empty or not signals:
@@ -178,8 +203,10 @@ async def metrics_accuracy(
     persist = bool(payload.get("persist", True))
     fallback_if_missing = bool(payload.get("fallback_if_missing", True))
     tenant_id = payload.get("tenant_id", "default")
+    precision = payload.get("precision", "float64")  # "compact": float32 prices/indicators
+    _check_precision(precision)
 
-    df = await _load_df(session, market, symbol, timeframe, lookback)
+    df = await _load_df(session, market, symbol, timeframe, lookback, precision)
     if df.empty:
         raise HTTPException(status_code=404, detail="No OHLCV data available.")
 
@@ -188,7 +215,7 @@ async def metrics_accuracy(
     if not sigs and not fallback_if_missing:
         raise HTTPException(status_code=404, detail="No signals found for this key.")
     if not sigs and fallback_if_missing:
-        sigs = _fallback_signals_ema20(df)
+        sigs = _fallback_signals_ema20(df, tenant_id, market, symbol, timeframe, precision)
 
     sig_df = _align_signals(df, sigs)
     acc, n = _compute_accuracy(df, sig_df, horizon_bars)
@@ -220,8 +247,10 @@ async def metrics_pnl(
     persist = bool(payload.get("persist", True))
     fallback_if_missing = bool(payload.get("fallback_if_missing", True))
     tenant_id = payload.get("tenant_id", "default")
+    precision = payload.get("precision", "float64")  # "compact": float32 prices/indicators
+    _check_precision(precision)
 
-    df = await _load_df(session, market, symbol, timeframe, lookback)
+    df = await _load_df(session, market, symbol, timeframe, lookback, precision)
     if df.empty:
         raise HTTPException(status_code=404, detail="No OHLCV data available.")
 
@@ -230,7 +259,7 @@ async def metrics_pnl(
     if not sigs and not fallback_if_missing:
         raise HTTPException(status_code=404, detail="No signals found for this key.")
     if not sigs and fallback_if_missing:
-        sigs = _fallback_signals_ema20(df)
+        sigs = _fallback_signals_ema20(df, tenant_id, market, symbol, timeframe, precision)
 
     sig_df = _align_signals(df, sigs)
     total_return, n_trades, sharpe = _simulate_pnl(df, sig_df, fee_bps, slippage_bps)
@@ -249,3 +278,74 @@ async def metrics_pnl(
         "n_trades": int(n_trades), "sharpe_like": round(float(sharpe), 6),
         "persisted_id": persisted_id,
     }
+
+@router.post("/metrics/equity")
+async def metrics_equity(
+    payload: Dict[str, Any] = Body(...),
+    session: Optional[AsyncSession] = Depends(get_session_optional),
+):
+    market = (payload.get("market") or "binance").lower()
+    symbol = (payload.get("symbol") or "BTCUSDT").upper()
+    timeframe = payload.get("timeframe") or "1h"
+    lookback = int(payload.get("lookback", 1000))
+    fee_bps = float(payload.get("fee_bps", 10))
+    slippage_bps = float(payload.get("slippage_bps", 5))
+    persist = bool(payload.get("persist", True))
+    full_resolution = bool(payload.get("full_resolution", True))
+    fallback_if_missing = bool(payload.get("fallback_if_missing", True))
+    tenant_id = payload.get("tenant_id", "default")
+    precision = payload.get("precision", "float64")
+    _check_precision(precision)
+    max_points = int(payload.get("max_points", EQUITY_MAX_POINTS))
+    method = payload.get("downsample", "lttb")
+    _check_downsample(method)
+
+    df = await _load_df(session, market, symbol, timeframe, lookback, precision)
+    if df.empty:
+        raise HTTPException(status_code=404, detail="No OHLCV data available.")
+
+    sigs = await _load_signals(session, tenant_id, market, symbol, timeframe)
+    source = "db" if sigs else "fallback_ema20" if fallback_if_missing else "none"
+    if not sigs and not fallback_if_missing:
+        raise HTTPException(status_code=404, detail="No signals found for this key.")
+    if not sigs and fallback_if_missing:
+        sigs = _fallback_signals_ema20(df, tenant_id, market, symbol, timeframe, precision)
+
+    sig_df = _align_signals(df, sigs)
+    sig = pd.Series(sig_df["signal"].to_numpy(), index=sig_df["ts"].to_numpy(), name="signal")
+    sig = sig[~sig.index.duplicated(keep="last")]
+    res = compute_pnl(df, sig, fee_bps, slippage_bps, max_points, method,
+                      full_resolution=persist and full_resolution)
+
+    persisted_id: Optional[str] = None
+    if persist:
+        key = {"tenant_id": tenant_id, "market": market, "symbol": symbol, "timeframe": timeframe,
+               "fee_bps": fee_bps, "slippage_bps": slippage_bps}
+        persisted_id = await upsert_pnl(session, key, res)
+    res.pop("equity_full", None)
+
+    return {
+        "tenant_id": tenant_id, "market": market, "symbol": symbol, "timeframe": timeframe,
+        "lookback": lookback, "fee_bps": fee_bps, "slippage_bps": slippage_bps,
+        "source": source, **res,
+        "full_resolution": persisted_id is not None and full_resolution,
+        "persisted_id": persisted_id,
+    }
+
+@router.get("/metrics/equity/{pnl_id}")
+async def metrics_equity_full(
+    pnl_id: str,
+    max_points: int = 0,
+    method: str = Query("lttb", alias="downsample"),
+    session: Optional[AsyncSession] = Depends(get_session_optional),
+):
+    """Full-resolution equity of a simulated_pnl row; max_points > 0 cuts it like the stored one."""
+    _check_downsample(method)
+    if session is None:
+        raise HTTPException(status_code=503, detail="stored equity curves need the database")
+    eq = await load_equity_full(session, pnl_id)
+    if eq is None:
+        raise HTTPException(status_code=404, detail="No full-resolution equity stored for this id.")
+    idx, values = downsample(eq, max_points, method)
+    return {"id": pnl_id, "n_bars": int(len(eq)), "bar": idx.tolist(),
+            "equity": values.astype(float).tolist()}
@@ -0,0 +1,175 @@
+# runs_mep_v2.py
+# Bookkeeping for long jobs in the `runs` table (models_mep_v2.Run):
+# id, tenant_id, kind (backtest|optimize|...), status, params, result.
+#
+# status: queued -> running -> done | error, or -> cancelled from queued or
+# running. While running, `result` holds progress ({"done": i, "total": n});
+# on completion it holds the job result (or {"error": ...}).
+#
+# Job queue: submit_run() inserts a queued row, claim_run() takes the oldest
+# queued row with SELECT ... FOR UPDATE SKIP LOCKED (any number of workers,
+# in any number of processes, never claim the same job), finish_run() writes
+# the result only if the job is still running, so a cancel wins.
+# A claim holds a lease (lease_until, lease_token) that the worker renews with
+# heartbeat(); a running job whose lease expired (its worker died) is claimed
+# again, and the old claim can no longer renew or finish it.
+#
+# Sync helpers for a SQLAlchemy engine (db_mep_v2.engine). engine=None (no DB)
+# turns every call into a no-op so routes keep working in degraded mode.
+from __future__ import annotations
+
+import json
+import logging
+import os
+import uuid
+from typing import Any, Dict, Optional, Sequence
+
+from sqlalchemy import text
+
+logger = logging.getLogger("mep.runs")
+
+STATUSES = ("queued", "running", "done", "error", "cancelled")
+
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+
+class RunCancelled(Exception):
+    """The run was cancelled (or finished elsewhere) while this process worked on it."""
+
+def _json(obj: Any) -> str:
+    return json.dumps(obj, allow_nan=False, default=str)
+
+def create_run(engine, kind: str, params: Dict[str, Any], tenant_id: str = "default",
+               status: str = "running") -> str:
+    run_id = str(uuid.uuid4())
+    if engine is None:
+        return run_id
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO runs (id, tenant_id, kind, status, params)
+            VALUES (:id, :tenant_id, :kind, :status, CAST(:params AS jsonb))
+        """), {"id": run_id, "tenant_id": tenant_id, "kind": kind, "status": status,
+               "params": _json(params)})
+    return run_id
+
+def update_run(engine, run_id: str, status: Optional[str] = None, result: Any = None) -> None:
+    if engine is None:
+        return
+    if status is not None and status not in STATUSES:
+        raise ValueError(f"unknown run status {status!r}")
+    sets, p = [], {"id": run_id}
+    if status is not None:
+        sets.append("status=:status"); p["status"] = status
+    if result is not None:
+        sets.append("result=CAST(:result AS jsonb)"); p["result"] = _json(result)
+    if not sets:
+        return
+    with engine.begin() as conn:
+        conn.execute(text(f"UPDATE runs SET {', '.join(sets)} WHERE id=:id"), p)
+
+def get_run(engine, run_id: str) -> Optional[Dict[str, Any]]:
+    if engine is None:
+        return None
+    with engine.connect() as conn:
+        row = conn.execute(text("SELECT id, tenant_id, kind, status, params, result, created_at "
+                                "FROM runs WHERE id=:id"), {"id": run_id}).mappings().first()
+    return dict(row) if row else None
+
+def progress_recorder(engine, run_id: str):
+    """
+    progress(done, total) callback that stores {"done", "total"} on the run.
+    Raises RunCancelled once the run is no longer running, so long jobs stop
+    at their next progress point; DB errors are logged, not raised.
+    """
+    def progress(done: int, total: int) -> None:
+        if engine is None:
+            return
+        try:
+            progress = _json({"done": int(done), "total": int(total)})
+            with engine.begin() as conn:
+                row = conn.execute(text("UPDATE runs SET result=CAST(:result AS jsonb) "
+                                        "WHERE id=:id AND status='running' RETURNING id"),
+                                   {"id": run_id, "result": progress}).first()
+        except Exception as e:
+            logger.warning("run %s progress update failed: %s", run_id, e)
+            return
+        if row is None:
+            raise RunCancelled(run_id)
+    return progress
+
+# -----------------------------------------------------------------------------
+# Job queue
+# -----------------------------------------------------------------------------
+def submit_run(engine, kind: str, params: Dict[str, Any], tenant_id: str = "default") -> str:
+    if engine is None:
+        raise RuntimeError("job queue needs the database")
+    return create_run(engine, kind, params, tenant_id, status="queued")
+
+def claim_run(engine, kinds: Sequence[str],
+              lease_seconds: float = JOB_LEASE_SECONDS) -> Optional[Dict[str, Any]]:
+    """
+    Oldest queued run of one of `kinds` (or running run whose lease expired),
+    now running under a new lease; None when there is none. The returned
+    "lease" token goes to heartbeat() and finish_run().
+    """
+    if engine is None:
+        return None
+    with engine.begin() as conn:
+        row = conn.execute(text("""
+            UPDATE runs SET status='running', lease_token=:token,
+                   lease_until=now() + make_interval(secs => :lease)
+            WHERE id = (
+                SELECT id FROM runs
+                WHERE kind = ANY(:kinds)
+                  AND (status='queued' OR (status='running' AND lease_until < now()))
+                ORDER BY created_at, id
+                FOR UPDATE SKIP LOCKED
+                LIMIT 1
+            )
+            RETURNING id, tenant_id, kind, params, lease_token AS lease
+        """), {"kinds": list(kinds), "token": str(uuid.uuid4()),
+               "lease": float(lease_seconds)}).mappings().first()
+    return dict(row) if row else None
+
+def heartbeat(engine, run_id: str, lease: str, lease_seconds: float = JOB_LEASE_SECONDS) -> bool:
+    """Extend a claimed run's lease; False once it is no longer running under this lease."""
+    if engine is None:
+        return True
+    with engine.begin() as conn:
+        row = conn.execute(text("UPDATE runs "
+                                "SET lease_until=now() + make_interval(secs => :lease_s) "
+                                "WHERE id=:id AND status='running' AND lease_token=:lease "
+                                "RETURNING id"),
+                           {"id": run_id, "lease": lease, "lease_s": float(lease_seconds)}).first()
+    return row is not None
+
+def finish_run(engine, run_id: str, status: str, result: Any, lease: Optional[str] = None) -> bool:
+    """
+    Write the final status/result if the run is still running (and, for a
+    claimed job, still held by `lease`); False if it was cancelled or claimed
+    again meanwhile.
+    """
+    if status not in ("done", "error"):
+        raise ValueError(f"not a final status: {status!r}")
+    if engine is None:
+        return True
+    q = ("UPDATE runs SET status=:status, result=CAST(:result AS jsonb) "
+         "WHERE id=:id AND status='running'")
+    p = {"id": run_id, "status": status, "result": _json(result)}
+    if lease is not None:
+        q += " AND lease_token=:lease"; p["lease"] = lease
+    with engine.begin() as conn:
+        row = conn.execute(text(q + " RETURNING id"), p).first()
+    return row is not None
+
+def cancel_run(engine, run_id: str) -> Optional[str]:
+    """Cancel a queued or running run; returns its status afterwards (None if it does not exist)."""
+    if engine is None:
+        return None
+    with engine.begin() as conn:
+        row = conn.execute(text("UPDATE runs SET status='cancelled' "
+                                "WHERE id=:id AND status IN ('queued', 'running') "
+                                "RETURNING status"),
+                           {"id": run_id}).first()
+        if row is not None:
+            return row[0]
+        return conn.execute(text("SELECT status FROM runs WHERE id=:id"), {"id": run_id}).scalar()
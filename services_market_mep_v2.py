@@ -1,12 +1,20 @@
-from typing import Optional, List, Dict
-import logging, traceback
-from fastapi import APIRouter, Query, HTTPException, Depends
-from sqlalchemy.ext.asyncio import AsyncSession
+import logging
+import traceback
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
-from db_mep_v2 import get_session_optional
-from services_storage_mep_v2 import read_ohlcv, upsert_ohlcv
+from db_mep_v2 import engine, get_session_optional
+from indicator_cache_mep_v2 import cached_indicators
+from indicators_mep_v2 import OHLCV_COLS, IndicatorSpec, plan_columns
+from indicators_store_mep_v2 import indicators_frame, read_bars
 from services_binance_public_mep_v1 import get_klines, get_klines_range
+from services_metrics_mep_v2 import rows_to_df
+from services_storage_mep_v2 import read_ohlcv, upsert_ohlcv
 
 logger = logging.getLogger("mep.data")
 router = APIRouter(tags=["data-v2"])
@@ -68,6 +76,92 @@ async def ohlcv(
         logger.debug("trace:\n%s", "".join(traceback.format_exc()))
         raise HTTPException(status_code=502, detail=f"{type(e).__name__}: {e}")
 
+def _stored_indicators(tenant_id: str, market: str, symbol: str, timeframe: str,
+                       since: Optional[int], until: Optional[int], limit: Optional[int],
+                       specs: List[IndicatorSpec], precision: str):
+    """Stored bars of the range with their indicators (materialized or computed), None if none."""
+    if engine is None:
+        return None
+    try:
+        with engine.connect() as conn:
+            bars = read_bars(conn, tenant_id, market, symbol, timeframe, since, until,
+                             None if since is not None or until is not None else (limit or 1000))
+    except SQLAlchemyError as e:
+        logger.warning("stored bars unavailable: %s", e)
+        return None
+    if bars.empty:
+        return None
+    return indicators_frame(engine, bars, specs, tenant_id=tenant_id, market=market, symbol=symbol,
+                            timeframe=timeframe, precision=precision)
+
+def _columnar(values: np.ndarray) -> List[Optional[float]]:
+    # JSON has no NaN/inf: warm-up and undefined points go out as null
+    out = values.astype(np.float64, copy=False).tolist()
+    if not np.isfinite(values).all():
+        bad = np.flatnonzero(~np.isfinite(values))
+        for i in bad.tolist():
+            out[i] = None
+    return out
+
+@router.post("/indicators")
+async def indicators(payload: Dict[str, Any] = Body(...)):
+    """
+    Indicators of the stored bars (materialized rows when they cover the range,
+    computed otherwise; Binance only when nothing is stored), only the requested columns:
+      {"symbol": "BTCUSDT", "timeframe": "1h", "since": ..., "until": ...,
+       "indicators": ["rsi", {"name": "ema", "params": {"span": 50}}], "fields": ["close"]}
+    -> {"columns": ["ts", "close", "rsi", "ema50"], "data": {"ts": [...], "close": [...], ...}}
+    """
+    market = (payload.get("market") or "binance").lower()
+    symbol_u = (payload.get("symbol") or "").upper()
+    tf = payload.get("timeframe") or payload.get("tf") or "1h"
+    since = payload.get("since"); until = payload.get("until"); limit = payload.get("limit")
+    tenant_id = payload.get("tenant_id", "default")
+    precision = payload.get("precision", "float64")
+    if market != "binance":
+        raise HTTPException(status_code=400, detail="Only 'binance' supported.")
+    if len(symbol_u) < 6:
+        raise HTTPException(status_code=400, detail="symbol is required (e.g. BTCUSDT).")
+    try:
+        specs = [IndicatorSpec.parse(x) for x in payload.get("indicators") or []]
+        fields = [f for f in payload.get("fields") or [] if f != "ts"]
+        if not specs:
+            raise ValueError("indicators must be a non-empty list")
+        bad = [f for f in fields if f not in OHLCV_COLS]
+        if bad:
+            raise ValueError(f"unknown fields {bad}")
+        cols = plan_columns(specs)
+        dup = sorted({c for c in cols + fields if (cols + fields).count(c) > 1})
+        if dup:
+            raise ValueError(f"duplicate output columns {dup}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        source = "db"
+        ind = await run_in_threadpool(_stored_indicators, tenant_id, market, symbol_u, tf,
+                                      since, until, limit, specs, precision)
+        if ind is None:
+            source = "binance"
+            rows = await fetch_binance_ohlcv(symbol_u, tf, since, until, limit=limit)
+            ind = cached_indicators(rows_to_df(rows), specs, tenant_id=tenant_id, market=market,
+                                    symbol=symbol_u, timeframe=tf, precision=precision)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("indicators failed: %s", e)
+        logger.debug("trace:\n%s", "".join(traceback.format_exc()))
+        raise HTTPException(status_code=502, detail=f"{type(e).__name__}: {e}")
+
+    out_cols = fields + cols
+    data: Dict[str, Any] = {"ts": ind["ts"].astype("int64").tolist()}
+    for c in out_cols:
+        data[c] = _columnar(ind[c].to_numpy())
+    return {"market": market, "symbol": symbol_u, "timeframe": tf, "source": source,
+            "n": len(ind), "columns": ["ts"] + out_cols, "data": data}
+
 # Endpoint de debug: Binance direto
 @router.get("/data/ohlcv_direct")
 async def ohlcv_direct(symbol: str = Query(..., min_length=6), tf: str = Query("1h"), limit: Optional[int] = Query(5, ge=1, le=1000)):
@@ -1,20 +1,25 @@
 
 from __future__ import annotations
+
 import uuid
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Any, Dict, List, Optional
+
 import numpy as np
 import pandas as pd
 from sqlalchemy import select
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from models_mep_v2 import AccuracyMetric, SimulatedPnL, Signal
 from backtesting_mep_v2 import event_backtest
+from downsample_mep_v2 import EQUITY_MAX_POINTS, decode_curve, downsample, encode_curve
+from indicators_mep_v2 import to_precision
+from models_mep_v2 import AccuracyMetric, Signal, SimulatedPnL
+
 
 # -----------------------------
 # Helpers
 # -----------------------------
-def _to_df(rows: List[Dict[str, Any]]) -> pd.DataFrame:
+def rows_to_df(rows: List[Dict[str, Any]], precision: str = "float64") -> pd.DataFrame:
     if not rows:
         return pd.DataFrame(columns=["ts","open","high","low","close","volume"])
     df = pd.DataFrame(rows)
@@ -26,7 +31,7 @@ def _to_df(rows: List[Dict[str, Any]]) -> pd.DataFrame:
     df = df[expected].copy()
     df["ts"] = df["ts"].astype("int64")
     df[["open","high","low","close","volume"]] = df[["open","high","low","close","volume"]].astype("float64")
-    return df.sort_values("ts").reset_index(drop=True)
+    return to_precision(df, precision).sort_values("ts").reset_index(drop=True)
 
 async def load_signals_series(session: Optional[AsyncSession], tenant_id: str, market: str, symbol: str, timeframe: str) -> Optional[pd.Series]:
     if session is None:
@@ -92,18 +97,32 @@ def compute_accuracy(df: pd.DataFrame, sig: pd.Series, horizon_bars: int=24) ->
         },
     }
 
-def compute_pnl(df: pd.DataFrame, sig: pd.Series, fee_bps: float=10.0, slippage_bps: float=5.0) -> Dict[str, Any]:
+def compute_pnl(df: pd.DataFrame, sig: pd.Series, fee_bps: float=10.0, slippage_bps: float=5.0,
+                max_points: int=EQUITY_MAX_POINTS, method: str="lttb",
+                full_resolution: bool=False) -> Dict[str, Any]:
+    """
+    equity_curve / equity_ts: the curve cut to `max_points` (downsample_mep_v2;
+    0 keeps every bar). full_resolution=True adds "equity_full", the whole
+    curve as compressed float32 bytes for upsert_pnl.
+    """
     base = df.copy()
     # align
     s = sig.reindex(base["ts"].to_numpy(), fill_value=0)
     base["signal"] = s.to_numpy()
     pnl, dd, trades, eq = event_backtest(base, signal_col="signal", fee_bps=fee_bps, slippage_bps=slippage_bps)
-    return {
+    idx, eq_ds = downsample(eq, max_points, method)
+    ts = base["ts"].to_numpy()
+    res = {
         "total_pnl": float(pnl),
         "max_drawdown": float(dd),
         "n_trades": int(len(trades)),
-        "equity_curve": [float(x) for x in eq],
+        "n_bars": int(len(eq)),
+        "equity_curve": eq_ds.tolist(),
+        "equity_ts": ts[idx].tolist() if len(ts) == len(eq) else idx.tolist(),
     }
+    if full_resolution:
+        res["equity_full"] = encode_curve(eq)
+    return res
 
 async def upsert_accuracy(session: Optional[AsyncSession], key: Dict[str, Any], res: Dict[str, Any]) -> Optional[str]:
     if session is None:
@@ -136,7 +155,9 @@ async def upsert_pnl(session: Optional[AsyncSession], key: Dict[str, Any], res:
         tenant_id=key["tenant_id"], market=key["market"], symbol=key["symbol"], timeframe=key["timeframe"],
         fee_bps=key["fee_bps"], slippage_bps=key["slippage_bps"],
         total_pnl=res["total_pnl"], max_drawdown=res["max_drawdown"], n_trades=res["n_trades"],
-        equity_curve=res["equity_curve"]
+        equity_curve={"n": res.get("n_bars", len(res["equity_curve"])), "ts": res.get("equity_ts"),
+                      "equity": res["equity_curve"]},
+        equity_full=res.get("equity_full"),
     )
     stmt = stmt.on_conflict_do_update(
         index_elements=["tenant_id","market","symbol","timeframe","fee_bps","slippage_bps"],
@@ -145,9 +166,18 @@ async def upsert_pnl(session: Optional[AsyncSession], key: Dict[str, Any], res:
             "max_drawdown": stmt.excluded.max_drawdown,
             "n_trades": stmt.excluded.n_trades,
             "equity_curve": stmt.excluded.equity_curve,
+            "equity_full": stmt.excluded.equity_full,
         }
     ).returning(SimulatedPnL.id)
     row = await session.execute(stmt)
     rid = row.scalar_one()
     await session.commit()
     return rid
+
+async def load_equity_full(session: Optional[AsyncSession], pnl_id: str) -> Optional[np.ndarray]:
+    """Full-resolution equity (float32) of a simulated_pnl row; None if absent or not stored."""
+    if session is None:
+        return None
+    row = await session.execute(select(SimulatedPnL.equity_full).where(SimulatedPnL.id==pnl_id))
+    blob = row.scalar_one_or_none()
+    return decode_curve(blob) if blob is not None else None
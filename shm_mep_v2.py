@@ -0,0 +1,107 @@
+# shm_mep_v2.py
+# Shared-memory data plane for process pools: a job publishes its arrays
+# (OHLCV + indicator columns) once into multiprocessing.shared_memory and
+# workers attach zero-copy, read-only NumPy views from tiny handles.
+#
+#   with publish_frame(df) as shared:                        # owner (API process)
+#       pool = ProcessPoolExecutor(initializer=init, initargs=(shared.handles,))
+#   ...
+#   df = attach_frame(handles)                               # worker
+#
+# The owner unlinks every segment when the `with` block exits, on close(), or
+# when the SharedArrays object is garbage collected / the interpreter exits
+# (weakref.finalize). Workers only close their mappings.
+from __future__ import annotations
+
+import weakref
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Mapping, NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class ShareError(Exception):
+    """An array that cannot be placed in shared memory (object dtype)."""
+
+class ShmHandle(NamedTuple):
+    name: str
+    dtype: str
+    shape: Tuple[int, ...]
+
+def _release(shms: List[SharedMemory]) -> None:
+    for shm in shms:
+        shm.close()
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+    shms.clear()
+
+class SharedArrays:
+    """Owner of a set of published arrays; .handles maps key -> ShmHandle."""
+
+    def __init__(self, arrays: Mapping[str, np.ndarray]):
+        self._shms: List[SharedMemory] = []
+        self._finalizer = weakref.finalize(self, _release, self._shms)
+        self.handles: Dict[str, ShmHandle] = {}
+        try:
+            for key, arr in arrays.items():
+                arr = np.ascontiguousarray(arr)
+                if arr.dtype.hasobject:
+                    raise ShareError(f"{key!r}: object arrays cannot be shared")
+                shm = SharedMemory(create=True, size=max(arr.nbytes, 1))  # size 0 is not allowed
+                self._shms.append(shm)
+                np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+                self.handles[key] = ShmHandle(shm.name, arr.dtype.str, arr.shape)
+        except BaseException:
+            self.close()
+            raise
+
+    @property
+    def nbytes(self) -> int:
+        return sum(s.size for s in self._shms)
+
+    def close(self) -> None:
+        """Unlink every segment (idempotent). Views attached elsewhere stay valid until detached."""
+        self._finalizer()
+
+    def __enter__(self) -> "SharedArrays":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def publish(arrays: Mapping[str, np.ndarray]) -> SharedArrays:
+    return SharedArrays(arrays)
+
+def publish_frame(df: pd.DataFrame) -> SharedArrays:
+    """One segment per column; columns must be numeric (ts, OHLCV, indicators), else ShareError."""
+    return SharedArrays({str(c): df[c].to_numpy() for c in df.columns})
+
+# -----------------------------------------------------------------------------
+# Worker side
+# -----------------------------------------------------------------------------
+# attached segments stay mapped while this process may hold views into them
+_ATTACHED: Dict[str, SharedMemory] = {}
+
+def attach(h: ShmHandle) -> np.ndarray:
+    shm = _ATTACHED.get(h.name)
+    if shm is None:
+        shm = _ATTACHED[h.name] = SharedMemory(name=h.name)
+    arr = np.ndarray(tuple(h.shape), dtype=np.dtype(h.dtype), buffer=shm.buf)
+    arr.flags.writeable = False
+    return arr
+
+def attach_frame(handles: Mapping[str, ShmHandle]) -> pd.DataFrame:
+    """Zero-copy, read-only DataFrame over published columns."""
+    return pd.DataFrame({c: attach(h) for c, h in handles.items()}, copy=False)
+
+def detach_all() -> None:
+    """Close this process's mappings; any view obtained from attach() is invalid afterwards."""
+    for shm in _ATTACHED.values():
+        try:
+            shm.close()
+        except BufferError:  # a view is still alive; the mapping goes away with the process
+            pass
+    _ATTACHED.clear()
@@ -1,5 +1,7 @@
+import numpy as np
 import pandas as pd
 
+
 def mean_reversion_signals(df: pd.DataFrame, rsi_buy: float = 30.0, rsi_sell: float = 70.0):
     out = df.copy()
     out["signal"] = 0
@@ -9,6 +11,18 @@ def mean_reversion_signals(df: pd.DataFrame, rsi_buy: float = 30.0, rsi_sell: fl
     out["signal"] = out["signal"].shift(1).fillna(0).astype(int)
     return out
 
+def mean_reversion_signal_matrix(rsi: np.ndarray, rsi_buy=30.0, rsi_sell=70.0) -> np.ndarray:
+    # array form of mean_reversion_signals for (n_variants, n_bars) RSI matrices;
+    # rsi_buy/rsi_sell broadcast, e.g. shape (n_variants, 1) for per-row thresholds
+    rsi = np.asarray(rsi, dtype=np.float64)
+    sig = np.zeros(rsi.shape, dtype=np.int8)
+    sig[rsi <= rsi_buy] = 1
+    sig[rsi >= rsi_sell] = -1
+    # shift by 1 to avoid lookahead
+    out = np.zeros_like(sig)
+    out[..., 1:] = sig[..., :-1]
+    return out
+
 STRATEGY_REGISTRY = {
     "mean_reversion": mean_reversion_signals,
 }
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from backtest_state_mep_v2 import advance, params_hash, run_spec
+from backtesting_mep_v2 import event_backtest
+from strategies_mep_v1 import mean_reversion_signals
+
+
+def _frame(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return pd.DataFrame({"ts": np.arange(n, dtype=np.int64) * 60000, "close": close,
+                         "rsi": rng.uniform(0, 100, n)})
+
+def test_appended_bars_continue_the_saved_run():
+    df = _frame(3000)
+    params = {"rsi_buy": 25.0, "rsi_sell": 75.0}
+    pnl, dd, trades, _ = event_backtest(mean_reversion_signals(df, **params))
+    res, state = advance(df.iloc[:2000], 2000, "mean_reversion", params, None)
+    for a, b in ((2000, 2060), (2060, 2061), (2061, 3000)):
+        # the saved state stops one bar short: that bar is read again, plus the lookback
+        lo = int(np.searchsorted(df["ts"], state.last_ts, side="right"))
+        frame = df.iloc[lo - 1:b]
+        res, state = advance(frame, b - lo, "mean_reversion", params, state)
+    assert (res["pnl"], res["max_dd"], res["trades"], res["bars"]) == (pnl, dd, len(trades), 3000)
+    assert state.bars == 2999 and state.last_ts == int(df["ts"].iloc[-2])
+
+def test_params_hash_covers_costs():
+    p = {"rsi_buy": 30.0}
+    assert params_hash(run_spec(p, 10, 5)) == params_hash(run_spec(p, 10.0, 5.0))
+    assert params_hash(run_spec({}, 10, 5)) != params_hash(run_spec({}, 10, 6))
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from backtesting_mep_v2 import (
+    BacktestState,
+    event_backtest_arrays,
+    event_backtest_loop,
+    event_backtest_matrix,
+    event_backtest_resume,
+    purged_kfold,
+    rank_order,
+)
+
+hypothesis = pytest.importorskip("hypothesis")
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+
+def _assert_same(got, want):
+    pnl, dd, trades, eq = got
+    rpnl, rdd, rtrades, req = want
+    assert trades == rtrades
+    np.testing.assert_allclose(eq, req, rtol=1e-12, atol=1e-12, equal_nan=True)
+    np.testing.assert_allclose([pnl, dd], [rpnl, rdd], rtol=1e-12, atol=1e-12, equal_nan=True)
+
+@st.composite
+def _market(draw):
+    n = draw(st.integers(0, 300))
+    rets = draw(st.lists(st.floats(-0.2, 0.2), min_size=n, max_size=n))
+    close = 100 * np.cumprod(1 + np.asarray(rets, dtype=np.float64))
+    sig = np.asarray(draw(st.lists(st.sampled_from([-1, 0, 1]), min_size=n, max_size=n)),
+                     dtype=np.int64)
+    fee = draw(st.floats(0, 50)); slip = draw(st.floats(0, 50))
+    return close, sig, fee, slip
+
+@settings(max_examples=300, deadline=None)
+@given(_market())
+def test_vectorized_engine_matches_loop_oracle(m):
+    close, sig, fee, slip = m
+    ts = np.arange(len(close), dtype=np.int64) * 60000
+    _assert_same(event_backtest_arrays(close, sig, ts, fee, slip),
+                 event_backtest_loop(close, sig, ts, fee, slip))
+
+@settings(max_examples=200, deadline=None)
+@given(_market(), st.lists(st.integers(0, 300), max_size=4))
+def test_resumed_runs_match_one_run(m, cuts):
+    close, sig, fee, slip = m
+    ts = np.arange(len(close), dtype=np.int64) * 60000
+    pnl, dd, trades, eq = event_backtest_arrays(close, sig, ts, fee, slip)
+    state, got_trades, got_eq, prev = None, [], [], 0
+    for k in sorted(min(c, len(close)) for c in cuts) + [len(close)]:
+        rp, rd, tr, e, state = event_backtest_resume(close[prev:k], sig[prev:k], state, ts[prev:k],
+                                                     fee, slip)
+        state = BacktestState.from_dict(state.to_dict())
+        got_trades += tr; got_eq.append(e); prev = k
+    assert (rp, rd) == (pnl, dd) and got_trades == trades
+    assert np.array_equal(np.concatenate(got_eq), eq[:len(close)])
+    assert state.trades == len(trades) and state.bars == len(close)
+
+def test_flat_bars_ignore_bad_closes():
+    close = np.array([100.0, 0.0, np.nan, 101.0, 102.0, 100.0])
+    sig = np.array([0, 0, 0, 0, 1, 1])
+    _assert_same(event_backtest_arrays(close, sig), event_backtest_loop(close, sig))
+    assert event_backtest_arrays(close[:1], sig[:1])[3].tolist() == [1.0]
+
+def test_matrix_rows_match_single_engine(monkeypatch):
+    rng = np.random.default_rng(3)
+    close = 100 * np.cumprod(1 + rng.normal(0, 0.01, 400))
+    sigs = rng.integers(-1, 2, size=(60, 400)).astype(np.int8)
+    sigs[0] = 0
+    monkeypatch.setattr("backtesting_mep_v2.MATRIX_BLOCK", 7 * 400)  # several row blocks
+    res = event_backtest_matrix(close, sigs, 7.0, 3.0, return_equity=True)
+    for i, s in enumerate(sigs):
+        pnl, dd, trades, eq = event_backtest_arrays(close, s, None, 7.0, 3.0)
+        assert (res["pnl"][i], res["max_dd"][i], res["trades"][i]) == (pnl, dd, len(trades))
+        np.testing.assert_array_equal(res["equity"][i], eq)
+
+def test_rank_order():
+    res = {"pnl": np.array([0.1, 0.3, -0.2, 0.3]), "max_dd": np.array([0.05, 0.2, 0.0, 0.1]),
+           "trades": np.array([4, 2, 0, 2])}
+    assert rank_order(res, "pnl").tolist() == [1, 3, 0, 2]
+    assert rank_order(res, "max_dd").tolist() == [2, 0, 3, 1]
+    assert rank_order(res, "ret_dd").tolist() == [3, 0, 1, 2]  # no drawdown -> NaN -> last
+    with pytest.raises(ValueError):
+        rank_order(res, "sharpe")
+
+def test_purged_kfold_purge_and_embargo():
+    folds = list(purged_kfold(100, k=4, purge=5, embargo=3))
+    assert [te for _, te in folds] == [slice(0, 25), slice(25, 50), slice(50, 75), slice(75, 100)]
+    tr, te = folds[1]
+    assert tr.tolist() == list(range(0, 20)) + list(range(53, 100))
+    assert folds[0][0].tolist() == list(range(28, 100))
+    assert folds[3][0].tolist() == list(range(0, 70))
@@ -0,0 +1,24 @@
+import numpy as np
+
+from benchmarks.bench_suite import compare, run
+from benchmarks.synthetic import gbm_ohlcv
+
+
+def test_gbm_ohlcv_is_deterministic_and_consistent():
+    a, b = gbm_ohlcv(5000, seed=7), gbm_ohlcv(5000, seed=7)
+    assert a.equals(b) and not a.equals(gbm_ohlcv(5000, seed=8))
+    body_hi = np.maximum(a["open"], a["close"]); body_lo = np.minimum(a["open"], a["close"])
+    assert (a["high"] >= body_hi).all() and (a["low"] <= body_lo).all() and (a["volume"] > 0).all()
+    assert np.all(np.diff(a["ts"]) == 60_000)
+
+def test_run_and_compare_flag_regressions():
+    doc = run(sizes=[2000], pattern=r"^indicators\.(rsi|ema)$|event_backtest", repeat=1,
+              min_time=0.0)
+    assert {r["case"] for r in doc["results"]} == {"indicators.rsi", "indicators.ema",
+                                                   "backtesting.event_backtest"}
+    assert all(r["best_s"] > 0 for r in doc["results"])
+    slower = {"results": [dict(r, best_s=r["best_s"] * 2 + 0.01) for r in doc["results"]]}
+    rows = compare(doc, slower, threshold=0.25)
+    assert {r["status"] for r in rows} == {"regression"}
+    assert {r["status"] for r in compare(doc, doc)} == {"ok"}
+    assert compare(doc, {"results": []})[0]["status"] == "missing"
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from backtest_state_mep_v2 import SIGNAL_LOOKBACK
+from backtesting_mep_v2 import event_backtest
+from benchmarks.synthetic import gbm_ohlcv
+from chunked_mep_v2 import (
+    ChunkedIndicators,
+    chunked_backtest,
+    iter_chunked_backtest,
+    iter_frame_chunks,
+)
+from indicators_mep_v2 import IndicatorSpec, apply_default_indicators_v2, compute_indicators
+from strategies_mep_v1 import STRATEGY_REGISTRY, mean_reversion_signals
+
+# carried exactly; the rest (pandas rolling sums) are recomputed over warm-up
+EXACT = ("ema20", "rsi", "macd", "macd_signal", "macd_hist", "atr", "obv", "vwap", "stoch_k")
+
+@pytest.mark.parametrize("chunk,n", [(1, 300), (13, 3000), (500, 3000), (5000, 3000)])
+def test_chunked_run_matches_in_memory(chunk, n):
+    df = gbm_ohlcv(n, seed=7)
+    full = apply_default_indicators_v2(df)
+    ind = ChunkedIndicators()
+    block = np.concatenate([ind.update(b) for b in iter_frame_chunks(df, chunk)], axis=1)
+    for j, c in enumerate(ind.columns):
+        if c in EXACT:
+            assert np.array_equal(block[j], full[c].to_numpy(), equal_nan=True), c
+        np.testing.assert_allclose(block[j], full[c].to_numpy(), rtol=1e-9, atol=1e-9,
+                                   equal_nan=True)
+    params = {"rsi_buy": 35.0, "rsi_sell": 65.0}
+    pnl, dd, trades, eq = event_backtest(mean_reversion_signals(full, **params))
+    recs = list(iter_chunked_backtest(iter_frame_chunks(df, chunk), params=params))
+    assert [t for r in recs for t in r["trades"]] == trades
+    assert np.array_equal(np.concatenate([r["equity"] for r in recs]), eq)
+    res = chunked_backtest(iter_frame_chunks(df, chunk), params=params)
+    assert (res["pnl"], res["max_dd"], res["trades"], res["bars"]) == (pnl, dd, len(trades), n)
+
+def test_other_indicators_carry_across_chunks():
+    df = gbm_ohlcv(2000, seed=1)
+    specs = [IndicatorSpec.of(n) for n in ("wma", "dema", "tema", "trima", "cci", "mfi")]
+    full = compute_indicators(df, specs)
+    ind = ChunkedIndicators(specs)
+    block = np.concatenate([ind.update(b) for b in iter_frame_chunks(df, 37)], axis=1)
+    for j, c in enumerate(ind.columns):
+        np.testing.assert_allclose(block[j], full[c].to_numpy(), rtol=1e-9, atol=1e-9,
+                                   equal_nan=True)
+
+def test_uncarriable_indicators_are_refused():
+    for name in ("adx", "ichimoku"):
+        with pytest.raises(ValueError):
+            ChunkedIndicators([IndicatorSpec.of(name)])
+
+def _momentum_signals(df, lag=4):
+    # long/short on the sign of the lag-bar change, acted on the next bar: needs lag + 1 bars back
+    out = df.copy()
+    out["signal"] = np.sign(out["close"].diff(lag)).shift(1).fillna(0).astype(int)
+    return out
+
+@pytest.mark.parametrize("chunk", [1, 2, 3, 7])
+def test_signal_lookback_longer_than_a_chunk(monkeypatch, chunk):
+    monkeypatch.setitem(STRATEGY_REGISTRY, "momentum", _momentum_signals)
+    monkeypatch.setitem(SIGNAL_LOOKBACK, "momentum", 5)
+    df = gbm_ohlcv(200, seed=3)
+    _, _, trades, eq = event_backtest(_momentum_signals(apply_default_indicators_v2(df)))
+    recs = list(iter_chunked_backtest(iter_frame_chunks(df, chunk), strategy="momentum"))
+    assert [t for r in recs for t in r["trades"]] == trades
+    assert np.array_equal(np.concatenate([r["equity"] for r in recs]), eq)
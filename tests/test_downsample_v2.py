@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+import downsample_mep_v2 as ds
+
+
+def _curve(n=50_000, seed=1):
+    rng = np.random.default_rng(seed)
+    return 1.0 + np.cumsum(rng.normal(0, 1e-3, n))
+
+@pytest.mark.parametrize("method", ds.METHODS)
+def test_downsample_budget_endpoints_and_order(method):
+    y = _curve()
+    idx, v = ds.downsample(y, 500, method)
+    assert len(idx) <= 500 and idx[0] == 0 and idx[-1] == len(y) - 1
+    assert np.all(np.diff(idx) > 0) and np.array_equal(v, y[idx])
+    # within budget (or budget 0): every point
+    assert len(ds.downsample(y[:300], 500, method)[0]) == 300
+    assert len(ds.downsample(y, 0, method)[0]) == len(y)
+
+@pytest.mark.parametrize("method", ds.METHODS)
+def test_small_budgets_are_not_exceeded(method):
+    y = _curve(1_000)
+    for budget in range(1, 8):
+        idx = ds.downsample(y, budget, method)[0]
+        assert 1 <= len(idx) <= budget and idx[0] == 0
+        assert budget == 1 or idx[-1] == len(y) - 1
+
+def test_minmax_keeps_the_envelope_and_lttb_the_extremes_shape():
+    y = _curve()
+    v = ds.downsample(y, 400, "minmax")[1]
+    assert v.min() == y.min() and v.max() == y.max()
+    # a single spike survives LTTB
+    y2 = np.zeros(10_000); y2[4321] = 5.0
+    assert 4321 in ds.lttb(y2, 50)
+
+def test_encode_curve_roundtrip():
+    y = _curve()
+    blob = ds.encode_curve(y)
+    assert len(blob) < y.astype(np.float32).nbytes
+    np.testing.assert_array_equal(ds.decode_curve(blob), y.astype(np.float32))
+    with pytest.raises(ValueError):
+        ds.decode_curve(b"nope" + blob[4:])
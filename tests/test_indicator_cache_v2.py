@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+import indicators_mep_v2 as ind
+from indicator_cache_mep_v2 import IndicatorCache
+
+KEY = dict(tenant_id="t1", market="binance", symbol="BTCUSDT", timeframe="1m")
+
+def _toy_df(n=400, seed=5):
+    rng = np.random.default_rng(seed)
+    ts = np.arange(n, dtype=np.int64) * 60000
+    price = 100 + rng.normal(0, 0.5, size=n).cumsum()
+    high = price + rng.random(size=n)
+    low = price - rng.random(size=n)
+    vol = rng.integers(100, 1000, size=n).astype(float)
+    return pd.DataFrame({"ts": ts, "open": price, "high": high, "low": low, "close": price,
+                         "volume": vol})
+
+def test_exact_hit_returns_cached_frame():
+    cache = IndicatorCache()
+    df = _toy_df()
+    a = cache.get_or_compute(df, ind.DEFAULT_INDICATORS, **KEY)
+    b = cache.get_or_compute(df.copy(), ind.DEFAULT_INDICATORS, **KEY)
+    assert a is b
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+def test_append_extends_from_saved_state():
+    cache = IndicatorCache()
+    full = _toy_df(400)
+    specs = ind.DEFAULT_INDICATORS + (ind.IndicatorSpec.of("cci"), ind.IndicatorSpec.of("mfi"))
+    cache.get_or_compute(full.iloc[:340], specs, **KEY)
+    got = cache.get_or_compute(full, specs, **KEY)
+    assert cache.stats()["extends"] == 1 and cache.stats()["entries"] == 1
+    want = ind.compute_indicators(full, specs)
+    assert list(got.columns) == list(want.columns)
+    np.testing.assert_allclose(got.to_numpy(float), want.to_numpy(float), rtol=1e-9, atol=1e-9)
+
+def test_revised_last_bar_is_not_served_stale():
+    cache = IndicatorCache()
+    full = _toy_df(300)
+    specs = ind.DEFAULT_INDICATORS + (ind.IndicatorSpec.of("cci"),)
+    cache.get_or_compute(full, specs, **KEY)
+    revised = full.copy()
+    revised.loc[revised.index[-1], ["high", "close"]] += 3.0   # the open candle moved
+    got = cache.get_or_compute(revised, specs, **KEY)
+    st = cache.stats()
+    assert st["hits"] == 0 and st["extends"] == 1 and st["entries"] == 1
+    want = ind.compute_indicators(revised, specs)
+    np.testing.assert_allclose(got.to_numpy(float), want.to_numpy(float), rtol=1e-9, atol=1e-9)
+    # and the revised frame still extends
+    more = pd.concat([revised, _toy_df(310).iloc[300:]])
+    got = cache.get_or_compute(more, specs, **KEY)
+    assert cache.stats()["extends"] == 2
+    want = ind.compute_indicators(more, specs)
+    np.testing.assert_allclose(got.to_numpy(float), want.to_numpy(float), rtol=1e-9, atol=1e-9)
+
+def test_non_extendable_specs_recompute():
+    cache = IndicatorCache()
+    full = _toy_df(300)
+    specs = (ind.IndicatorSpec.of("ichimoku"),)
+    cache.get_or_compute(full.iloc[:250], specs, **KEY)
+    got = cache.get_or_compute(full, specs, **KEY)
+    assert cache.stats()["extends"] == 0 and cache.stats()["misses"] == 2
+    pd.testing.assert_frame_equal(got, ind.compute_indicators(full, specs))
+
+def test_lru_and_byte_budget_eviction():
+    df = _toy_df(200)
+    one = IndicatorCache().get_or_compute(df, ind.DEFAULT_INDICATORS, **KEY)
+    size = int(one.memory_usage(index=True).sum())
+    cache = IndicatorCache(max_entries=10, max_bytes=2 * size)
+    for sym in ("A", "B", "C"):
+        cache.get_or_compute(df, ind.DEFAULT_INDICATORS, **{**KEY, "symbol": sym})
+    st = cache.stats()
+    assert st["entries"] == 2 and st["evictions"] == 1 and st["bytes"] <= 2 * size
+    cache.get_or_compute(df, ind.DEFAULT_INDICATORS, **{**KEY, "symbol": "A"})
+    assert cache.stats()["misses"] == 4  # "A" was the least recently used
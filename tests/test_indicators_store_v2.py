@@ -0,0 +1,86 @@
+import json
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+import indicators_mep_v2 as ind
+import indicators_store_mep_v2 as store
+
+KEY = ("t1", "binance", "BTCUSDT", "1m")
+
+def _toy_df(n=300, seed=7):
+    rng = np.random.default_rng(seed)
+    ts = np.arange(n, dtype=np.int64) * 60000
+    price = 100 + rng.normal(0, 0.5, size=n).cumsum()
+    high = price + rng.random(size=n)
+    low = price - rng.random(size=n)
+    vol = rng.integers(100, 1000, size=n).astype(float)
+    return pd.DataFrame({"ts": ts, "open": price, "high": high, "low": low, "close": price,
+                         "volume": vol})
+
+def _roundtrip(states):
+    # what indicator_state stores (jsonb) and reads back
+    return store.load_states(json.loads(json.dumps(store.dump_states(states), allow_nan=False)))
+
+def test_incremental_ingest_matches_full_recompute():
+    bars = _toy_df()
+    # first ingest: full; then batches of new bars, each re-sending a revised open candle
+    frame, states, state_ts = store.full_tail(bars.iloc[:120])
+    rows = frame.set_index("ts")[store.MATERIALIZED_COLUMNS]
+    stored = bars.iloc[:120].copy()
+    for stop in (121, 160, 161, 230, 300):
+        new = bars.iloc[len(stored)-1:stop].copy()
+        new.iloc[0, new.columns.get_loc("close")] += 0.01  # same ts, revised values
+        stored = pd.concat([stored.iloc[:-1], new], ignore_index=True)
+        after = stored[stored["ts"] > state_ts]
+        prev = stored[stored["ts"] <= state_ts].tail(store.warmup_bars())
+        out, snap, next_ts = store.incremental_tail(prev, after, _roundtrip(states))
+        if next_ts is not None:
+            states, state_ts = snap, next_ts
+        rows = pd.concat([rows.drop(out["ts"], errors="ignore"), out.set_index("ts")]).sort_index()
+    want = ind.compute_indicators(stored, store.MATERIALIZED_SPECS).set_index("ts")
+    want = want[store.MATERIALIZED_COLUMNS]
+    assert len(rows) == len(want)
+    np.testing.assert_allclose(rows.to_numpy(), want.to_numpy(), rtol=1e-9, atol=1e-9)
+
+def _sqlite_store(bars):
+    # the ohlcv/indicators tables of the migrations, on sqlite
+    engine = create_engine("sqlite://", poolclass=StaticPool,
+                           connect_args={"check_same_thread": False})
+    keys = "tenant_id TEXT, market TEXT, symbol TEXT, timeframe TEXT, ts BIGINT"
+    pk = "PRIMARY KEY (tenant_id, market, symbol, timeframe, ts)"
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE TABLE ohlcv ({keys}, "
+                          + "".join(f"{c} REAL, " for c in ind.OHLCV_COLS) + f"{pk})"))
+        conn.execute(text(f"CREATE TABLE indicators ({keys}, "
+                          + "".join(f"{c} REAL, " for c in store.MATERIALIZED_COLUMNS) + f"{pk})"))
+        conn.execute(text("INSERT INTO ohlcv VALUES (:tenant_id,:market,:symbol,:timeframe,:ts,"
+                          ":open,:high,:low,:close,:volume)"),
+                     [{**dict(zip(store.KEY_COLS, KEY)), **r} for r in bars.to_dict("records")])
+        frame, _, _ = store.full_tail(bars)
+        store._upsert_rows(conn, KEY, frame)
+    return engine
+
+def test_read_paths_serve_materialized_rows():
+    bars = _toy_df()
+    engine = _sqlite_store(bars)
+    want = ind.compute_indicators(bars, store.MATERIALIZED_SPECS)
+    with engine.connect() as conn:
+        got = store.read_indicators(conn, *KEY, since=int(bars["ts"][100]), fields=["close"])
+        assert len(got) == 200 and list(got.columns) == ["ts", "close", *store.MATERIALIZED_COLUMNS]
+        cols = store.MATERIALIZED_COLUMNS
+        np.testing.assert_allclose(got[cols].to_numpy(), want.iloc[100:][cols].to_numpy(),
+                                   equal_nan=True)
+        last = store.read_bars(conn, *KEY, limit=50)
+        pd.testing.assert_frame_equal(last, bars.tail(50).reset_index(drop=True))
+    # a window of the stored bars gets the materialized (full-history) values
+    key = dict(zip(("tenant_id", "market", "symbol", "timeframe"), KEY))
+    window = bars.iloc[200:].reset_index(drop=True)
+    frame = store.indicators_frame(engine, window, store.MATERIALIZED_SPECS, **key)
+    np.testing.assert_allclose(frame["ema20"], want["ema20"].iloc[200:], rtol=1e-12)
+    # a moved open candle no longer matches the stored bar: computed instead
+    window.loc[window.index[-1], "close"] += 1.0
+    frame = store.indicators_frame(engine, window, store.MATERIALIZED_SPECS, **key)
+    pd.testing.assert_frame_equal(frame, ind.compute_indicators(window, store.MATERIALIZED_SPECS))
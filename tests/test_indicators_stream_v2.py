@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+import indicators_mep_v2 as ind
+from indicators_stream_mep_v2 import (
+    ATRState,
+    EMAState,
+    MACDState,
+    OBVState,
+    RSIState,
+    StochasticState,
+    VWAPState,
+)
+
+
+def _toy_df(n=400, seed=3):
+    rng = np.random.default_rng(seed)
+    ts = np.arange(n, dtype=np.int64) * 60000
+    price = 100 + rng.normal(0, 0.5, size=n).cumsum()
+    high = price + rng.random(size=n)
+    low = price - rng.random(size=n)
+    vol = rng.integers(100, 1000, size=n).astype(float)
+    return pd.DataFrame({"ts": ts, "open": price, "high": high, "low": low, "close": price,
+                         "volume": vol})
+
+CASES = [
+    (EMAState, {"span": 20}, lambda df: ind.ema(df, 20)[["ema20"]]),
+    (RSIState, {"period": 14}, lambda df: ind.rsi(df, 14)[["rsi"]]),
+    (MACDState, {}, lambda df: ind.macd(df)[["macd", "macd_signal", "macd_hist"]]),
+    (ATRState, {"period": 14}, lambda df: ind.atr(df, 14)[["atr"]]),
+    (OBVState, {}, lambda df: ind.obv(df)[["obv"]]),
+    (VWAPState, {}, lambda df: ind.vwap(df)[["vwap"]]),
+    (StochasticState, {"k_period": 14, "d_period": 3},
+     lambda df: ind.stochastic(df, 14, 3)[["stoch_k", "stoch_d"]]),
+]
+
+def _stream(st, rows):
+    return np.array([np.atleast_1d(st.update(r)) for r in rows], dtype=float)
+
+def test_streaming_matches_batch_from_scratch():
+    df = _toy_df()
+    rows = df.to_dict("records")
+    for cls, params, batch in CASES:
+        got = _stream(cls(**params), rows)
+        np.testing.assert_allclose(got, batch(df).to_numpy(), rtol=1e-9, atol=1e-9,
+                                   err_msg=cls.__name__)
+
+def test_from_history_then_update_matches_batch():
+    df = _toy_df()
+    split = 250
+    rows = df.iloc[split:].to_dict("records")
+    for cls, params, batch in CASES:
+        st = cls.from_history(df.iloc[:split], **params)
+        got = _stream(st, rows)
+        want = batch(df).to_numpy()[split:]
+        np.testing.assert_allclose(got, want, rtol=1e-9, atol=1e-9, err_msg=cls.__name__)
+
+def test_states_use_slots():
+    for cls, params, _ in CASES:
+        assert not hasattr(cls(**params), "__dict__")
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicators_mep_v2 as ind
+import indicators_sweep_mep_v2 as sw
+from backtesting_mep_v2 import event_backtest, event_backtest_arrays
+from strategies_mep_v1 import mean_reversion_signal_matrix, mean_reversion_signals
+
+
+def _toy_df(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    ts = np.arange(n, dtype=np.int64) * 60000
+    price = 100 + rng.normal(0, 0.5, size=n).cumsum()
+    high = price + rng.random(size=n)
+    low = price - rng.random(size=n)
+    vol = rng.integers(100, 1000, size=n).astype(float)
+    return pd.DataFrame({"ts": ts, "open": price, "high": high, "low": low, "close": price,
+                         "volume": vol})
+
+PERIODS = [2, 5, 14, 20, 50]
+
+def test_sweep_rows_match_single_period_functions():
+    df = _toy_df()
+    close = df["close"].to_numpy()
+    sma, ema = sw.sma_sweep(close, PERIODS), sw.ema_sweep(close, PERIODS)
+    rsi = sw.rsi_sweep(close, PERIODS)
+    mid, up, low = sw.bollinger_sweep(close, PERIODS, 2.0)
+    assert sma.shape == (len(PERIODS), len(df))
+    for i, p in enumerate(PERIODS):
+        np.testing.assert_allclose(sma[i], ind.sma(df, p)[f"sma{p}"], rtol=1e-12, equal_nan=True)
+        np.testing.assert_allclose(ema[i], ind.ema(df, p)[f"ema{p}"], rtol=1e-12)
+        np.testing.assert_allclose(rsi[i], ind.rsi(df, p)["rsi"], rtol=1e-12)
+        bb = ind.bollinger(df, p, 2.0)
+        np.testing.assert_allclose(mid[i], bb["bb_mid"], rtol=1e-12, equal_nan=True)
+        np.testing.assert_allclose(up[i], bb["bb_up"], rtol=1e-12, equal_nan=True)
+        np.testing.assert_allclose(low[i], bb["bb_low"], rtol=1e-12, equal_nan=True)
+
+def test_sweep_feeds_backtest_without_frames():
+    df = _toy_df(500)
+    close, ts = df["close"].to_numpy(), df["ts"].to_numpy()
+    sig = mean_reversion_signal_matrix(sw.rsi_sweep(close, PERIODS), 35, 65)
+    for i, p in enumerate(PERIODS):
+        ref = mean_reversion_signals(ind.rsi(df, p), 35, 65)
+        np.testing.assert_array_equal(sig[i], ref["signal"].to_numpy())
+        pnl, dd, trades, eq = event_backtest_arrays(close, sig[i], ts)
+        rpnl, rdd, rtrades, req = event_backtest(ref)
+        assert (pnl, dd, trades) == (rpnl, rdd, rtrades)
+        np.testing.assert_array_equal(eq, req)
+
+def test_sweep_rejects_bad_periods():
+    with pytest.raises(ValueError):
+        sw.sma_sweep(np.arange(10.0), [0, 5])
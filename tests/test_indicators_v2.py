@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicators_mep_v2 as ind
+from benchmarks import baseline_indicators as baseline
+
+
+def _toy_df(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    ts = np.arange(n, dtype=np.int64) * 60000
+    price = 100 + rng.normal(0, 0.5, size=n).cumsum()
+    high = price + rng.random(size=n)
+    low = price - rng.random(size=n)
+    vol = rng.integers(100, 1000, size=n).astype(float)
+    return pd.DataFrame({"ts": ts, "open": price, "high": high, "low": low, "close": price,
+                         "volume": vol})
+
+def test_default_plan_matches_wrapper_chain():
+    df = _toy_df()
+    chained = ind.stochastic(ind.vwap(ind.obv(ind.bollinger(ind.atr(ind.macd(
+        ind.rsi(ind.sma(ind.ema(df, 20), 20), 14), 12, 26, 9), 14), 20, 2.0))), 14, 3)
+    plan = ind.apply_default_indicators_v2(df)
+    assert list(plan.columns) == list(chained.columns)
+    pd.testing.assert_frame_equal(plan, chained)
+
+def test_default_plan_matches_pre_plan_chain():
+    # the original copy-per-indicator code, not a re-simulation of it
+    for seed in range(3):
+        df = _toy_df(seed=seed)
+        pd.testing.assert_frame_equal(ind.apply_default_indicators_v2(df),
+                                      baseline.apply_default_indicators_v2(df))
+
+def test_adx_first_bar_true_range():
+    df = _toy_df()
+    pd.testing.assert_series_equal(ind.adx(df)["adx"], baseline.adx(df)["adx"])
+    # close[0] above high[0]: the shared tr node measures bar 0 against close[0]
+    bad = df.copy()
+    bad.loc[0, "close"] = bad.loc[0, "high"] + 5.0
+    high, low, close = (bad[k].to_numpy() for k in ("high", "low", "close"))
+    assert ind._true_range(high, low, close)[0] == close[0] - low[0] != high[0] - low[0]
+    # ... which cancels out of dx (+DI and -DI share the atr denominator)
+    np.testing.assert_allclose(ind.adx(bad)["adx"], baseline.adx(bad)["adx"], rtol=1e-12,
+                               equal_nan=True)
+
+def test_wrappers_match_reference_formulas():
+    df = _toy_df()
+    pd.testing.assert_series_equal(ind.sma(df, 10)["sma10"], df["close"].rolling(10).mean(),
+                                   check_names=False)
+    pd.testing.assert_series_equal(ind.ema(df, 20)["ema20"],
+                                   df["close"].ewm(span=20, adjust=False).mean(), check_names=False)
+    ref_obv = (np.sign(df["close"].diff()) * df["volume"]).fillna(0).cumsum()
+    pd.testing.assert_series_equal(ind.obv(df)["obv"], ref_obv, check_names=False)
+
+def test_plan_writes_into_single_block():
+    df = _toy_df()
+    cols, block = ind.compute_block(df, ind.DEFAULT_INDICATORS)
+    assert block.shape == (len(cols), len(df)) and block.dtype == np.float64
+    out = ind.compute_indicators(df, ind.DEFAULT_INDICATORS)
+    assert out["rsi"].dtype == np.float64
+    # input frame is left untouched
+    assert list(df.columns) == ["ts", "open", "high", "low", "close", "volume"]
+
+def test_empty_frame_and_unknown_indicator():
+    empty = _toy_df(0)
+    out = ind.apply_default_indicators_v2(empty)
+    assert out.empty and "macd_hist" in out.columns
+    with pytest.raises(ValueError):
+        ind.IndicatorSpec.of("nope")
+
+def test_shared_nodes_are_evaluated_once():
+    S = ind.IndicatorSpec.of
+    specs = [S("ema", span=12), S("dema", span=12), S("tema", span=12), S("macd"),
+             S("cci"), S("mfi"), S("atr"), S("adx"), S("sma", period=20), S("bollinger")]
+    nodes = ind.plan_nodes(specs)
+    assert len(nodes) == len(set(nodes))
+    assert len(nodes) < sum(len(ind.plan_nodes([s])) for s in specs)
+    assert nodes.count(ind.node("ema", ind.CLOSE, span=12)) == 1
+    assert nodes.count(ind.node("tp", ind.HIGH, ind.LOW, ind.CLOSE)) == 1
+    # one plan over the whole set gives the same columns as one plan per indicator
+    df = _toy_df()
+    together = ind.compute_indicators(df, specs)
+    for s in specs:
+        alone = ind.compute_indicators(df, [s])
+        pd.testing.assert_frame_equal(together[s.columns()], alone[s.columns()])
+
+def test_compact_precision_stores_float32_keeps_accumulations_float64():
+    df = _toy_df()
+    ref = ind.apply_default_indicators_v2(df)
+    out = ind.apply_default_indicators_v2(df, precision="compact")
+    assert list(out.columns) == list(ref.columns)
+    assert out["close"].dtype == np.float32 and out["rsi"].dtype == np.float32
+    assert all(out[c].dtype == np.float64 for c in ("volume", "obv", "vwap"))
+    for c in ("ema20", "bb_up", "vwap"):
+        np.testing.assert_allclose(out[c], ref[c], rtol=1e-6, equal_nan=True)
+    assert ind.to_precision(df) is df
+    with pytest.raises(ValueError):
+        ind.precision_dtype("float16")
+
+def test_compact_precision_runs_one_plan(monkeypatch):
+    plans = []
+    plan_nodes = ind.plan_nodes
+    monkeypatch.setattr(ind, "plan_nodes", lambda specs: plans.append(1) or plan_nodes(specs))
+    df = _toy_df()
+    out = ind.compute_indicators(df, ind.DEFAULT_INDICATORS, precision="compact")
+    assert len(plans) == 1
+    # the float64 plan over the same (float32) prices, cast on output
+    ref = ind.compute_indicators(ind.to_precision(df, "compact"), ind.DEFAULT_INDICATORS)
+    for c in ind.plan_columns(ind.DEFAULT_INDICATORS):
+        assert np.array_equal(out[c], ref[c].to_numpy().astype(out[c].dtype), equal_nan=True), c
+
+def test_spec_parse_from_json_values():
+    assert ind.IndicatorSpec.parse("rsi") == ind.IndicatorSpec.of("rsi")
+    spec = ind.IndicatorSpec.parse({"name": "ema", "params": {"span": 50}})
+    assert spec == ind.IndicatorSpec.of("ema", span=50) and spec.columns() == ["ema50"]
+    for bad in ("nope", {"name": "ema", "params": {"spam": 5}}, {"params": {}}, 42):
+        with pytest.raises(ValueError):
+            ind.IndicatorSpec.parse(bad)
+
+def test_non_default_params_get_their_own_columns():
+    df = _toy_df()
+    specs = [ind.IndicatorSpec.of("rsi"), ind.IndicatorSpec.of("rsi", period=7),
+             ind.IndicatorSpec.of("bollinger", k=2.5)]
+    out = ind.compute_indicators(df, specs)
+    assert {"rsi", "rsi_7", "bb_mid_20_2.5", "bb_low_20_2.5"} <= set(out.columns)
+    pd.testing.assert_series_equal(out["rsi_7"], ind.rsi(df, 7)["rsi"], check_names=False)
+    assert not np.allclose(out["rsi"], out["rsi_7"])
+
+def test_reapplying_a_non_default_period_replaces_the_column():
+    df = _toy_df()
+    once = ind.rsi(df, 7)
+    twice = ind.rsi(once, 7)
+    assert list(twice.columns).count("rsi") == 1
+    pd.testing.assert_series_equal(twice["rsi"], once["rsi"])
+    bb = ind.bollinger(ind.bollinger(df, 10), 10)
+    assert all(list(bb.columns).count(c) == 1 for c in ("bb_mid", "bb_up", "bb_low"))
+    # a different period overwrites the values
+    assert not np.allclose(ind.rsi(once, 21)["rsi"].iloc[30:], once["rsi"].iloc[30:])
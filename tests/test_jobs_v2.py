@@ -0,0 +1,73 @@
+import json
+import time
+
+from fastapi import HTTPException
+from fastapi.responses import Response
+
+import jobs_mep_v2 as jobs
+from runs_mep_v2 import RunCancelled
+
+
+class _Queue:
+    # in-memory stand-in for claim_run/finish_run on the runs table
+    def __init__(self, jobs_):
+        self.queued = list(jobs_); self.finished = {}; self.cancelled = set()
+
+    def claim(self, engine, kinds, lease_seconds):
+        for j in self.queued:
+            if j["kind"] in kinds:
+                self.queued.remove(j)
+                return {**j, "lease": "lease-" + j["id"]}
+        return None
+
+    def finish(self, engine, run_id, status, result, lease=None):
+        if run_id in self.cancelled or lease != "lease-" + run_id:
+            return False
+        self.finished[run_id] = (status, json.loads(json.dumps(result)))
+        return True
+
+def _worker(monkeypatch, queue, handlers, lease_seconds=300.0, beats=None):
+    monkeypatch.setattr(jobs, "claim_run", queue.claim)
+    monkeypatch.setattr(jobs, "finish_run", queue.finish)
+    beats = [] if beats is None else beats
+    monkeypatch.setattr(jobs, "heartbeat",
+                        lambda engine, run_id, lease, secs: beats.append((run_id, lease)) or True)
+    return jobs.JobWorker(None, handlers, lease_seconds=lease_seconds)
+
+def test_worker_runs_claimed_jobs_and_writes_results(monkeypatch):
+    async def ok(payload, run_id):
+        return {"echo": payload["x"], "run": run_id}
+    async def memo(payload, run_id):
+        return Response(content=b'{"pnl":0.5}', media_type="application/json")
+    async def bad(payload, run_id):
+        raise HTTPException(status_code=400, detail="unknown strategy")
+    async def cancelled(payload, run_id):
+        raise RunCancelled(run_id)
+    q = _Queue([{"id": "1", "kind": "ok", "params": {"payload": {"x": 3}}},
+                {"id": "2", "kind": "memo", "params": {"payload": {}}},
+                {"id": "3", "kind": "bad", "params": {"payload": {}}},
+                {"id": "4", "kind": "cancelled", "params": {"payload": {}}},
+                {"id": "5", "kind": "other", "params": {"payload": {}}}])
+    w = _worker(monkeypatch, q, {"ok": ok, "memo": memo, "bad": bad, "cancelled": cancelled})
+    assert [w.run_once() for _ in range(5)] == ["1", "2", "3", "4", None]
+    assert q.finished == {"1": ("done", {"echo": 3, "run": "1"}), "2": ("done", {"pnl": 0.5}),
+                          "3": ("error", {"error": "unknown strategy", "status_code": 400})}
+    assert [j["id"] for j in q.queued] == ["5"]  # kinds this worker has no handler for stay queued
+
+def test_cancel_while_running_drops_the_result(monkeypatch):
+    q = _Queue([{"id": "1", "kind": "ok", "params": {"payload": {}}}])
+    async def ok(payload, run_id):
+        q.cancelled.add(run_id)  # cancel arrives mid-job
+        return {"pnl": 1.0}
+    w = _worker(monkeypatch, q, {"ok": ok})
+    assert w.run_once() == "1" and q.finished == {}
+
+def test_long_job_renews_its_lease(monkeypatch):
+    q = _Queue([{"id": "1", "kind": "slow", "params": {"payload": {}}}])
+    beats = []
+    async def slow(payload, run_id):
+        time.sleep(0.2)
+        return {"pnl": 1.0}
+    w = _worker(monkeypatch, q, {"slow": slow}, lease_seconds=0.03, beats=beats)
+    assert w.run_once() == "1" and q.finished == {"1": ("done", {"pnl": 1.0})}
+    assert len(beats) >= 2 and set(beats) == {("1", "lease-1")}
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+import kernels_mep_v2 as k
+
+
+def _series(n=500, seed=7):
+    rng = np.random.default_rng(seed)
+    return 100 + rng.normal(0, 0.5, size=n).cumsum()
+
+def _ref_wma(x, p):
+    w = np.arange(1, p+1)
+    return pd.Series(x).rolling(p).apply(lambda v: np.dot(v, w) / w.sum(), raw=True).to_numpy()
+
+def _ref_mean_dev(x, p):
+    out = np.full(len(x), np.nan)
+    for t in range(p-1, len(x)):
+        win = x[t-p+1:t+1]
+        out[t] = np.mean(np.abs(win - win.mean()))
+    return out
+
+def test_rolling_sum_and_mean_match_pandas():
+    x = _series()
+    x[100] = np.nan
+    for p in (1, 5, 20):
+        r = pd.Series(x).rolling(p)
+        np.testing.assert_allclose(k.rolling_sum(x, p), r.sum().to_numpy(), rtol=1e-10)
+        np.testing.assert_allclose(k.rolling_mean(x, p), r.mean().to_numpy(), rtol=1e-10)
+
+def test_wma_matches_reference():
+    x = _series()
+    for p in (1, 3, 20):
+        np.testing.assert_allclose(k.wma(x, p), _ref_wma(x, p), rtol=1e-12)
+
+def test_trima_matches_reference():
+    x = _series()
+    ref = pd.Series(x).rolling(10).mean().rolling(10).mean().to_numpy()
+    np.testing.assert_allclose(k.trima(x, 10), ref, rtol=1e-10)
+
+def test_mean_deviation_and_cci_textbook(monkeypatch):
+    x = _series()
+    monkeypatch.setattr(k, "MD_CHUNK", 37)  # exercise chunk boundaries
+    np.testing.assert_allclose(k.mean_deviation(x, 20), _ref_mean_dev(x, 20), rtol=1e-10)
+    high, low = x + 1.0, x - 0.5
+    tp = (high + low + x) / 3
+    ma = pd.Series(tp).rolling(20).mean().to_numpy()
+    ref = (tp - ma) / (0.015 * _ref_mean_dev(tp, 20))
+    np.testing.assert_allclose(k.cci(high, low, x, 20), ref, rtol=1e-9)
+
+def test_short_input_is_all_nan():
+    assert np.isnan(k.wma(np.arange(3.0), 5)).all()
+    assert np.isnan(k.mean_deviation(np.arange(3.0), 5)).all()
+
+def test_rolling_extremes_match_pandas():
+    x = _series()
+    x[200] = np.nan
+    for p in (1, 2, 9, 14, 26, 52):
+        s = pd.Series(x).rolling(p)
+        np.testing.assert_allclose(k.rolling_max(x, p), s.max().to_numpy())
+        np.testing.assert_allclose(k.rolling_min(x, p), s.min().to_numpy())
+
+def test_kernels_run_along_last_axis():
+    m = np.vstack([_series(seed=1), _series(seed=2)])
+    for fn in (k.rolling_mean, k.rolling_max, k.rolling_min, k.wma, k.mean_deviation):
+        got = fn(m, 20)
+        for i in range(2):
+            np.testing.assert_allclose(got[i], fn(m[i], 20), rtol=1e-10)
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+import memo_mep_v2 as memo
+from indicators_mep_v2 import to_precision
+
+
+def _toy_df(n=300, seed=4):
+    rng = np.random.default_rng(seed)
+    ts = np.arange(n, dtype=np.int64) * 60000
+    price = 100 + rng.normal(0, 0.5, size=n).cumsum()
+    vol = rng.integers(100, 1000, size=n).astype(float)
+    return pd.DataFrame({"ts": ts, "open": price, "high": price + 1, "low": price - 1,
+                         "close": price, "volume": vol})
+
+def test_key_follows_bar_content_and_spec():
+    df = _toy_df()
+    d = memo.bars_digest(df)
+    spec = {"strategy": "mean_reversion", "params": {"rsi_buy": 30, "rsi_sell": 70},
+            "fee_bps": 10.0}
+    assert memo.bars_digest(df.copy()) == d
+    reordered = dict(reversed(list(spec.items())))
+    assert memo.memo_key("ab", d, spec) == memo.memo_key("ab", d, reordered)
+    moved = df.copy(); moved.loc[150, "close"] += 1e-9
+    assert memo.bars_digest(moved) != d
+    assert memo.bars_digest(to_precision(df, "compact")) != d
+    assert memo.memo_key("ab", d, {**spec, "fee_bps": 5.0}) != memo.memo_key("ab", d, spec)
+    assert memo.memo_key("walkforward", d, spec) != memo.memo_key("ab", d, spec)
+
+def test_memo_lru_bounds():
+    m = memo.BacktestMemo(max_entries=2, max_bytes=10)
+    m.put("a", b"1234"); m.put("b", b"5678")
+    assert m.get("a") == b"1234"
+    m.put("c", b"90")          # over 2 entries: evicts b, the least recent
+    assert m.get("b") is None and m.get("c") == b"90"
+    m.put("d", b"123456")      # over 10 bytes: evicts a
+    assert m.get("a") is None
+    m.put("big", b"x" * 11)    # larger than the budget: not stored
+    assert m.get("big") is None and m.stats()["entries"] == 2
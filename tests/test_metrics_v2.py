@@ -2,6 +2,7 @@
 import numpy as np
 import pandas as pd
 from services_metrics_mep_v2 import compute_accuracy, compute_pnl
+from downsample_mep_v2 import decode_curve
 
 def _toy_df(n=200, seed=0):
     rng = np.random.default_rng(seed)
@@ -31,3 +32,12 @@ def test_compute_pnl_runs():
     res = compute_pnl(df, sig, fee_bps=10.0, slippage_bps=5.0)
     assert "total_pnl" in res and "max_drawdown" in res and "n_trades" in res and "equity_curve" in res
     assert isinstance(res["equity_curve"], list) and len(res["equity_curve"]) == len(df)
+
+def test_compute_pnl_downsamples_and_keeps_full_resolution():
+    df = _toy_df(400, seed=42)
+    sig = _toy_signal(df)
+    full = compute_pnl(df, sig, max_points=0)
+    res = compute_pnl(df, sig, max_points=50, full_resolution=True)
+    assert len(res["equity_curve"]) == len(res["equity_ts"]) == 50 and res["n_bars"] == len(df)
+    assert res["equity_ts"][0] == df["ts"].iloc[0] and res["equity_ts"][-1] == df["ts"].iloc[-1]
+    np.testing.assert_allclose(decode_curve(res["equity_full"]), full["equity_curve"], rtol=1e-6)
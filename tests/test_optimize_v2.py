@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicators_mep_v2 as ind
+import optimize_mep_v2 as opt
+from backtesting_mep_v2 import event_backtest
+from strategies_mep_v1 import mean_reversion_signals
+
+
+def _toy_df(n=400, seed=5):
+    rng = np.random.default_rng(seed)
+    ts = np.arange(n, dtype=np.int64) * 60000
+    price = 100 + rng.normal(0, 0.5, size=n).cumsum()
+    high = price + rng.random(size=n)
+    low = price - rng.random(size=n)
+    vol = rng.integers(100, 1000, size=n).astype(float)
+    df = pd.DataFrame({"ts": ts, "open": price, "high": high, "low": low, "close": price,
+                       "volume": vol})
+    return ind.compute_indicators(df, ind.DEFAULT_INDICATORS)
+
+GRID = {"rsi_buy": [25, 30, 35, 40], "rsi_sell": [60, 65, 70]}
+
+def test_param_grid():
+    assert opt.param_grid({"a": [1, 2], "b": 3}) == [{"a": 1, "b": 3}, {"a": 2, "b": 3}]
+    for bad in ({}, {"a": []}):
+        with pytest.raises(ValueError):
+            opt.param_grid(bad)
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_optimize_ranks_every_grid_point(workers):
+    df = _toy_df()
+    out = opt.optimize(df, "mean_reversion", GRID, top_k=5, workers=workers, chunk_size=2)
+    want = sorted(((event_backtest(mean_reversion_signals(df, **p))[0], p)
+                   for p in opt.param_grid(GRID)), key=lambda t: -t[0])
+    assert out["evaluated"] == 12 and out["workers"] == workers
+    assert [r["params"] for r in out["top"]] == [p for _, p in want[:5]]
+    assert [r["pnl"] for r in out["top"]] == [pnl for pnl, _ in want[:5]]
+
+def test_walk_forward_picks_in_sample_best_and_stitches_oos():
+    df = _toy_df(1200)
+    wf = opt.walk_forward_optimize(df, "mean_reversion", GRID, window=300, step=300, workers=2)
+    assert [f["oos"] for f in wf["folds"]] == [[300, 600], [600, 900], [900, 1200]]
+    for f in wf["folds"]:
+        best = opt.optimize(df.iloc[:f["is"][1]], "mean_reversion", GRID, top_k=1,
+                            workers=1)["top"][0]
+        assert f["params"] == best["params"] and f["is_metrics"]["pnl"] == best["pnl"]
+    # non-overlapping windows: the stitched curve covers the folds back to back
+    assert wf["oos"]["start"] == 300 and len(wf["oos"]["equity"]) == 900
+    assert [f["stitched"] for f in wf["folds"]] == [f["oos"] for f in wf["folds"]]
+
+def test_iter_walk_forward_streams_folds_then_oos():
+    df = _toy_df(1200)
+    wf = opt.walk_forward_optimize(df, "mean_reversion", GRID, window=300, step=300, workers=1)
+    recs = list(opt.iter_walk_forward(df, "mean_reversion", GRID, window=300, step=300, workers=1))
+    assert [r["type"] for r in recs] == ["fold"] * 3 + ["oos"]
+    for r in recs[:-1]:
+        f = wf["folds"][r["fold"]]
+        assert ((r["params"], r["pnl"], r["max_dd"], r["oos"])
+                == (f["params"], f["pnl"], f["max_dd"], f["oos"]))
+    assert recs[-1]["pnl"] == wf["oos"]["pnl"] and recs[-1]["start"] == wf["oos"]["start"]
+
+def test_cross_validate_folds_and_distribution():
+    df = _toy_df(800)
+    cv = opt.cross_validate(df, "mean_reversion", GRID, k=4, purge=10, embargo=5, workers=2)
+    assert [f["test"] for f in cv["folds"]] == [[0, 200], [200, 400], [400, 600], [600, 800]]
+    assert cv["folds"][1]["train"] == [[0, 190], [405, 800]]
+    pnls = [f["pnl"] for f in cv["folds"]]
+    d = cv["distribution"]["pnl"]
+    assert d["n"] == 4 and d["min"] == min(pnls) and d["max"] == max(pnls)
+    np.testing.assert_allclose(d["mean"], np.mean(pnls))
+    with pytest.raises(ValueError):
+        opt.cross_validate(df, "mean_reversion", GRID, k=1)
+    with pytest.raises(ValueError, match="bad params"):
+        opt.cross_validate(df, "mean_reversion", {"rsi_bye": [25, 30]}, k=4, workers=2)
+    # purge + embargo swallowing the train set is refused up front, whatever the grid size
+    for grid in (GRID, None):
+        with pytest.raises(ValueError, match="no training bars"):
+            opt.cross_validate(_toy_df(40), "mean_reversion", grid, k=2, purge=30, embargo=30)
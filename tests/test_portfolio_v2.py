@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import portfolio_mep_v2 as pf
+from backtesting_mep_v2 import event_backtest_arrays
+from indicators_batch_mep_v2 import align_ohlcv
+
+
+def _toy_df(n, start, seed):
+    rng = np.random.default_rng(seed)
+    ts = (start + np.arange(n, dtype=np.int64)) * 60000
+    price = 100 + rng.normal(0, 0.5, size=n).cumsum()
+    return pd.DataFrame({"ts": ts, "open": price, "high": price + rng.random(n),
+                         "low": price - rng.random(n), "close": price,
+                         "volume": rng.integers(100, 1000, size=n).astype(float)})
+
+def test_single_asset_matches_event_backtest_when_always_in_the_market():
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 2000)))
+    sig = np.where(rng.random(2000) < 0.5, 1, -1).astype(np.int8); sig[:30] = 0
+    W = pf.target_weights(sig[None, :], close[None, :], "equal")
+    res = pf.portfolio_backtest(close[None, :], W, return_curves=True)
+    pnl, dd, trades, eq = event_backtest_arrays(close, sig)
+    assert res["pnl"] == pytest.approx(pnl, abs=1e-12)
+    assert res["max_dd"] == pytest.approx(dd, abs=1e-12)
+    np.testing.assert_allclose(res["equity"], eq, atol=1e-12)
+
+@pytest.mark.parametrize("scheme", pf.WEIGHTINGS)
+def test_universe_weights_turnover_and_costs(scheme, monkeypatch):
+    bars = align_ohlcv({"A": _toy_df(400, 0, 1), "B": _toy_df(300, 50, 2),
+                        "C": _toy_df(350, 20, 3)})
+    sigs = pf.SIGNAL_MATRICES["mean_reversion"](bars, rsi_buy=45, rsi_sell=55)
+    res = pf.backtest_universe(bars, sigs, scheme, return_curves=True)
+    # gross exposure is 1 whenever anything is held, and never on a missing bar
+    g = res["gross"][res["gross"] > 0]
+    np.testing.assert_allclose(g, 1.0)
+    assert res["asset_pnl"].sum() == pytest.approx(res["pnl"], abs=1e-9)
+    assert res["costs"] == pytest.approx(res["turnover"] * 15 / 1e4)
+    # blocking over assets does not change the result
+    monkeypatch.setattr(pf, "MATRIX_BLOCK", 400)
+    again = pf.backtest_universe(bars, sigs, scheme)
+    assert again["pnl"] == pytest.approx(res["pnl"], abs=1e-12)
+    assert again["turnover"] == pytest.approx(res["turnover"])
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+import robustness_mep_v2 as rb
+from backtesting_mep_v2 import event_backtest_arrays
+
+
+def _toy(n=2000, seed=3):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    flips = rng.choice([-1, 0, 1], n, p=[0.02, 0.96, 0.02])
+    return close, np.sign(np.cumsum(flips)).astype(np.int8)
+
+def test_bar_and_trade_returns_add_up_to_engine_pnl():
+    close, sig = _toy()
+    pnl, dd, trades, eq = event_backtest_arrays(close, sig)
+    r = rb.bar_returns(close, sig)
+    assert r.sum() == pytest.approx(pnl, abs=1e-12)
+    m = rb.path_metrics(r[None, :])
+    assert m["max_dd"][0] == pytest.approx(dd, abs=1e-12)
+    t = rb.trade_returns(close, sig)
+    assert len(t) == len(trades) and t.sum() == pytest.approx(pnl, abs=1e-12)
+
+def test_block_bootstrap_is_chunk_invariant_and_block_n_is_a_rotation():
+    close, sig = _toy()
+    r = rb.bar_returns(close, sig)
+    a = rb.block_bootstrap(r, 300, seed=1)
+    b = rb.block_bootstrap(r, 300, seed=1, chunk_elems=len(r) * 7)
+    for k in rb.METRICS:
+        np.testing.assert_array_equal(a[k], b[k])
+    # one block of full length: every path is a rotation of the series, same total
+    c = rb.block_bootstrap(r, 50, block=len(r), seed=2)
+    np.testing.assert_allclose(c["pnl"], r.sum(), atol=1e-12)
+
+def test_monte_carlo_intervals():
+    close, sig = _toy()
+    mc = rb.monte_carlo(close, sig, n_paths=500, seed=0, levels=(0.5, 0.95))
+    for k in rb.METRICS:
+        lo50, hi50 = mc["metrics"][k]["ci"]["0.5"]; lo95, hi95 = mc["metrics"][k]["ci"]["0.95"]
+        assert lo95 <= lo50 <= mc["metrics"][k]["median"] <= hi50 <= hi95
+    assert 0.0 <= mc["prob_loss"] <= 1.0
+    with pytest.raises(ValueError):
+        rb.monte_carlo(close, sig, unit="tick")
@@ -0,0 +1,24 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+rb = pytest.importorskip("routers_backtests_mep_v2", exc_type=ImportError)
+rm = pytest.importorskip("routers_metrics_mep_v2", exc_type=ImportError)
+
+BACKTEST_ROUTES = [rb.backtest_ab, rb.backtest_montecarlo, rb.backtest_compare,
+                   rb.backtest_optimize, rb.backtest_walkforward,
+                   rb.backtest_walkforward_stream, rb.backtest_cv]
+METRICS_ROUTES = [rm.metrics_accuracy, rm.metrics_pnl, rm.metrics_equity]
+
+@pytest.mark.parametrize("route", BACKTEST_ROUTES, ids=lambda f: f.__name__)
+def test_backtests_reject_unknown_precision(route):
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(route({"precision": "f32"}))
+    assert e.value.status_code == 400 and "precision" in e.value.detail
+
+@pytest.mark.parametrize("route", METRICS_ROUTES, ids=lambda f: f.__name__)
+def test_metrics_reject_unknown_precision(route):
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(route({"precision": "f32"}, session=None))
+    assert e.value.status_code == 400 and "precision" in e.value.detail
@@ -0,0 +1,37 @@
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import shm_mep_v2 as shm
+
+
+def _toy_df(n=300, seed=2):
+    rng = np.random.default_rng(seed)
+    price = 100 + rng.normal(0, 0.5, size=n).cumsum()
+    return pd.DataFrame({"ts": np.arange(n, dtype=np.int64) * 60000, "close": price,
+                         "rsi": rng.random(n).astype(np.float32) * 100})
+
+def test_frame_roundtrip_is_zero_copy_and_cleaned_up():
+    df = _toy_df()
+    with shm.publish_frame(df) as shared:
+        h = shared.handles["rsi"]
+        assert (h.dtype, h.shape) == (np.dtype(np.float32).str, (300,))
+        out = shm.attach_frame(shared.handles)
+        pd.testing.assert_frame_equal(out, df)
+        assert np.shares_memory(out["close"].to_numpy(), shm.attach(shared.handles["close"]))
+        with pytest.raises(ValueError):
+            out["close"].to_numpy()[0] = 1.0  # read-only views
+        del out
+        shm.detach_all()
+        names = [x.name for x in shared.handles.values()]
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            SharedMemory(name=name)
+
+def test_publish_rejects_object_arrays():
+    with pytest.raises(shm.ShareError):
+        shm.publish({"a": np.arange(3.0), "b": np.array(["x"], dtype=object)})
+    with pytest.raises(shm.ShareError):
+        shm.publish_frame(pd.DataFrame({"ts": [1, 2], "symbol": ["A", "B"]}))